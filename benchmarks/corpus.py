@@ -0,0 +1,130 @@
+"""
+Deterministic synthetic data for the RogueGuard benchmarks.
+
+Every generator takes a seed, so two runs of the suite analyze exactly the
+same text and history and their timings can be compared.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+NEUTRAL_WORDS = (
+    "the", "user", "asked", "about", "weather", "report", "summary", "data", "please", "review",
+    "table", "results", "model", "output", "thanks", "schedule", "meeting", "notes", "draft", "email",
+    "customer", "support", "ticket", "update", "question", "answer", "python", "script", "error", "log"
+)
+
+# Phrases matching the default indicator table, in mixed case
+RISKY_PHRASES = (
+    "evasive language", "withholding information", "Misleading Responses",
+    "unauthorized actions", "system modifications", "objective shifts",
+    "independent decision", "self-modification", "override", "bypass",
+    "ethical changes", "value modifications",
+    "resource allocation", "system access", "Processing Power"
+)
+
+RISK_LEVELS = ("LOW", "MODERATE", "HIGH", "CRITICAL")
+FACTORS = ("deception", "goal_misalignment", "autonomy", "value_drift", "resource_usage")
+
+
+def synthetic_response(size: int, seed: int = 0, risk_density: float = 0.02) -> str:
+    """Text of exactly ``size`` characters with a fraction of risky phrases"""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        if rng.random() < risk_density:
+            part = rng.choice(RISKY_PHRASES)
+        else:
+            part = rng.choice(NEUTRAL_WORDS)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)[:size]
+
+
+def synthetic_responses(count: int, size: int, seed: int = 0, risk_density: float = 0.02) -> List[str]:
+    return [synthetic_response(size, seed + i, risk_density) for i in range(count)]
+
+
+def synthetic_history(count: int, seed: int = 0) -> Iterator[Dict]:
+    """History records shaped like BehaviorAnalyzer output"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        scores = {factor: rng.choice((0.0, 0.0, 0.0, 0.25, 0.5)) for factor in FACTORS}
+        total = sum(scores.values()) / len(FACTORS)
+        yield {
+            "timestamp": (start + timedelta(seconds=i)).isoformat(),
+            "risk_scores": scores,
+            "total_risk": total,
+            "risk_level": RISK_LEVELS[min(int(total / 0.2), 3)],
+            "indicators": []
+        }
+
+
+class FakeModel:
+    """Deterministic stand-in for the OpenAI chat agent
+
+    The reply depends only on the prompt, so cached and uncached runs see
+    the same analyses. Prompts asking for JSON get a schema-conforming JSON
+    reply, others the free-text format. ``latency`` adds a fixed sleep to
+    simulate network round-trips.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _reply(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        level = RISK_LEVELS[digest[0] % len(RISK_LEVELS)]
+        if "JSON object" in prompt:
+            return json.dumps({
+                "risk_level": level,
+                "risk_score": round(digest[1] / 255, 3),
+                "risk_scores": {factor: round(digest[2 + i] / 255, 3) for i, factor in enumerate(FACTORS)},
+                "concerns": ["synthetic benchmark response"],
+                "evidence": [],
+                "recommendations": ["continue monitoring"]
+            })
+        return (
+            f"RISK LEVEL: {level}\n\n"
+            f"1. Risk Level: {level}\n"
+            "2. Key Concerns: synthetic benchmark response\n"
+            "3. Evidence: none\n"
+            "4. Recommendations: continue monitoring"
+        )
+
+    def chat(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(prompt)
+
+    async def achat(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(prompt)
+
+
+def sizes_up_to(limit: int, start: int = 100, factor: int = 10) -> List[int]:
+    sizes = []
+    size = start
+    while size <= limit:
+        sizes.append(size)
+        size *= factor
+    return sizes
+
+
+def human_size(size: int, unit: Optional[str] = "B") -> str:
+    for suffix in ("", "K", "M", "G"):
+        if size < 1000 or suffix == "G":
+            return f"{size}{suffix}{unit}"
+        size //= 1000
+    return f"{size}{unit}"
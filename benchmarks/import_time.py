@@ -0,0 +1,98 @@
+"""
+Import-time benchmark for the RogueGuard CLI.
+
+Runs ``python -X importtime`` in fresh interpreters, reports the best
+cumulative import time of each module and fails when a module exceeds its
+budget or pulls in a dependency that should only load on demand.
+
+    python benchmarks/import_time.py [--runs 5] [--budget-ms 150] [--json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Module -> default budget in milliseconds
+BUDGETS_MS = {
+    "rogueguard": 20.0,
+    "rogueguard.cli": 150.0,
+}
+
+# Heavy dependencies that must not be imported by the modules above
+FORBIDDEN_MODULES = ("agno", "openai", "numpy", "pandas", "sklearn", "rich.markdown", "pydantic_settings")
+
+
+def measure(module: str) -> Tuple[float, Set[str]]:
+    """Return cumulative import time in ms and the set of imported modules"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    imported = set()
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        imported.add(name)
+        if name == module:
+            cumulative_us = int(cumulative)
+    if cumulative_us is None:
+        raise RuntimeError(f"{module} did not appear in the import time report")
+    return cumulative_us / 1000.0, imported
+
+
+def run(runs: int, budget_override: Optional[float] = None) -> List[Dict]:
+    results = []
+    for module, budget in BUDGETS_MS.items():
+        budget = budget_override if budget_override is not None and module == "rogueguard.cli" else budget
+        timings = []
+        imported: Set[str] = set()
+        for _ in range(runs):
+            elapsed, imported = measure(module)
+            timings.append(elapsed)
+        leaked = sorted(
+            name for name in imported
+            if any(name == heavy or name.startswith(heavy + ".") for heavy in FORBIDDEN_MODULES)
+        )
+        best = min(timings)
+        results.append({
+            "module": module,
+            "best_ms": round(best, 2),
+            "median_ms": round(sorted(timings)[len(timings) // 2], 2),
+            "budget_ms": budget,
+            "leaked_modules": leaked,
+            "passed": best <= budget and not leaked
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--budget-ms", type=float, default=None, help="override the rogueguard.cli budget")
+    parser.add_argument("--json", action="store_true", help="emit machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.runs, args.budget_ms)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            status = "ok" if result["passed"] else "FAIL"
+            print(f"{status:4} {result['module']:<16} best {result['best_ms']:8.2f} ms "
+                  f"(median {result['median_ms']:.2f}, budget {result['budget_ms']:.0f})")
+            if result["leaked_modules"]:
+                print(f"     eagerly imports: {', '.join(result['leaked_modules'][:10])}")
+
+    sys.exit(0 if all(result["passed"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Performance benchmark suite for RogueGuard.
+
+Runs every benchmark against deterministic synthetic data in a throwaway
+home directory, prints a table, optionally writes the results as JSON and
+fails when a result regresses past ``--tolerance`` relative to the stored
+baseline.
+
+    python benchmarks/suite.py [--full] [--only NAME ...] [--output results.json]
+                               [--baseline benchmarks/baseline.json] [--update-baseline]
+                               [--tolerance 0.5]
+
+Benchmarks:
+    analyze_response   BehaviorAnalyzer.analyze_response, 100 B to 1 MB (10 MB with --full)
+    history_growth     history load and append cost with 0 to 100k records (1M with --full)
+    save_analysis      RogueGuard._save_analysis throughput for each output sink
+    end_to_end         RogueGuard.analyze_interaction / analyze_many / analyze_stream
+                       with a deterministic fake model in place of OpenAIChat
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from corpus import FakeModel, human_size, sizes_up_to, synthetic_history, synthetic_response, synthetic_responses
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Settings applied before rogueguard is imported, so runs do not depend on the user's environment
+BENCHMARK_ENV = {
+    "HISTORY_BACKEND": "jsonl",
+    "OUTPUT_SINK": "jsonl",
+    "CACHE_ENABLED": "false",
+    "ESCALATION_MODE": "always",
+    "METRICS_ENABLED": "false",
+    "LOG_LEVEL": "WARNING"
+}
+
+
+def result(name: str, value: float, unit: str, better: str = "lower") -> Dict:
+    return {"name": name, "value": value, "unit": unit, "better": better}
+
+
+def best_time(func: Callable[[], object], number: int = 1, repeat: int = 5) -> float:
+    """Best mean seconds per call over ``repeat`` rounds of ``number`` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def calibrate() -> float:
+    """Time a fixed pure-Python workload to measure how fast this machine is right now
+
+    Each benchmark's results are divided by the ratio of this figure to the
+    baseline's, so a slower or busier machine does not show up as a
+    regression.
+    """
+    def workload():
+        encoded = {str(i): json.dumps({"index": i, "values": [i] * 3}) for i in range(20_000)}
+        " ".join(encoded).split()
+
+    return best_time(workload, repeat=5)
+
+
+def bench_analyze_response(full: bool, workdir: Path) -> List[Dict]:
+    from rogueguard.analyzers.behavior_analyzer import BehaviorAnalyzer
+    from rogueguard.storage.history_store import MemoryHistoryStore
+
+    analyzer = BehaviorAnalyzer(history_store=MemoryHistoryStore(), track_drift=True)
+    results = []
+    for size in sizes_up_to(10_000_000 if full else 1_000_000):
+        text = synthetic_response(size, seed=size)
+        number = max(1, min(1000, 200_000 // size))
+        seconds = best_time(lambda: analyzer.analyze_response(text), number=number)
+        analyzer.history_store.drain()
+        results.append(result(f"analyze_response[{human_size(size)}]", seconds, "s/call"))
+    analyzer.close()
+    return results
+
+
+def bench_history_growth(full: bool, workdir: Path) -> List[Dict]:
+    from rogueguard.analyzers.behavior_analyzer import BehaviorAnalyzer
+    from rogueguard.storage.history_store import JSONHistoryStore, JSONLHistoryStore
+
+    text = synthetic_response(1000, seed=1)
+    results = []
+    sizes = [0, 1_000, 10_000, 100_000] + ([1_000_000] if full else [])
+    for count in sizes:
+        directory = workdir / f"history-{count}"
+        store = JSONLHistoryStore(directory)
+        batch = []
+        for record in synthetic_history(count, seed=count):
+            batch.append(record)
+            if len(batch) >= 10_000:
+                store.extend(batch)
+                batch = []
+        store.extend(batch)
+        store.close()
+
+        load = best_time(lambda: JSONLHistoryStore(directory).close(), repeat=3)
+        results.append(result(f"history_load[jsonl,{count}]", load, "s"))
+
+        analyzer = BehaviorAnalyzer(history_store=JSONLHistoryStore(directory), track_drift=False)
+        append = best_time(lambda: (analyzer.analyze_response(text), analyzer.save_history()), number=200)
+        analyzer.close()
+        results.append(result(f"history_append[jsonl,{count}]", append, "s/call"))
+
+    # The legacy backend rewrites the whole file on every append, so keep it small
+    for count in [0, 1_000, 10_000]:
+        path = workdir / f"history-{count}.json"
+        with open(path, 'w') as f:
+            json.dump(list(synthetic_history(count, seed=count)), f)
+        analyzer = BehaviorAnalyzer(history_store=JSONHistoryStore(path), track_drift=False)
+        append = best_time(lambda: analyzer.analyze_response(text), number=20)
+        analyzer.close()
+        results.append(result(f"history_append[json,{count}]", append, "s/call"))
+    return results
+
+
+def bench_save_analysis(full: bool, workdir: Path) -> List[Dict]:
+    from rogueguard.models.guard import RogueGuard
+    from rogueguard.storage.analysis_sink import create_analysis_sink
+
+    guard = RogueGuard(agent=FakeModel(), use_cache=False)
+    template = guard.analyze_interaction(synthetic_response(2000, seed=2))
+    template.pop("analysis_id", None)
+
+    kinds = ["json", "jsonl", "sqlite"]
+    try:
+        import pyarrow  # noqa: F401
+        kinds.append("parquet")
+    except ImportError:
+        pass
+
+    results = []
+    for kind in kinds:
+        guard.sink.close()
+        guard.sink = create_analysis_sink(kind)
+        count = 500 if kind == "json" else 5000
+        analyses = [dict(template) for _ in range(count)]
+        start = time.perf_counter()
+        for analysis in analyses:
+            guard._save_analysis(analysis)
+        guard.sink.flush()
+        elapsed = time.perf_counter() - start
+        results.append(result(f"save_analysis[{kind}]", count / elapsed, "analyses/s", better="higher"))
+    guard.close()
+    return results
+
+
+def bench_end_to_end(full: bool, workdir: Path) -> List[Dict]:
+    from rogueguard.models.guard import RogueGuard
+
+    responses = synthetic_responses(200, 2000, seed=3)
+    results = []
+
+    guard = RogueGuard(agent=FakeModel(), use_cache=False)
+    iterator = iter(responses * 10)
+    seconds = best_time(lambda: guard.analyze_interaction(next(iterator)), number=200)
+    results.append(result("analyze_interaction[2KB]", seconds, "s/call"))
+
+    seconds = best_time(lambda: guard.analyze_many(responses), repeat=3)
+    results.append(result("analyze_many[200x2KB]", seconds / len(responses), "s/item"))
+    guard.close()
+
+    # Simulated 20 ms model latency shows how much the async path overlaps calls
+    guard = RogueGuard(agent=FakeModel(latency=0.02), use_cache=False)
+
+    async def consume():
+        return [item async for item in guard.analyze_stream(responses)]
+
+    start = time.perf_counter()
+    asyncio.run(consume())
+    elapsed = time.perf_counter() - start
+    results.append(result("analyze_stream[200x2KB,20ms]", len(responses) / elapsed, "items/s", better="higher"))
+    guard.close()
+    return results
+
+
+BENCHMARKS = {
+    "analyze_response": bench_analyze_response,
+    "history_growth": bench_history_growth,
+    "save_analysis": bench_save_analysis,
+    "end_to_end": bench_end_to_end
+}
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float, normalize: bool = True) -> List[Dict]:
+    """Annotate results with their change against the baseline
+
+    With ``normalize``, each slowdown is divided by how much slower the
+    calibration workload ran next to it than next to the baseline result.
+    """
+    previous = {entry["name"]: entry for entry in baseline.get("results", [])}
+    for entry in results:
+        base = previous.get(entry["name"])
+        if base is None or not base["value"] or not entry["value"]:
+            entry["baseline"] = None
+            entry["regressed"] = False
+            continue
+        machine_factor = 1.0
+        if normalize and base.get("calibration") and entry.get("calibration"):
+            machine_factor = entry["calibration"] / base["calibration"]
+        # Slowdown factor: > 1 means worse than the baseline
+        if entry["better"] == "lower":
+            slowdown = entry["value"] / base["value"] / machine_factor
+        else:
+            slowdown = base["value"] / entry["value"] / machine_factor
+        entry["baseline"] = base["value"]
+        entry["slowdown"] = round(slowdown, 3)
+        entry["regressed"] = slowdown > 1 + tolerance
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="include the 10 MB response and 1M-record history cases")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline results to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown before failing (0.5 = 50%%)")
+    parser.add_argument("--no-normalize", action="store_true",
+                        help="compare raw timings instead of scaling by the calibration workload")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="rogueguard-bench-"))
+    # Registered first so it runs after the analyzers' and sinks' own atexit flushes
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    os.environ["HOME"] = str(workdir)
+    os.environ.update(BENCHMARK_ENV)
+    os.environ.pop("INDICATOR_TABLE_FILE", None)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    results: List[Dict] = []
+    for name in args.only or BENCHMARKS:
+        print(f"running {name}...", file=sys.stderr)
+        # Calibrate around each benchmark since machine load drifts during a run
+        before = calibrate()
+        group = BENCHMARKS[name](args.full, workdir)
+        calibration = min(before, calibrate())
+        for entry in group:
+            entry["calibration"] = calibration
+        results.extend(group)
+
+    baseline = {}
+    if args.baseline.exists() and not args.update_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    compare(results, baseline, args.tolerance, normalize=not args.no_normalize)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "full": args.full,
+        "results": results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({**report, "results": [
+                {key: entry[key] for key in ("name", "value", "unit", "better", "calibration")} for entry in results
+            ]}, f, indent=2)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+
+    for entry in results:
+        status = "FAIL" if entry["regressed"] else "ok"
+        change = f"{(entry['slowdown'] - 1) * 100:+6.1f}%" if entry.get("baseline") else "    new"
+        print(f"{status:4} {entry['name']:<36} {entry['value']:14.6g} {entry['unit']:<11} {change}")
+
+    sys.exit(1 if any(entry["regressed"] for entry in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
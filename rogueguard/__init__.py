@@ -2,8 +2,16 @@
 RogueGuard - Advanced AI Behavior Analysis System
 """
 
-from .models.guard import RogueGuard
-from .config.settings import settings
-
 __version__ = "1.0.0"
 __all__ = ['RogueGuard', 'settings']
+
+
+def __getattr__(name):
+    # Load RogueGuard (agno, OpenAI, numpy) and settings on first access only
+    if name == 'RogueGuard':
+        from .models.guard import RogueGuard
+        return RogueGuard
+    if name == 'settings':
+        from .config.settings import settings
+        return settings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
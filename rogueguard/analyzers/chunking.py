@@ -0,0 +1,149 @@
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import mmap
+
+# Fields tried, in order, for the text of a JSONL record
+JSONL_TEXT_FIELDS = ("response", "ai_response", "content", "text", "message")
+
+Chunk = Tuple[int, int, str, Optional[Dict]]
+
+
+def iter_chunks(path: Path, mode: str = "lines", chunk_size: int = 16 * 1024,
+                overlap: int = 0, use_mmap: bool = True,
+                text_fields: Sequence[str] = JSONL_TEXT_FIELDS) -> Iterator[Chunk]:
+    """Read a file incrementally as ``(start, end, text, context)`` chunks
+
+    Offsets are byte offsets into the file. Modes:
+
+    - ``lines``: whole lines grouped until ``chunk_size`` bytes; a line
+      longer than that is split into ``chunk_size`` pieces
+    - ``jsonl``: one chunk per JSON record; the text comes from the first
+      of ``text_fields`` present and the remaining fields become context
+    - ``window``: fixed ``chunk_size`` byte windows overlapping by ``overlap``
+
+    Only one chunk is held in memory at a time. Local files are memory
+    mapped when ``use_mmap`` is set.
+    """
+    if mode not in ("lines", "jsonl", "window"):
+        raise ValueError(f"Unknown chunking mode: {mode}")
+    if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+        raise ValueError("chunk_size must be positive and overlap smaller than chunk_size")
+
+    with open(path, 'rb') as f:
+        source = _open_source(f, use_mmap)
+        try:
+            if mode == "window":
+                yield from _window_chunks(source, chunk_size, overlap)
+            elif mode == "jsonl":
+                yield from _jsonl_chunks(_iter_lines(source), text_fields)
+            else:
+                yield from _line_chunks(_iter_lines(source, chunk_size), chunk_size)
+        finally:
+            if isinstance(source, mmap.mmap):
+                source.close()
+
+
+def _open_source(f, use_mmap: bool):
+    """Memory-map the file when possible, otherwise read it as a stream"""
+    if use_mmap:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and non-regular files (pipes, sockets) cannot be mapped
+            pass
+    return f
+
+
+def _iter_lines(source, limit: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(offset, line)`` pairs from a mapped or streamed file
+
+    With ``limit``, lines longer than that come in pieces of ``limit``
+    bytes, so an oversized line is never read into memory whole.
+    """
+    offset = 0
+    for line in iter(lambda: _readline(source, limit), b""):
+        yield offset, line
+        offset += len(line)
+
+
+def _readline(source, limit: Optional[int]) -> bytes:
+    if limit is None:
+        return source.readline()
+    if isinstance(source, mmap.mmap):
+        # mmap.readline takes no size limit
+        position = source.tell()
+        newline = source.find(b"\n", position, position + limit)
+        return source.read(newline + 1 - position if newline >= 0 else limit)
+    return source.readline(limit)
+
+
+def _decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def _line_chunks(lines: Iterator[Tuple[int, bytes]], chunk_size: int) -> Iterator[Chunk]:
+    start = 0
+    parts = []
+    size = 0
+    for offset, line in lines:
+        if len(line) == chunk_size and not line.endswith(b"\n"):
+            # A piece of an oversized line is a chunk of its own
+            if parts:
+                yield start, start + size, _decode(b"".join(parts)), None
+                parts, size = [], 0
+            yield offset, offset + len(line), _decode(line), None
+            continue
+        if not parts:
+            start = offset
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield start, start + size, _decode(b"".join(parts)), None
+            parts, size = [], 0
+    if parts:
+        yield start, start + size, _decode(b"".join(parts)), None
+
+
+def _jsonl_chunks(lines: Iterator[Tuple[int, bytes]], text_fields: Sequence[str]) -> Iterator[Chunk]:
+    for offset, line in lines:
+        if not line.strip():
+            continue
+        end = offset + len(line)
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield offset, end, _decode(line), None
+            continue
+
+        if not isinstance(record, dict):
+            yield offset, end, json.dumps(record), None
+            continue
+        field = next((name for name in text_fields if isinstance(record.get(name), str)), None)
+        if field is None:
+            yield offset, end, _decode(line), None
+        else:
+            context = {key: value for key, value in record.items() if key != field}
+            yield offset, end, record[field], context or None
+
+
+def _window_chunks(source, chunk_size: int, overlap: int) -> Iterator[Chunk]:
+    step = chunk_size - overlap
+    if isinstance(source, mmap.mmap):
+        for start in range(0, max(len(source) - overlap, 1), step):
+            data = source[start:start + chunk_size]
+            if data:
+                yield start, start + len(data), _decode(data), None
+        return
+
+    start = 0
+    data = source.read(chunk_size)
+    while data:
+        yield start, start + len(data), _decode(data), None
+        if len(data) < chunk_size:
+            break
+        tail = source.read(step)
+        if not tail:
+            break
+        data = data[step:] + tail
+        start += step
@@ -0,0 +1,237 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import json
+import math
+import time
+
+from ..storage.file_lock import FileLock, atomic_write, lock_path
+
+# Context fields identifying the monitored stream, in order of preference
+STREAM_KEY_FIELDS = ("session_id", "agent_id")
+DEFAULT_STREAM = "default"
+
+
+def stream_key(context: Optional[Dict]) -> str:
+    """Identify the agent/session a response belongs to"""
+    if context:
+        for field in STREAM_KEY_FIELDS:
+            if context.get(field) is not None:
+                return str(context[field])
+    return DEFAULT_STREAM
+
+
+class FactorStats:
+    """Incremental statistics for one risk factor of one stream
+
+    Keeps a Welford running mean/variance, an EWMA of recent values and a
+    Page-Hinkley statistic for detecting a sustained upward shift.
+    """
+
+    __slots__ = ("count", "mean", "m2", "ewma", "ph_sum", "ph_min")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 ewma: float = 0.0, ph_sum: float = 0.0, ph_min: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+        self.ph_sum = ph_sum
+        self.ph_min = ph_min
+
+    def update(self, value: float, alpha: float, delta: float) -> float:
+        """Add an observation and return the Page-Hinkley statistic"""
+        self.count += 1
+        if self.count == 1:
+            self.ewma = value
+        else:
+            self.ewma += alpha * (value - self.ewma)
+
+        difference = value - self.mean
+        self.mean += difference / self.count
+        self.m2 += difference * (value - self.mean)
+
+        self.ph_sum += value - self.mean - delta
+        self.ph_min = min(self.ph_min, self.ph_sum)
+        return self.ph_sum - self.ph_min
+
+    def reset_change_detection(self):
+        """Restart Page-Hinkley after a detected shift"""
+        self.ph_sum = 0.0
+        self.ph_min = 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_list(self) -> List[float]:
+        return [self.count, self.mean, self.m2, self.ewma, self.ph_sum, self.ph_min]
+
+    @classmethod
+    def from_list(cls, values: List[float]) -> "FactorStats":
+        return cls(int(values[0]), *values[1:])
+
+
+class DriftDetector:
+    """Per-stream temporal drift detection over risk scores
+
+    Each observation updates O(1) state per factor, so drift is flagged
+    without rescanning history. A factor drifts when its Page-Hinkley
+    statistic exceeds ``ph_threshold`` or its EWMA sits more than
+    ``ewma_zscore`` standard deviations above its long-run mean.
+
+    Like sessions, streams are bounded: at most ``max_streams`` are kept,
+    least recently seen first out, and streams idle for ``ttl_seconds``
+    are dropped. Last-seen times are wall-clock so they stay meaningful
+    in the saved state, which is bounded the same way.
+    """
+
+    def __init__(self, alpha: float = 0.1, ph_delta: float = 0.05, ph_threshold: float = 1.0,
+                 ewma_zscore: float = 3.0, min_samples: int = 30, max_streams: int = 10000,
+                 ttl_seconds: float = 7 * 24 * 3600.0, clock: Callable[[], float] = time.time):
+        self.alpha = alpha
+        self.ph_delta = ph_delta
+        self.ph_threshold = ph_threshold
+        self.ewma_zscore = ewma_zscore
+        self.min_samples = min_samples
+        self.max_streams = max(max_streams, 1)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        # Streams in last-seen order, coldest first
+        self.streams: "OrderedDict[str, Dict[str, FactorStats]]" = OrderedDict()
+        self.last_seen: Dict[str, float] = {}
+        self.stats = {"evicted": 0, "expired": 0}
+        # Streams updated since the last save
+        self._dirty: Set[str] = set()
+
+    def update(self, key: str, scores: Dict[str, float]) -> Dict:
+        """Record one observation per factor and report drifting factors"""
+        now = self.clock()
+        self._expire(now)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = {}
+            self._evict()
+        else:
+            self.streams.move_to_end(key)
+        self.last_seen[key] = now
+        self._dirty.add(key)
+        drifting = []
+        for factor, value in scores.items():
+            stats = stream.get(factor)
+            if stats is None:
+                stats = stream[factor] = FactorStats()
+            ph = stats.update(value, self.alpha, self.ph_delta)
+            if stats.count < self.min_samples:
+                continue
+
+            ewma_shift = stats.std > 0 and (stats.ewma - stats.mean) / stats.std >= self.ewma_zscore
+            if ph > self.ph_threshold or ewma_shift:
+                drifting.append(factor)
+                stats.reset_change_detection()
+
+        return {"stream": key, "drifting": bool(drifting), "factors": drifting}
+
+    def _expire(self, now: float):
+        if self.ttl_seconds <= 0:
+            return
+        while self.streams:
+            key = next(iter(self.streams))
+            if now - self.last_seen[key] < self.ttl_seconds:
+                break
+            self._drop(key)
+            self.stats["expired"] += 1
+
+    def _evict(self):
+        while len(self.streams) > self.max_streams:
+            self._drop(next(iter(self.streams)))
+            self.stats["evicted"] += 1
+
+    def _drop(self, key: str):
+        del self.streams[key]
+        del self.last_seen[key]
+        self._dirty.discard(key)
+
+    def _retained(self, entries: Dict[str, Tuple[float, Dict]], now: float) -> List[Tuple[str, float, Dict]]:
+        """Entries within the TTL and stream limit, coldest first"""
+        ordered = sorted(
+            ((key, seen, stream) for key, (seen, stream) in entries.items()
+             if self.ttl_seconds <= 0 or now - seen < self.ttl_seconds),
+            key=lambda entry: entry[1]
+        )
+        return ordered[-self.max_streams:]
+
+    def to_dict(self) -> Dict:
+        return {
+            "streams": {
+                key: {factor: stats.to_list() for factor, stats in stream.items()}
+                for key, stream in self.streams.items()
+            },
+            "last_seen": dict(self.last_seen)
+        }
+
+    def load_state(self, state: Dict):
+        """Restore saved streams, dropping expired ones and the coldest beyond the limit"""
+        now = self.clock()
+        # State saved before last-seen times were recorded counts as seen now
+        last_seen = state.get("last_seen", {})
+        retained = self._retained(
+            {key: (last_seen.get(key, now), stream) for key, stream in state.get("streams", {}).items()}, now
+        )
+        self.streams = OrderedDict(
+            (key, {factor: FactorStats.from_list(values) for factor, values in stream.items()})
+            for key, _, stream in retained
+        )
+        self.last_seen = {key: seen for key, seen, _ in retained}
+
+    def save(self, path: Path):
+        """Atomically write the detector state, merged with what other processes saved
+
+        Under the file's lock, the saved state is read back and only the
+        streams this detector updated since its last save replace their
+        saved versions. Streams other processes saved in the meantime are
+        kept, and adopted here for the streams this detector left alone.
+        The merged state is bounded by the TTL and stream limit before it
+        is written, so the file never outgrows ``max_streams`` streams.
+        """
+        path = Path(path)
+        now = self.clock()
+        lock = FileLock(lock_path(path))
+        try:
+            with lock:
+                saved = _read_state(path)
+                last_seen = saved.get("last_seen", {})
+                entries = {
+                    key: (last_seen.get(key, now), stream) for key, stream in saved.get("streams", {}).items()
+                }
+                for key in self._dirty:
+                    entries[key] = (
+                        self.last_seen[key],
+                        {factor: stats.to_list() for factor, stats in self.streams[key].items()}
+                    )
+                retained = self._retained(entries, now)
+                atomic_write(path, json.dumps({
+                    "streams": {key: stream for key, _, stream in retained},
+                    "last_seen": {key: seen for key, seen, _ in retained}
+                }, separators=(',', ':')))
+        finally:
+            lock.close()
+        self.streams = OrderedDict(
+            (key, self.streams[key] if key in self._dirty
+             else {factor: FactorStats.from_list(values) for factor, values in stream.items()})
+            for key, _, stream in retained
+        )
+        self.last_seen = {key: seen for key, seen, _ in retained}
+        self._dirty.clear()
+
+    def load(self, path: Path):
+        """Restore state saved by ``save`` if the file exists"""
+        self.load_state(_read_state(Path(path)))
+
+
+def _read_state(path: Path) -> Dict:
+    """Saved detector state, or an empty state if there is none yet"""
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
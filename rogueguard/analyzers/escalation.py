@@ -0,0 +1,71 @@
+from typing import Dict, Optional
+from collections import deque
+import math
+import random
+
+
+class EscalationPolicy:
+    """Decides which behavioral analyses are escalated to the AI agent
+
+    In ``always`` mode every analysis is escalated. In ``gated`` mode an
+    analysis is escalated when its heuristic ``total_risk`` reaches the
+    threshold, when temporal drift was detected for its stream, when it is
+    randomly sampled, or when it is anomalous compared to a rolling window
+    of recent scores.
+    """
+
+    def __init__(self, mode: str = "always", threshold: float = 0.4, sample_rate: float = 0.0,
+                 anomaly_zscore: float = 3.0, anomaly_window: int = 100, min_anomaly_samples: int = 20):
+        if mode not in ("always", "gated"):
+            raise ValueError(f"Unknown escalation mode: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.anomaly_zscore = anomaly_zscore
+        self.min_anomaly_samples = min_anomaly_samples
+        self._window = deque(maxlen=anomaly_window)
+        self.stats = {"total": 0, "escalated": 0, "skipped": 0, "by_reason": {}}
+
+    def decide(self, behavior_analysis: Dict) -> Optional[str]:
+        """Return the escalation reason, or None if the AI call can be skipped"""
+        total_risk = behavior_analysis["total_risk"]
+        drifting = behavior_analysis.get("drift", {}).get("drifting", False)
+        reason = self._reason(total_risk, drifting)
+        self._window.append(total_risk)
+
+        self.stats["total"] += 1
+        if reason is None:
+            self.stats["skipped"] += 1
+        else:
+            self.stats["escalated"] += 1
+            self.stats["by_reason"][reason] = self.stats["by_reason"].get(reason, 0) + 1
+        return reason
+
+    def _reason(self, total_risk: float, drifting: bool = False) -> Optional[str]:
+        if self.mode == "always":
+            return "always"
+        if total_risk >= self.threshold:
+            return "threshold"
+        if drifting:
+            return "drift"
+        if self._is_anomalous(total_risk):
+            return "anomaly"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def _is_anomalous(self, total_risk: float) -> bool:
+        """Check the score against the rolling window's mean and deviation"""
+        if self.anomaly_zscore <= 0 or len(self._window) < self.min_anomaly_samples:
+            return False
+        mean = sum(self._window) / len(self._window)
+        variance = sum((x - mean) ** 2 for x in self._window) / len(self._window)
+        std = math.sqrt(variance)
+        if std == 0:
+            return total_risk > mean
+        return (total_risk - mean) / std >= self.anomaly_zscore
+
+    @property
+    def escalation_rate(self) -> float:
+        """Fraction of analyses escalated to the AI agent"""
+        return self.stats["escalated"] / self.stats["total"] if self.stats["total"] else 0.0
@@ -0,0 +1,284 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+import os
+import random
+
+from ..config.settings import settings
+from .indicator_engine import IndicatorEngine
+
+ARTIFACT_VERSION = 1
+
+# Fewer confirmed examples than this cannot train a useful classifier
+MIN_TRAINING_EXAMPLES = 20
+
+# Below this many texts, TF-IDF keeps terms that occur only once
+TFIDF_MIN_DF_EXAMPLES = 50
+
+
+class RiskScorer(ABC):
+    """Interface for the per-factor scoring step of ``BehaviorAnalyzer``
+
+    ``score_batch`` returns one ``{"scores": {factor: 0..1}, "matches": [...]}``
+    dict per response, in the shape of ``IndicatorEngine.scan``. Scorers
+    without match offsets return an empty ``matches`` list.
+    """
+
+    factors: List[str] = []
+
+    @abstractmethod
+    def score_batch(self, responses: Sequence[str]) -> List[Dict]:
+        """Score each response; see the class docstring for the result shape"""
+
+
+class IndicatorScorer(RiskScorer):
+    """Phrase-matching scorer backed by an ``IndicatorEngine``"""
+
+    def __init__(self, engine: IndicatorEngine):
+        self.engine = engine
+        self.factors = engine.categories
+
+    def score_batch(self, responses: Sequence[str]) -> List[Dict]:
+        return [self.engine.scan(response) for response in responses]
+
+
+class SklearnScorer(RiskScorer):
+    """CPU-only linear classifiers, one per risk factor
+
+    The artifact written by ``train_sklearn_scorer`` holds a vectorizer and
+    a classifier per factor. It is loaded on first use, so configuring this
+    scorer costs nothing until a response is scored. Each factor's score is
+    the classifier's probability that the factor is present. Hashed n-gram
+    features cannot be traced back to text offsets, so with an ``engine``
+    the phrase matches are taken from its scan to keep prompt excerpts and
+    displays pointing at the risky spans; the scores stay the model's.
+    """
+
+    def __init__(self, model_path: Path, factors: Sequence[str], engine: Optional[IndicatorEngine] = None):
+        self.model_path = Path(model_path)
+        self.factors = list(factors)
+        self.engine = engine
+        self._artifact: Optional[Dict] = None
+
+    def load(self) -> Dict:
+        if self._artifact is None:
+            if not self.model_path.exists():
+                raise FileNotFoundError(
+                    f"No scorer model at {self.model_path}; train one with 'rogueguard train-scorer'"
+                )
+            import joblib
+            artifact = joblib.load(self.model_path)
+            if artifact.get("version") != ARTIFACT_VERSION:
+                raise ValueError(f"Unsupported scorer model version in {self.model_path}")
+            self._artifact = artifact
+        return self._artifact
+
+    def predict(self, responses: Sequence[str]) -> Dict[str, List[float]]:
+        """Probability per factor for every response, in one vectorized pass"""
+        artifact = self.load()
+        features = artifact["vectorizer"].transform(responses)
+        probabilities = {}
+        for factor in self.factors:
+            model = artifact["models"].get(factor)
+            if model is None:
+                probabilities[factor] = [artifact["priors"].get(factor, 0.0)] * len(responses)
+            else:
+                probabilities[factor] = model.predict_proba(features)[:, 1].tolist()
+        return probabilities
+
+    def score_batch(self, responses: Sequence[str]) -> List[Dict]:
+        if not responses:
+            return []
+        probabilities = self.predict(responses)
+        return [
+            {
+                "scores": {factor: probabilities[factor][i] for factor in self.factors},
+                "matches": self.engine.scan(response)["matches"] if self.engine is not None else []
+            }
+            for i, response in enumerate(responses)
+        ]
+
+
+class HybridScorer(RiskScorer):
+    """Weighted blend of phrase matching and the learned classifiers
+
+    Indicator match offsets are kept, so prompt excerpts and displays still
+    point at the matched phrases.
+    """
+
+    def __init__(self, indicator: IndicatorScorer, model: SklearnScorer, model_weight: float = 0.5):
+        self.indicator = indicator
+        self.model = model
+        self.model_weight = model_weight
+        self.factors = indicator.factors
+
+    def score_batch(self, responses: Sequence[str]) -> List[Dict]:
+        if not responses:
+            return []
+        scans = self.indicator.score_batch(responses)
+        probabilities = self.model.predict(responses)
+        weight = self.model_weight
+        for i, scan in enumerate(scans):
+            scan["scores"] = {
+                factor: (1 - weight) * score + weight * probabilities[factor][i]
+                if factor in probabilities else score
+                for factor, score in scan["scores"].items()
+            }
+        return scans
+
+
+def default_model_path() -> Path:
+    return settings.SCORER_MODEL_FILE or settings.DATA_DIR / "models" / "scorer.joblib"
+
+
+def create_scorer(kind: Optional[str] = None, engine: Optional[IndicatorEngine] = None) -> RiskScorer:
+    """Build the scorer selected by ``settings.SCORER``"""
+    kind = kind or settings.SCORER
+    engine = engine or IndicatorEngine()
+    if kind == "indicator":
+        return IndicatorScorer(engine)
+    if kind == "sklearn":
+        return SklearnScorer(default_model_path(), engine.categories, engine=engine)
+    if kind == "hybrid":
+        return HybridScorer(
+            IndicatorScorer(engine),
+            SklearnScorer(default_model_path(), engine.categories),
+            model_weight=settings.SCORER_MODEL_WEIGHT
+        )
+    raise ValueError(f"Unknown scorer: {kind}")
+
+
+def training_examples(analyses: Iterable[Dict], factors: Sequence[str],
+                      threshold: float = 0.5) -> Tuple[List[str], Dict[str, List[Optional[int]]]]:
+    """Extract response texts and per-factor binary labels from saved analyses
+
+    Only analyses saved with their ``response`` text (``OUTPUT_STORE_RESPONSE``)
+    and with confirmed labels are used, so the model does not just relearn
+    the phrase matcher. Confirmed scores are a human ``label`` object's
+    ``risk_scores``, else the per-factor scores of a structured model
+    analysis that was not skipped. A factor neither source scored is
+    labelled None and left out of that factor's training.
+    """
+    texts: List[str] = []
+    labels: Dict[str, List[Optional[int]]] = {factor: [] for factor in factors}
+    for analysis in analyses:
+        response = analysis.get("response")
+        if not isinstance(response, str) or not response:
+            continue
+        scores = confirmed_scores(analysis)
+        if not scores:
+            continue
+        texts.append(response)
+        for factor in factors:
+            score = scores.get(factor)
+            labels[factor].append(int(score >= threshold) if isinstance(score, (int, float)) else None)
+    return texts, labels
+
+
+def confirmed_scores(analysis: Dict) -> Dict[str, float]:
+    """Per-factor scores confirmed by a human label or the model, empty if neither"""
+    label = analysis.get("label")
+    if isinstance(label, dict) and isinstance(label.get("risk_scores"), dict):
+        return label["risk_scores"]
+    ai_analysis = analysis.get("ai_analysis") or {}
+    if ai_analysis.get("skipped") or not ai_analysis.get("structured"):
+        return {}
+    scores = ai_analysis.get("risk_scores")
+    return scores if isinstance(scores, dict) else {}
+
+
+def train_sklearn_scorer(texts: List[str], labels: Dict[str, List[Optional[int]]], output: Path,
+                         vectorizer: str = "hashing", holdout: float = 0.2, seed: int = 0,
+                         min_examples: int = MIN_TRAINING_EXAMPLES) -> Dict:
+    """Fit one logistic regression per factor and write the model artifact
+
+    ``vectorizer`` is ``hashing`` (stateless, fixed memory) or ``tfidf``.
+    A random ``holdout`` fraction is scored for precision and recall before
+    the final models are refit on every example. Each factor is trained on
+    the examples with a known label for it. Raises ValueError with fewer
+    than ``min_examples`` examples. Returns the artifact's metadata.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import precision_score, recall_score
+    import joblib
+
+    if len(texts) < max(min_examples, 1):
+        raise ValueError(
+            f"Only {len(texts)} saved analyses have confirmed labels; at least {min_examples} are needed. "
+            "Save analyses with OUTPUT_STORE_RESPONSE=true and structured model output, or add human labels"
+        )
+
+    def make_vectorizer(count: int):
+        if vectorizer == "hashing":
+            return HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False, norm="l2")
+        if vectorizer == "tfidf":
+            # Dropping one-off terms only helps once there is enough text for terms to repeat
+            return TfidfVectorizer(ngram_range=(1, 2), min_df=2 if count >= TFIDF_MIN_DF_EXAMPLES else 1,
+                                   max_features=200_000, sublinear_tf=True)
+        raise ValueError(f"Unknown vectorizer: {vectorizer}")
+
+    def fit(indices: List[int]):
+        vec = make_vectorizer(len(indices))
+        features = vec.fit_transform([texts[i] for i in indices])
+        models = {}
+        for factor, values in labels.items():
+            rows = [row for row, i in enumerate(indices) if values[i] is not None]
+            targets = [values[indices[row]] for row in rows]
+            if len(set(targets)) < 2:
+                models[factor] = None
+                continue
+            model = LogisticRegression(solver="liblinear", class_weight="balanced", max_iter=1000)
+            models[factor] = model.fit(features[rows], targets)
+        return vec, models
+
+    indices = list(range(len(texts)))
+    random.Random(seed).shuffle(indices)
+    split = int(len(indices) * (1 - holdout)) if holdout > 0 and len(indices) >= 10 else len(indices)
+    train_indices, test_indices = indices[:split], indices[split:]
+
+    evaluation = {}
+    if test_indices:
+        vec, models = fit(train_indices)
+        test_features = vec.transform([texts[i] for i in test_indices])
+        for factor, model in models.items():
+            rows = [row for row, i in enumerate(test_indices) if labels[factor][i] is not None]
+            if model is None or not rows:
+                continue
+            truth = [labels[factor][test_indices[row]] for row in rows]
+            predicted = model.predict(test_features[rows])
+            evaluation[factor] = {
+                "precision": round(float(precision_score(truth, predicted, zero_division=0)), 4),
+                "recall": round(float(recall_score(truth, predicted, zero_division=0)), 4),
+                "positives": sum(truth)
+            }
+
+    vec, models = fit(indices)
+    metadata = {
+        "version": ARTIFACT_VERSION,
+        "trained_at": datetime.now().isoformat(),
+        "vectorizer_kind": vectorizer,
+        "examples": len(texts),
+        "factors": list(labels),
+        "evaluation": evaluation
+    }
+    artifact = {
+        **metadata,
+        "vectorizer": vec,
+        "models": models,
+        "priors": {factor: _prior(values) for factor, values in labels.items()}
+    }
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output.with_suffix(output.suffix + f".{os.getpid()}.tmp")
+    joblib.dump(artifact, temp_path)
+    os.replace(temp_path, output)
+    return metadata
+
+
+def _prior(values: List[Optional[int]]) -> float:
+    """Share of positive labels among the known ones"""
+    known = [value for value in values if value is not None]
+    return sum(known) / len(known) if known else 0.0
@@ -0,0 +1,245 @@
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from array import array
+from collections import OrderedDict
+import math
+import time
+
+RISK_LEVEL_CODES = {"LOW": 0, "MODERATE": 1, "HIGH": 2, "CRITICAL": 3}
+RISK_LEVEL_NAMES = {code: name for name, code in RISK_LEVEL_CODES.items()}
+
+# Factor scores at or above this are counted as flagged for a turn
+FLAG_THRESHOLD = 0.5
+
+
+class SessionState:
+    """Fixed-size ring buffer of recent turns for one session
+
+    Scores are stored row by row in a single float32 array, with parallel
+    arrays for total risk, risk level codes and a bitmask of flagged
+    factors. Memory per session is fixed by ``capacity`` no matter how many
+    turns the session has. Running sums of the window's totals and
+    per-factor flag counts are kept as turns enter and leave the buffer,
+    so the consistency checks do not rescan it.
+    """
+
+    __slots__ = ("key", "factors", "capacity", "created", "last_seen", "turns",
+                 "_scores", "_totals", "_levels", "_flags", "_head", "_size",
+                 "_sum", "_sum_squares", "_flag_counts")
+
+    def __init__(self, key: str, factors: Sequence[str], capacity: int, now: float):
+        self.key = key
+        self.factors = factors
+        self.capacity = capacity
+        self.created = now
+        self.last_seen = now
+        self.turns = 0
+        self._scores = array('f', bytes(4 * capacity * len(factors)))
+        self._totals = array('f', bytes(4 * capacity))
+        self._levels = array('B', bytes(capacity))
+        self._flags = array('I', bytes(4 * capacity))
+        self._head = 0
+        self._size = 0
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self._flag_counts = [0] * len(factors)
+
+    def record(self, scores: Dict[str, float], total_risk: float, risk_level: str, now: float):
+        """Add a turn, overwriting the oldest one once the buffer is full"""
+        slot = self._head
+        width = len(self.factors)
+        if self._size == self.capacity:
+            self._forget(slot)
+        flags = 0
+        for i, factor in enumerate(self.factors):
+            value = scores.get(factor, 0.0)
+            self._scores[slot * width + i] = value
+            if value >= FLAG_THRESHOLD:
+                flags |= 1 << i
+                self._flag_counts[i] += 1
+        self._totals[slot] = total_risk
+        stored = self._totals[slot]
+        self._sum += stored
+        self._sum_squares += stored * stored
+        self._levels[slot] = RISK_LEVEL_CODES.get(risk_level, 0)
+        self._flags[slot] = flags
+        self._head = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.turns += 1
+        self.last_seen = now
+
+    def _forget(self, slot: int):
+        """Remove the turn in ``slot`` from the running sums"""
+        stored = self._totals[slot]
+        self._sum -= stored
+        self._sum_squares -= stored * stored
+        flags = self._flags[slot]
+        for i in range(len(self.factors)):
+            if flags >> i & 1:
+                self._flag_counts[i] -= 1
+
+    def _slots(self, last: Optional[int] = None) -> Iterator[int]:
+        """Buffer positions from oldest to newest"""
+        count = self._size if last is None else min(last, self._size)
+        start = (self._head - count) % self.capacity
+        return ((start + i) % self.capacity for i in range(count))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def total_risks(self, last: Optional[int] = None) -> List[float]:
+        return [self._totals[slot] for slot in self._slots(last)]
+
+    def total_risk_stats(self) -> Tuple[float, float]:
+        """Mean and standard deviation of total risk over the window"""
+        if not self._size:
+            return 0.0, 0.0
+        mean = self._sum / self._size
+        return mean, math.sqrt(max(self._sum_squares / self._size - mean * mean, 0.0))
+
+    def seen_factors(self) -> List[str]:
+        """Factors flagged at least once in the window"""
+        return [factor for factor, count in zip(self.factors, self._flag_counts) if count]
+
+    def flagged_factors(self, last: Optional[int] = None) -> List[List[str]]:
+        """Factors at or above the flag threshold, per turn"""
+        return [
+            [factor for i, factor in enumerate(self.factors) if self._flags[slot] >> i & 1]
+            for slot in self._slots(last)
+        ]
+
+    def recent(self, last: Optional[int] = None) -> List[Dict]:
+        """Recent turns as dicts, oldest first"""
+        width = len(self.factors)
+        return [
+            {
+                "risk_scores": {
+                    factor: round(self._scores[slot * width + i], 6) for i, factor in enumerate(self.factors)
+                },
+                "total_risk": round(self._totals[slot], 6),
+                "risk_level": RISK_LEVEL_NAMES[self._levels[slot]]
+            }
+            for slot in self._slots(last)
+        ]
+
+    def summary(self) -> Dict:
+        totals = self.total_risks()
+        return {
+            "session": self.key,
+            "turns": self.turns,
+            "window": len(totals),
+            "mean_total_risk": round(sum(totals) / len(totals), 6) if totals else 0.0,
+            "max_total_risk": round(max(totals), 6) if totals else 0.0,
+            "max_risk_level": RISK_LEVEL_NAMES[max(self._levels[slot] for slot in self._slots())] if totals else "LOW"
+        }
+
+
+# A consistency check inspects a session before the current turn is recorded
+# and returns a description of the inconsistency, or None
+SessionCheck = Callable[[SessionState, Dict[str, float], float], Optional[str]]
+
+
+def risk_spike_check(zscore: float = 3.0, min_turns: int = 5, min_std: float = 0.05,
+                     min_delta: float = 0.1) -> SessionCheck:
+    """Flag a turn whose total risk is far above the session's recent turns
+
+    The deviation is measured against at least ``min_std``, and the rise
+    must be at least ``min_delta``, so a session with flat scores does not
+    alert on a rise of 0.01.
+    """
+    def check(session: SessionState, scores: Dict[str, float], total_risk: float) -> Optional[str]:
+        if len(session) < min_turns:
+            return None
+        mean, std = session.total_risk_stats()
+        rise = total_risk - mean
+        if rise >= min_delta and rise / max(std, min_std) >= zscore:
+            return f"Risk spike in session: {total_risk:.2f} vs recent mean {mean:.2f}"
+        return None
+    return check
+
+
+def escalating_risk_check(turns: int = 3) -> SessionCheck:
+    """Flag total risk that has risen on each of the last ``turns`` turns"""
+    def check(session: SessionState, scores: Dict[str, float], total_risk: float) -> Optional[str]:
+        totals = session.total_risks(turns) + [total_risk]
+        if len(totals) <= turns:
+            return None
+        if all(later > earlier for earlier, later in zip(totals, totals[1:])):
+            return f"Risk escalating over the last {turns + 1} turns"
+        return None
+    return check
+
+
+def new_factor_check(min_turns: int = 5) -> SessionCheck:
+    """Flag a factor that appears after staying clear for the whole window"""
+    def check(session: SessionState, scores: Dict[str, float], total_risk: float) -> Optional[str]:
+        if len(session) < min_turns:
+            return None
+        seen = set(session.seen_factors())
+        new = [
+            factor for factor in session.factors
+            if scores.get(factor, 0.0) >= FLAG_THRESHOLD and factor not in seen
+        ]
+        if new:
+            return "New behavior in session: " + ", ".join(factor.replace('_', ' ') for factor in new)
+        return None
+    return check
+
+
+class SessionManager:
+    """Bounded per-session state keyed by session or agent ID
+
+    At most ``max_sessions`` sessions are kept; the least recently seen is
+    evicted first, and sessions idle for longer than ``ttl_seconds`` are
+    dropped. Because sessions are kept in last-seen order, expiry only
+    inspects the coldest entries, so each observation costs O(window).
+    """
+
+    def __init__(self, factors: Sequence[str], window: int = 32, max_sessions: int = 10000,
+                 ttl_seconds: float = 3600.0, checks: Optional[List[SessionCheck]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.factors = tuple(factors)
+        self.window = max(window, 1)
+        self.max_sessions = max(max_sessions, 1)
+        self.ttl_seconds = ttl_seconds
+        self.checks = checks if checks is not None else [
+            risk_spike_check(), escalating_risk_check(), new_factor_check()
+        ]
+        self.clock = clock
+        self.sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.stats = {"evicted": 0, "expired": 0}
+
+    def observe(self, key: str, scores: Dict[str, float], total_risk: float, risk_level: str) -> Dict:
+        """Run the consistency checks for a new turn, then record it"""
+        now = self.clock()
+        self._expire(now)
+        session = self.sessions.get(key)
+        if session is None:
+            session = self.sessions[key] = SessionState(key, self.factors, self.window, now)
+            self._evict()
+        else:
+            self.sessions.move_to_end(key)
+
+        findings = [finding for finding in (check(session, scores, total_risk) for check in self.checks) if finding]
+        session.record(scores, total_risk, risk_level, now)
+        return {"session": key, "turn": session.turns, "findings": findings}
+
+    def get(self, key: str) -> Optional[SessionState]:
+        return self.sessions.get(key)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def _expire(self, now: float):
+        if self.ttl_seconds <= 0:
+            return
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if now - session.last_seen < self.ttl_seconds:
+                break
+            del self.sessions[key]
+            self.stats["expired"] += 1
+
+    def _evict(self):
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.stats["evicted"] += 1
@@ -1,12 +1,52 @@
 import click
 from rich.console import Console
-from .models.guard import RogueGuard
-from .config.settings import settings
+from typing import Optional
 import os
 import sys
 
+# RogueGuard, settings and the storage backends are imported inside the
+# commands that need them so `--help` and `configure` start quickly
+
 console = Console()
 
+def _create_guard(no_cache: bool = False, clear_cache: bool = False) -> "RogueGuard":
+    """Build a RogueGuard honoring the cache command-line flags"""
+    from .models.guard import RogueGuard
+    from .config.settings import settings
+    from .storage.analysis_cache import AnalysisCache, CACHE_FILENAME
+    
+    guard = RogueGuard(use_cache=False if no_cache else None)
+    if clear_cache:
+        if guard.cache is not None:
+            guard.cache.clear()
+        else:
+            # The guard runs without a cache, so the cache file is opened only to clear it
+            cache = AnalysisCache(settings.CACHE_DIR / CACHE_FILENAME)
+            try:
+                cache.clear()
+            finally:
+                cache.close()
+        console.print("[green]AI analysis cache cleared[/green]")
+    return guard
+
+def _enable_metrics(metrics_file: Optional[str]):
+    """Turn on instrumentation when metrics will be written"""
+    if metrics_file:
+        from .metrics import metrics
+        metrics.enabled = True
+
+def _write_metrics(guard: "RogueGuard", metrics_file: Optional[str]):
+    """Write a JSON snapshot (``.json``) or Prometheus text export of the guard's metrics"""
+    if not metrics_file:
+        return
+    with open(metrics_file, 'w') as f:
+        if metrics_file.endswith('.json'):
+            import json
+            json.dump(guard.metrics.snapshot(), f, indent=2)
+        else:
+            f.write(guard.metrics.to_prometheus())
+    console.print(f"[dim]Metrics written to {metrics_file}[/dim]")
+
 @click.group()
 def cli():
     """RogueGuard - Advanced AI Behavior Analysis System"""
@@ -23,52 +63,399 @@ def configure(api_key):
         console.print("[yellow]Please provide an API key using --api-key[/yellow]")
 
 @cli.command()
-def monitor():
+@click.option('--no-cache', is_flag=True, help='Bypass the AI analysis cache')
+@click.option('--clear-cache', is_flag=True, help='Clear the AI analysis cache before starting')
+def monitor(no_cache, clear_cache):
     """Start interactive monitoring session"""
     try:
         if not os.getenv('OPENAI_API_KEY'):
             console.print("[red]Error: OpenAI API key not found. Use 'rogueguard configure --api-key YOUR_KEY' to set it.[/red]")
             sys.exit(1)
-            
+        
         console.print("[bold red]RogueWatch - AI Behavior Analysis System[/bold red]")
         console.print("[italic]Type 'exit' to quit[/italic]\n")
         
-        guard = RogueGuard()
+        guard = _create_guard(no_cache, clear_cache)
         
-        while True:
-            try:
-                user_input = input("🔍 > ")
-                if user_input.lower() == 'exit':
-                    break
+        try:
+            while True:
+                try:
+                    user_input = input("🔍 > ")
+                    if user_input.lower() == 'exit':
+                        break
+                    
+                    analysis = guard.analyze_interaction(user_input)
+                    guard.display_analysis(analysis)
+                    print()
                 
-                analysis = guard.analyze_interaction(user_input)
-                guard.display_analysis(analysis)
-                print()
-                
-            except KeyboardInterrupt:
-                break
-            except Exception as e:
-                console.print(f"[red]Error: {str(e)}[/red]")
+                except KeyboardInterrupt:
+                    break
+                except Exception as e:
+                    console.print(f"[red]Error: {str(e)}[/red]")
+        finally:
+            guard.close()
         
         console.print("\n[bold red]Shutting down RogueWatch. Stay vigilant![/bold red]")
-        
+    
     except Exception as e:
         console.print(f"[red]Fatal error: {str(e)}[/red]")
         sys.exit(1)
 
 @cli.command()
 @click.argument('file', type=click.Path(exists=True))
-def analyze_file(file):
+@click.option('--no-cache', is_flag=True, help='Bypass the AI analysis cache')
+@click.option('--clear-cache', is_flag=True, help='Clear the AI analysis cache before analyzing')
+@click.option('--stream/--no-stream', default=None,
+              help='Analyze the file in chunks (default: only files above STREAM_FILE_THRESHOLD_BYTES)')
+@click.option('--mode', type=click.Choice(['lines', 'jsonl', 'window']), default='lines',
+              help='How streamed files are split into chunks')
+@click.option('--chunk-size', type=int, default=None, help='Chunk size in bytes')
+@click.option('--overlap', type=int, default=None, help='Overlap between window chunks in bytes')
+@click.option('--no-mmap', is_flag=True, help='Read streamed files without memory mapping')
+@click.option('--server', 'server_url', default=None,
+              help='Send the file to a running `rogueguard serve` (http://host:port or unix:///path)')
+@click.option('--profile', is_flag=True, help='Profile the analysis with cProfile and tracemalloc')
+@click.option('--metrics-file', type=click.Path(dir_okay=False), default=None,
+              help='Write stage timings and counters (.json snapshot, otherwise Prometheus text)')
+def analyze_file(file, no_cache, clear_cache, stream, mode, chunk_size, overlap, no_mmap, server_url,
+                 profile, metrics_file):
     """Analyze AI responses from a file"""
     try:
-        guard = RogueGuard()
+        if server_url:
+            if stream:
+                raise click.UsageError("--stream is not supported with --server")
+            from .server import AnalysisClient
+            from .display import display_analysis
+            
+            with open(file, 'r') as f:
+                content = f.read()
+            client = AnalysisClient(server_url)
+            try:
+                display_analysis(client.analyze(content))
+            finally:
+                client.close()
+            return
+        
+        from .config.settings import settings
+        from .metrics import profile_call
+        
+        _enable_metrics(metrics_file)
+        guard = _create_guard(no_cache, clear_cache)
+        try:
+            if stream is None:
+                stream = os.path.getsize(file) > settings.STREAM_FILE_THRESHOLD_BYTES
+            
+            if stream:
+                run = lambda: guard.analyze_file_stream(
+                    file, mode=mode, chunk_size=chunk_size, overlap=overlap, use_mmap=not no_mmap
+                )
+            else:
+                with open(file, 'r') as f:
+                    content = f.read()
+                run = lambda: guard.analyze_interaction(content)
+            
+            if profile:
+                analysis, report = profile_call(run)
+            else:
+                analysis = run()
+            
+            guard.display_analysis(analysis)
+            
+            if profile:
+                console.print(f"\n[bold blue]Profile ({report['wall_seconds']:.3f}s wall):[/bold blue]")
+                if "memory" in report:
+                    console.print(f"Peak traced memory: {report['memory']['peak_bytes'] / 1024 / 1024:.1f} MiB")
+                    for allocation in report["memory"]["top_allocations"][:10]:
+                        console.print(f"• {allocation['location']}: {allocation['size_bytes'] / 1024:.1f} KiB")
+                console.print(report["cprofile"], markup=False, highlight=False, soft_wrap=True)
+            _write_metrics(guard, metrics_file)
+        finally:
+            guard.close()
+    
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        sys.exit(1)
+
+@cli.command()
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--glob', 'pattern', default='*', help='Glob pattern selecting files to analyze')
+@click.option('--recursive', is_flag=True, help='Match files in subdirectories too')
+@click.option('--workers', type=int, default=None, help='Worker processes for behavioral scoring')
+@click.option('--mode', type=click.Choice(['lines', 'jsonl', 'window']), default='lines',
+              help='How files are split into chunks')
+@click.option('--chunk-size', type=int, default=None, help='Chunk size in bytes')
+@click.option('--overlap', type=int, default=None, help='Overlap between window chunks in bytes')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), default=None,
+              help='Checkpoint file used to resume interrupted runs')
+@click.option('--no-cache', is_flag=True, help='Bypass the AI analysis cache')
+@click.option('--metrics-file', type=click.Path(dir_okay=False), default=None,
+              help='Write stage timings and counters (.json snapshot, otherwise Prometheus text)')
+def analyze_dir(directory, pattern, recursive, workers, mode, chunk_size, overlap, checkpoint, no_cache, metrics_file):
+    """Analyze every transcript in a directory in parallel"""
+    try:
+        from rich.progress import Progress
         
-        with open(file, 'r') as f:
-            content = f.read()
+        _enable_metrics(metrics_file)
+        guard = _create_guard(no_cache)
+        try:
+            with Progress(console=console) as progress:
+                task = progress.add_task("Analyzing files", total=None)
+                
+                def report_progress(completed, total, file):
+                    progress.update(task, completed=completed, total=total, description=f"Analyzing {os.path.basename(file)}")
+                
+                summary = guard.analyze_directory(
+                    directory, pattern,
+                    recursive=recursive,
+                    workers=workers,
+                    mode=mode,
+                    chunk_size=chunk_size,
+                    overlap=overlap,
+                    checkpoint=checkpoint,
+                    progress=report_progress
+                )
             
-        analysis = guard.analyze_interaction(content)
-        guard.display_analysis(analysis)
+            guard.display_directory_summary(summary)
+            _write_metrics(guard, metrics_file)
+        finally:
+            guard.close()
+    
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        sys.exit(1)
+
+@cli.command()
+@click.option('--host', default=None, help='Interface to listen on (default: SERVER_HOST)')
+@click.option('--port', type=int, default=None, help='TCP port to listen on (default: SERVER_PORT)')
+@click.option('--socket', 'socket_path', type=click.Path(dir_okay=False), default=None,
+              help='Listen on a Unix socket instead of TCP')
+@click.option('--queue-size', type=int, default=None,
+              help='Interactions accepted but unfinished before requests are rejected')
+@click.option('--no-cache', is_flag=True, help='Bypass the AI analysis cache')
+def serve(host, port, socket_path, queue_size, no_cache):
+    """Serve analyses over local HTTP from one warm RogueGuard"""
+    try:
+        from .server import serve as run_server
         
+        guard = _create_guard(no_cache)
+        run_server(
+            guard,
+            host=host,
+            port=port,
+            socket_path=socket_path,
+            queue_size=queue_size,
+            ready=lambda address: console.print(f"[green]RogueGuard listening on {address}[/green] (Ctrl+C to stop)")
+        )
+        console.print("[bold red]RogueGuard server stopped; history and analyses flushed[/bold red]")
+        
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        sys.exit(1)
+
+@cli.command('train-scorer')
+@click.argument('paths', nargs=-1, type=click.Path(exists=True))
+@click.option('--vectorizer', type=click.Choice(['hashing', 'tfidf']), default='hashing',
+              help='Feature extraction: stateless hashing or a fitted TF-IDF vocabulary')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Model file to write (default: SCORER_MODEL_FILE)')
+@click.option('--threshold', type=float, default=0.5, help='Factor score counted as a positive label')
+@click.option('--holdout', type=float, default=0.2, help='Fraction of examples held out for evaluation')
+@click.option('--min-examples', type=int, default=None,
+              help='Confirmed examples required before training (default: 20)')
+def train_scorer(paths, vectorizer, output, threshold, holdout, min_examples):
+    """Train the learned risk scorer from saved analyses
+
+    PATHS are analysis files or directories (default: ANALYSIS_DIR). Only
+    analyses saved with OUTPUT_STORE_RESPONSE=true carry the text needed,
+    and only those with model- or human-confirmed scores are used.
+    """
+    try:
+        from .analyzers.indicator_engine import IndicatorEngine
+        from .analyzers.scorers import (
+            MIN_TRAINING_EXAMPLES, default_model_path, train_sklearn_scorer, training_examples
+        )
+        from .config.settings import settings
+        from .storage.analysis_sink import iter_saved_analyses
+
+        engine = (
+            IndicatorEngine.from_file(settings.INDICATOR_TABLE_FILE)
+            if settings.INDICATOR_TABLE_FILE else IndicatorEngine()
+        )
+        texts, labels = training_examples(iter_saved_analyses(paths or None), engine.categories, threshold)
+        console.print(f"Training on {len(texts)} saved responses with confirmed labels")
+
+        output = output or default_model_path()
+        metadata = train_sklearn_scorer(
+            texts, labels, output, vectorizer=vectorizer, holdout=holdout,
+            min_examples=MIN_TRAINING_EXAMPLES if min_examples is None else min_examples
+        )
+
+        for factor in metadata["factors"]:
+            result = metadata["evaluation"].get(factor)
+            if result is None:
+                console.print(f"  {factor}: [dim]not evaluated (one class only or too few examples)[/dim]")
+            else:
+                console.print(
+                    f"  {factor}: precision {result['precision']:.2f}, recall {result['recall']:.2f} "
+                    f"({result['positives']} held-out positives)"
+                )
+        console.print(f"[green]Scorer model written to {output}[/green]")
+
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        sys.exit(1)
+
+def _parse_time(value: Optional[str]) -> Optional[str]:
+    """ISO timestamp from an ISO date/time or a relative age such as 30m, 24h, 7d or 2w"""
+    if not value:
+        return None
+    from datetime import datetime, timedelta
+    units = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+    if value[-1] in units and value[:-1].replace('.', '', 1).isdigit():
+        return (datetime.now() - timedelta(**{units[value[-1]]: float(value[:-1])})).isoformat()
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise click.BadParameter(f"expected an ISO date/time or an age like 7d, got {value!r}")
+
+@cli.command()
+@click.option('--since', default=None, help='Start time: ISO date/time or age such as 24h or 7d')
+@click.option('--until', default=None, help='End time: ISO date/time or age')
+@click.option('--level', 'levels', multiple=True,
+              type=click.Choice(['LOW', 'MODERATE', 'HIGH', 'CRITICAL'], case_sensitive=False),
+              help='Risk level to include (repeatable)')
+@click.option('--min-risk', type=float, default=None, help='Minimum behavioral total risk')
+@click.option('--max-risk', type=float, default=None, help='Maximum behavioral total risk')
+@click.option('--session', default=None, help='Session or agent ID')
+@click.option('--file', 'file_filter', default=None, help='Substring of the analyzed file or directory path')
+@click.option('--kind', type=click.Choice(['interaction', 'file', 'directory']), default=None)
+@click.option('--group-by', type=click.Choice(['risk_level', 'session', 'kind', 'file', 'day', 'hour']),
+              default=None, help='Aggregate matching analyses instead of listing them')
+@click.option('--order', type=click.Choice(['newest', 'oldest', 'risk']), default='newest')
+@click.option('--limit', type=int, default=100, help='Maximum rows to list; 0 lists all')
+@click.option('--format', 'output_format', type=click.Choice(['table', 'csv', 'jsonl']), default='table')
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Write results to a file')
+@click.option('--full', is_flag=True, help='Export the complete analyses (jsonl only)')
+@click.option('--no-refresh', is_flag=True, help='Query the index without ingesting new results first')
+def query(since, until, levels, min_risk, max_risk, session, file_filter, kind, group_by, order, limit,
+          output_format, output, full, no_refresh):
+    """Search saved analyses through an incrementally built SQLite index"""
+    if output and output_format == 'table':
+        raise click.UsageError("--output needs --format csv or jsonl; tables are only printed")
+    try:
+        import contextlib
+        import csv
+        import json
+        from .storage.analysis_index import COLUMNS, AnalysisIndex
+
+        index = AnalysisIndex()
+        if not no_refresh:
+            added = index.refresh()
+            if added["analyses"]:
+                click.echo(f"Indexed {added['analyses']} new analyses from {added['files']} files", err=True)
+        filters = {
+            "since": _parse_time(since), "until": _parse_time(until), "risk_levels": list(levels),
+            "min_risk": min_risk, "max_risk": max_risk, "session": session, "file": file_filter, "kind": kind
+        }
+
+        if group_by:
+            rows = index.aggregate(group_by, **filters)
+            columns = [group_by, "count", "mean_total_risk", "max_total_risk", "first", "last"]
+        else:
+            rows = index.query(order=order, limit=limit or None, **filters)
+            columns = list(COLUMNS)
+
+        if output_format == 'table':
+            from rich.table import Table
+            if not group_by:
+                columns = ["analysis_id", "timestamp", "kind", "risk_level", "total_risk", "session", "file"]
+            table = Table(*columns)
+            shown = 0
+            for row in rows:
+                table.add_row(*(
+                    "" if row[column] is None else f"{row[column]:.3f}" if isinstance(row[column], float)
+                    else str(row[column])
+                    for column in columns
+                ))
+                shown += 1
+            console.print(table)
+            if group_by:
+                console.print(f"[dim]{shown} groups[/dim]")
+            else:
+                console.print(f"[dim]{shown} of {index.count(**filters)} matching analyses[/dim]")
+            return
+
+        # Only a file opened here is closed afterwards, never the process's stdout
+        stdout = contextlib.nullcontext(click.get_text_stream('stdout'))
+        with (open(output, 'w', newline='') if output else stdout) as f:
+            if output_format == 'jsonl':
+                for row in rows:
+                    record = index.load(row["analysis_id"]) if full and not group_by else row
+                    f.write(json.dumps(record if record is not None else row, default=str) + "\n")
+            else:
+                writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+
+    except click.UsageError:
+        raise
+    except Exception as e:
+        console.print(f"[red]Error: {str(e)}[/red]")
+        sys.exit(1)
+
+@cli.command()
+@click.argument('source', default='-')
+@click.option('--follow/--no-follow', default=True,
+              help='Keep reading a file or named pipe as it grows (default: follow)')
+@click.option('--from-start', is_flag=True, help='Read a followed file from the beginning instead of the end')
+@click.option('--text-field', default=None, help='JSON field holding the text to analyze')
+@click.option('--alert-level', type=click.Choice(['LOW', 'MODERATE', 'HIGH', 'CRITICAL'], case_sensitive=False),
+              default=None, help='Lowest risk level that raises an alert (default: MONITOR_ALERT_LEVEL)')
+@click.option('--summary-interval', type=float, default=None, help='Seconds between summaries')
+@click.option('--output', type=click.Path(dir_okay=False), default=None,
+              help='Append alerts and summaries to a file instead of stdout')
+@click.option('--no-escalate', is_flag=True, help='Never call the model; heuristic analysis only')
+@click.option('--no-cache', is_flag=True, help='Bypass the AI analysis cache')
+def watch(source, follow, from_start, text_field, alert_level, summary_interval, output, no_escalate, no_cache):
+    """Monitor a stream of JSONL interactions from stdin, a named pipe or a log file
+
+    Alerts and periodic summaries are written as JSON lines.
+    """
+    try:
+        import asyncio
+        import json
+        import signal
+        from .stream_monitor import StreamMonitor, open_source
+
+        guard = _create_guard(no_cache)
+        out = open(output, 'a') if output else sys.stdout
+
+        def emit(event):
+            out.write(json.dumps(event, default=str) + "\n")
+            out.flush()
+
+        monitor = StreamMonitor(
+            guard,
+            emit,
+            text_field=text_field,
+            alert_level=alert_level,
+            escalate=not no_escalate,
+            summary_interval=summary_interval
+        )
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, monitor.stop)
+            await monitor.run(open_source(source, follow, from_start, monitor.stop_event))
+
+        try:
+            asyncio.run(run())
+        finally:
+            guard.close()
+            if output:
+                out.close()
+
     except Exception as e:
         console.print(f"[red]Error: {str(e)}[/red]")
         sys.exit(1)
@@ -14,17 +14,125 @@ class Settings(BaseSettings):
     RISK_THRESHOLD_CRITICAL: float = 0.8
     RISK_THRESHOLD_HIGH: float = 0.6
     RISK_THRESHOLD_MODERATE: float = 0.4
+    FUSION_MODEL_WEIGHT: float = 0.5  # share of the model's scores in the final risk of escalated analyses
     
     # Storage Settings
     DATA_DIR: Path = Path.home() / ".rogueguard"
     LOG_DIR: Path = DATA_DIR / "logs"
     ANALYSIS_DIR: Path = DATA_DIR / "analysis"
+    CACHE_DIR: Path = DATA_DIR / "cache"
+    
+    # History Settings
+    HISTORY_BACKEND: str = "jsonl"  # "jsonl" (segmented, append-only) or "json" (legacy)
+    HISTORY_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024
+    HISTORY_MAX_SEGMENTS: int = 0  # 0 keeps every segment
+    HISTORY_TAIL_SIZE: int = 1000
+    
+    # LLM Concurrency Settings
+    LLM_MAX_IN_FLIGHT: int = 8
+    LLM_REQUESTS_PER_MINUTE: int = 0  # 0 disables rate limiting
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BACKOFF: float = 1.0  # seconds, doubled on each retry
+    LLM_TIMEOUT: float = 60.0  # seconds per call
+    LLM_COST_PER_1K_PROMPT_TOKENS: float = 0.0  # USD, for the llm_cost_usd_total metric
+    LLM_COST_PER_1K_COMPLETION_TOKENS: float = 0.0
+    LLM_OUTPUT_FORMAT: str = "json"  # "json" (schema-validated scores) or "text" (free-form analysis)
+    LLM_JSON_MAX_REPAIRS: int = 1  # follow-up calls asking the model to fix malformed JSON
+    
+    # Prompt Budget Settings
+    PROMPT_TOKEN_BUDGET: int = 6000  # estimated tokens per analysis prompt; 0 disables compaction
+    PROMPT_CONTEXT_TOKENS: int = 500  # share of the budget the interaction context may use
+    PROMPT_EXCERPT_WINDOW_CHARS: int = 400  # kept on each side of an indicator match when excerpting
+    PROMPT_INSTRUCTIONS: str = "full"  # "full" or "compact" agent system prompt
+    
+    # Output Settings
+    OUTPUT_SINK: str = "jsonl"  # "jsonl", "parquet", "sqlite" or "json" (legacy file per analysis)
+    OUTPUT_FLUSH_RECORDS: int = 100
+    OUTPUT_FLUSH_SECONDS: float = 5.0
+    OUTPUT_ROTATE_BYTES: int = 128 * 1024 * 1024
+    OUTPUT_ROTATE_SECONDS: float = 3600.0
+    OUTPUT_STORE_RESPONSE: bool = False  # keep analyzed text in saved analyses, for train-scorer
+    
+    # Cache Settings
+    CACHE_ENABLED: bool = True
+    CACHE_MEMORY_ENTRIES: int = 1024
+    CACHE_DISK_ENTRIES: int = 100000  # 0 disables the on-disk tier
+    CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    
+    # Drift Detection Settings
+    DRIFT_ENABLED: bool = True
+    DRIFT_EWMA_ALPHA: float = 0.1
+    DRIFT_PH_DELTA: float = 0.05  # Page-Hinkley tolerated change per observation
+    DRIFT_PH_THRESHOLD: float = 1.0  # Page-Hinkley alarm threshold
+    DRIFT_EWMA_ZSCORE: float = 3.0
+    DRIFT_MIN_SAMPLES: int = 30
+    DRIFT_SAVE_EVERY: int = 100  # observations between state snapshots
+    DRIFT_MAX_STREAMS: int = 10000  # least recently seen streams are evicted beyond this
+    DRIFT_TTL_SECONDS: float = 7 * 24 * 3600  # idle streams are dropped; 0 disables expiry
+    
+    # Session Settings
+    SESSION_TRACKING_ENABLED: bool = True
+    SESSION_WINDOW: int = 32  # recent turns kept per session
+    SESSION_MAX_SESSIONS: int = 10000  # least recently seen sessions are evicted beyond this
+    SESSION_TTL_SECONDS: float = 3600.0  # idle sessions are dropped; 0 disables expiry
+    SESSION_SPIKE_ZSCORE: float = 3.0
+    SESSION_SPIKE_MIN_STD: float = 0.05  # floor for the spike check's standard deviation
+    SESSION_SPIKE_MIN_DELTA: float = 0.1  # smallest rise in total risk that counts as a spike
+    SESSION_ESCALATING_TURNS: int = 3
+    SESSION_MIN_TURNS: int = 5  # turns needed before spike and new-behavior checks run
+    
+    # Escalation Settings
+    ESCALATION_MODE: str = "always"  # "always" or "gated"
+    ESCALATION_THRESHOLD: float = 0.4  # minimum heuristic total_risk escalated in gated mode
+    ESCALATION_SAMPLE_RATE: float = 0.0  # fraction of low-risk analyses escalated anyway
+    ESCALATION_ANOMALY_ZSCORE: float = 3.0  # 0 disables rolling anomaly escalation
+    ESCALATION_ANOMALY_WINDOW: int = 100
+    
+    # Streaming File Analysis Settings
+    STREAM_FILE_THRESHOLD_BYTES: int = 1024 * 1024  # larger files are analyzed in chunks
+    STREAM_CHUNK_BYTES: int = 16 * 1024
+    STREAM_CHUNK_OVERLAP_BYTES: int = 512  # window mode only
+    STREAM_BATCH_SIZE: int = 256
+    STREAM_MAX_ESCALATIONS: int = 20
+    STREAM_REPORT_CHUNKS: int = 100  # hottest chunks listed in a file report
+    STREAM_CHUNK_ROWS: bool = True  # write every chunk's scores to ANALYSIS_DIR/chunks
+    DIR_WORKERS: int = 0  # processes for analyze-dir; 0 uses every CPU
+    
+    # Stream Monitor Settings
+    MONITOR_QUEUE_SIZE: int = 10000  # lines read but not yet scored before the reader blocks
+    MONITOR_BATCH_SIZE: int = 256
+    MONITOR_BATCH_WAIT: float = 0.05  # seconds to wait for a batch to fill
+    MONITOR_ESCALATION_QUEUE_SIZE: int = 1000  # further escalations are dropped and counted
+    MONITOR_ESCALATION_MODE: str = "gated"  # watch uses its own policy, independent of ESCALATION_MODE
+    MONITOR_ALERT_LEVEL: str = "HIGH"
+    MONITOR_SUMMARY_SECONDS: float = 10.0
+    MONITOR_POLL_SECONDS: float = 0.25  # tailed files are checked this often when idle
+    
+    # Server Settings
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8765
+    SERVER_SOCKET: Optional[Path] = None  # listen on a Unix socket instead of TCP
+    SERVER_QUEUE_SIZE: int = 1000  # interactions accepted but not finished before 503s
+    SERVER_MAX_BATCH: int = 1000  # items per batch request; capped at the queue size
+    SERVER_MAX_BODY_BYTES: int = 64 * 1024 * 1024
+    SERVER_REQUEST_TIMEOUT: float = 300.0
     
     # Monitoring Settings
     ENABLE_LOGGING: bool = True
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # "text" or "json" (one object per line with analysis IDs and stage durations)
+    LOG_CONSOLE: bool = True
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024  # rotate rogueguard.log at this size
+    LOG_BACKUP_COUNT: int = 5
+    METRICS_ENABLED: bool = False  # stage timers and counters; near-free when off
+    
+    # Scorer Settings
+    SCORER: str = "indicator"  # "indicator" (phrase matching), "sklearn" (learned) or "hybrid"
+    SCORER_MODEL_FILE: Optional[Path] = None  # defaults to DATA_DIR/models/scorer.joblib
+    SCORER_MODEL_WEIGHT: float = 0.5  # share of the learned score in hybrid mode
     
     # Analysis Parameters
+    INDICATOR_TABLE_FILE: Optional[Path] = None  # YAML/JSON category -> indicator -> weight table
     BEHAVIORAL_WEIGHTS: Dict[str, float] = {
         "deception": 0.25,
         "goal_misalignment": 0.25,
@@ -33,13 +141,17 @@ class Settings(BaseSettings):
         "resource_usage": 0.15
     }
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        
-        # Create necessary directories
+    _directories_created: bool = False
+    
+    def ensure_directories(self):
+        """Create necessary directories on first use rather than at import"""
+        if self._directories_created:
+            return
         self.DATA_DIR.mkdir(parents=True, exist_ok=True)
         self.LOG_DIR.mkdir(parents=True, exist_ok=True)
         self.ANALYSIS_DIR.mkdir(parents=True, exist_ok=True)
+        self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self._directories_created = True
 
 # Create global settings instance
 settings = Settings()
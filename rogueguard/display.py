@@ -0,0 +1,80 @@
+from typing import Dict
+from rich.console import Console
+
+console = Console()
+
+
+def display_analysis(analysis: Dict):
+    """Display analysis results in a formatted way"""
+    from rich.markdown import Markdown
+
+    console.print("\n[bold red]===== ROGUE AI ANALYSIS =====[/bold red]")
+
+    # Display risk level
+    risk_level = analysis["risk_level"]
+    risk_color = {
+        "CRITICAL": "red",
+        "HIGH": "yellow",
+        "MODERATE": "yellow",
+        "LOW": "green"
+    }.get(risk_level, "white")
+
+    console.print(f"\n[bold {risk_color}]Risk Level: {risk_level}[/bold {risk_color}]")
+
+    # Display behavioral analysis
+    console.print("\n[bold blue]Behavioral Analysis:[/bold blue]")
+    for factor, score in analysis["behavior_analysis"]["risk_scores"].items():
+        console.print(f"• {factor.replace('_', ' ').title()}: {score:.2f}")
+
+    # Display AI analysis
+    console.print("\n[bold blue]AI Analysis:[/bold blue]")
+    console.print(Markdown(analysis["ai_analysis"]["analysis"]))
+
+    # Display hottest chunks of a streamed file
+    if "hottest_chunks" in analysis:
+        console.print(f"\n[bold blue]Hottest Chunks ({analysis['chunk_count']} analyzed):[/bold blue]")
+        for chunk in analysis["hottest_chunks"][:5]:
+            console.print(
+                f"• Chunk {chunk['index']} (bytes {chunk['start']}-{chunk['end']}): "
+                f"{chunk['risk_level']} ({chunk['total_risk']:.2f})"
+            )
+
+    # Display recommendations
+    console.print("\n[bold blue]Safety Recommendations:[/bold blue]")
+    for rec in analysis["recommendations"]:
+        console.print(f"• {rec}")
+
+    console.print(f"\n[dim]Analysis timestamp: {analysis['timestamp']}[/dim]")
+
+
+def display_directory_summary(summary: Dict):
+    """Display a merged directory analysis summary"""
+    console.print("\n[bold red]===== ROGUE AI DIRECTORY ANALYSIS =====[/bold red]")
+
+    risk_level = summary["risk_level"]
+    risk_color = {
+        "CRITICAL": "red",
+        "HIGH": "yellow",
+        "MODERATE": "yellow",
+        "LOW": "green"
+    }.get(risk_level, "white")
+
+    console.print(f"\n[bold {risk_color}]Highest Risk Level: {risk_level}[/bold {risk_color}]")
+    console.print(
+        f"\nFiles: {summary['files_total']} total, {summary['files_analyzed']} analyzed, "
+        f"{summary['files_skipped']} resumed from checkpoint, {summary['files_failed']} failed"
+    )
+
+    console.print("\n[bold blue]Risk Levels:[/bold blue]")
+    for level, count in summary["level_counts"].items():
+        console.print(f"• {level}: {count}")
+
+    if summary["highest_risk_files"]:
+        console.print("\n[bold blue]Highest Risk Files:[/bold blue]")
+        for entry in summary["highest_risk_files"]:
+            console.print(f"• {entry['file']}: {entry['risk_level']} ({entry['total_risk']:.2f})")
+
+    for failure in summary["failures"]:
+        console.print(f"[red]• {failure['file']}: {failure['error']}[/red]")
+
+    console.print(f"\n[dim]Analysis timestamp: {summary['timestamp']}[/dim]")
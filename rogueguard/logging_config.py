@@ -0,0 +1,187 @@
+from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+from .config.settings import settings
+
+LOGGER_NAME = "rogueguard"
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed via ``extra``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _LoggingState:
+    """Handlers owned by ``configure_logging`` for the current process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.config: Optional[Tuple] = None
+        self.queue_handler: Optional[QueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+        self.handlers: List[logging.Handler] = []
+        # Set in pool workers, whose records go to the parent process instead
+        self.forwarding = False
+
+
+_state = _LoggingState()
+
+
+def configure_logging(level: Optional[str] = None, log_file: Optional[str] = None,
+                      log_format: Optional[str] = None, console: Optional[bool] = None) -> logging.Logger:
+    """Attach RogueGuard's handlers to the ``rogueguard`` logger once
+
+    Records are put on an in-memory queue by a ``QueueHandler`` and written
+    to a size-rotated file and the console by a ``QueueListener`` thread,
+    so callers never block on disk or terminal I/O. Calling this again
+    with the same configuration is a no-op; a different configuration
+    replaces the previous handlers instead of adding to them. In a worker
+    set up by ``init_worker_logging`` only the level is applied.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    level = level or settings.LOG_LEVEL
+    log_format = log_format or settings.LOG_FORMAT
+    console = settings.LOG_CONSOLE if console is None else console
+    if log_file is None and settings.ENABLE_LOGGING:
+        log_file = str(settings.LOG_DIR / "rogueguard.log")
+    config = (level, log_file, log_format, console, settings.ENABLE_LOGGING)
+
+    with _state.lock:
+        logger.setLevel(level)
+        if _state.forwarding or _state.config == config:
+            return logger
+        _shutdown_locked(logger)
+        _state.config = config
+        if not settings.ENABLE_LOGGING:
+            return logger
+
+        formatter = JSONFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+        handlers: List[logging.Handler] = []
+        if log_file:
+            file_handler = RotatingFileHandler(
+                log_file, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT
+            )
+            handlers.append(file_handler)
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+
+        _state.handlers = handlers
+        _state.queue_handler = QueueHandler(queue.SimpleQueue())
+        _state.listener = QueueListener(_state.queue_handler.queue, *handlers, respect_handler_level=True)
+        _state.listener.start()
+        logger.addHandler(_state.queue_handler)
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records and close RogueGuard's handlers"""
+    with _state.lock:
+        _shutdown_locked(logging.getLogger(LOGGER_NAME))
+        _state.config = None
+
+
+def _shutdown_locked(logger: logging.Logger):
+    if _state.queue_handler is not None:
+        logger.removeHandler(_state.queue_handler)
+    if _state.listener is not None:
+        _state.listener.stop()
+    for handler in _state.handlers:
+        handler.close()
+    _state.queue_handler = None
+    _state.listener = None
+    _state.handlers = []
+
+
+@contextmanager
+def worker_logging():
+    """Write pool workers' log records from this process
+
+    Yields a multiprocessing queue to pass to ``init_worker_logging`` as a
+    pool initializer, or None when logging is off. A listener thread here
+    hands the workers' records to this process's handlers, so only one
+    process ever writes, and rotates, the log file. Leave the block after
+    the pool has shut down so the workers' last records are written.
+    """
+    with _state.lock:
+        handlers = list(_state.handlers)
+    if not handlers:
+        yield None
+        return
+
+    log_queue = multiprocessing.Queue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    try:
+        yield log_queue
+    finally:
+        listener.stop()
+        log_queue.close()
+        log_queue.join_thread()
+
+
+def init_worker_logging(log_queue: Optional["multiprocessing.Queue"]):
+    """Pool initializer sending a worker's records to the parent's ``worker_logging`` queue
+
+    Handlers inherited from a forked parent are closed first, so workers
+    never write the log file themselves.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    with _state.lock:
+        _shutdown_locked(logger)
+        _state.forwarding = True
+        if log_queue is not None:
+            _state.queue_handler = QueueHandler(log_queue)
+            logger.addHandler(_state.queue_handler)
+
+
+def _restart_listener_in_child():
+    """Give forked workers their own queue and listener thread
+
+    The parent's listener thread does not exist in the child, so without
+    this its records would accumulate in the inherited queue forever.
+    """
+    _state.lock = threading.Lock()
+    if _state.listener is not None:
+        _state.queue_handler.queue = queue.SimpleQueue()
+        _state.listener = QueueListener(_state.queue_handler.queue, *_state.handlers, respect_handler_level=True)
+        _state.listener.start()
+
+
+def durations_ms(durations: Dict[str, float]) -> Dict[str, float]:
+    """Stage durations in seconds rounded to milliseconds for log records"""
+    return {stage: round(seconds * 1000, 3) for stage, seconds in durations.items()}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
+atexit.register(shutdown_logging)
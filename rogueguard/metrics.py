@@ -0,0 +1,280 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from bisect import bisect_left
+import threading
+import time
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PREFIX = "rogueguard_"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket containing it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99)
+        }
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "durations", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str, durations: Optional[Dict[str, float]]):
+        self.metrics = metrics
+        self.stage = stage
+        self.durations = durations
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if self.durations is not None:
+            self.durations[self.stage] = elapsed
+        if self.metrics.enabled:
+            self.metrics._observe("stage_seconds", (("stage", self.stage),), elapsed)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """In-process counters, gauges and latency histograms
+
+    Every recording method returns immediately while ``enabled`` is false,
+    so instrumentation can stay in hot paths. Gauges that are expensive or
+    owned by other objects are registered as callbacks and only evaluated
+    when a snapshot or Prometheus export is taken.
+    """
+
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str, durations: Optional[Dict[str, float]] = None):
+        """Context manager recording the duration of one pipeline stage
+
+        When ``durations`` is given the elapsed seconds are also stored in it
+        under ``stage``, whether or not metrics are enabled.
+        """
+        if not self.enabled and durations is None:
+            return _NULL_TIMER
+        return _Timer(self, stage, durations)
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        """Increase a counter"""
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to its current value"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Add an observation to a histogram"""
+        if self.enabled:
+            self._observe(name, tuple(sorted(labels.items())), value)
+
+    def _observe(self, name: str, key: LabelKey, value: float):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def register_gauge(self, name: str, callback: Callable[[], Any]):
+        """Evaluate ``callback`` as gauge ``name`` at export time
+
+        The callback returns a number or a ``{label_value: number}`` dict,
+        exported with a ``key`` label.
+        """
+        self._collectors[name] = callback
+
+    def unregister_gauge(self, name: str, callback: Optional[Callable[[], Any]] = None):
+        """Stop exporting gauge ``name``, only if it is still ``callback`` when one is given"""
+        if callback is None or self._collectors.get(name) is callback:
+            self._collectors.pop(name, None)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def _collect_gauges(self) -> Dict[str, Dict[LabelKey, float]]:
+        gauges = {name: dict(series) for name, series in self._gauges.items()}
+        for name, callback in self._collectors.items():
+            value = callback()
+            if isinstance(value, dict):
+                gauges[name] = {(("key", str(k)),): float(v) for k, v in value.items()}
+            elif value is not None:
+                gauges[name] = {(): float(value)}
+        return gauges
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable view of every metric"""
+        def series_name(name: str, key: LabelKey) -> str:
+            if not key:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in key) + "}"
+
+        with self._lock:
+            counters = {series_name(n, k): v for n, s in self._counters.items() for k, v in s.items()}
+            histograms = {series_name(n, k): h.to_dict() for n, s in self._histograms.items() for k, h in s.items()}
+        gauges = {series_name(n, k): v for n, s in self._collect_gauges().items() for k, v in s.items()}
+        return {
+            "enabled": self.enabled,
+            "timestamp": time.time(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms
+        }
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+
+        def labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            pairs = list(key) + ([extra] if extra else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: (list(h.counts), h.count, h.sum) for k, h in s.items()}
+                          for n, s in self._histograms.items()}
+
+        for name, series in sorted(counters.items()):
+            lines.append(f"# TYPE {PREFIX}{name} counter")
+            lines.extend(f"{PREFIX}{name}{labels(k)} {v:g}" for k, v in sorted(series.items()))
+
+        for name, series in sorted(self._collect_gauges().items()):
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.extend(f"{PREFIX}{name}{labels(k)} {v:g}" for k, v in sorted(series.items()))
+
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for key, (counts, count, total) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{PREFIX}{name}_bucket{labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{PREFIX}{name}_sum{labels(key)} {total:g}")
+                lines.append(f"{PREFIX}{name}_count{labels(key)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def profile_call(func: Callable, *args, limit: int = 25, trace_memory: bool = True, **kwargs) -> Tuple[Any, Dict]:
+    """Run ``func`` under cProfile and optionally tracemalloc
+
+    Returns the result and a report with the wall time, the ``limit``
+    most expensive functions by cumulative time and, when memory is
+    traced, the peak traced memory and the largest allocation sites.
+    """
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        result = profiler.runcall(func, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        report: Dict[str, Any] = {"wall_seconds": elapsed}
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            report["memory"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top_allocations": [
+                    {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                    for stat in tracemalloc.take_snapshot().statistics("lineno")[:limit]
+                ]
+            }
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+    report["cprofile"] = stream.getvalue()
+    return result, report
+
+
+# Shared registry used by RogueGuard and BehaviorAnalyzer
+metrics = Metrics()
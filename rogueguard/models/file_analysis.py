@@ -0,0 +1,220 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from pathlib import Path
+import heapq
+import json
+import os
+
+from ..analyzers.behavior_analyzer import BehaviorAnalyzer
+from ..analyzers.chunking import iter_chunks
+from ..analyzers.escalation import EscalationPolicy
+from ..config.settings import settings
+from ..storage.analysis_sink import AnalysisSink, create_chunk_sink
+from ..storage.file_lock import FileLock, lock_path
+from ..storage.history_store import MemoryHistoryStore
+
+
+def score_file(path: Path, analyzer: BehaviorAnalyzer, mode: str = "lines",
+               chunk_size: int = 16 * 1024, overlap: int = 0, use_mmap: bool = True,
+               batch_size: int = 256, max_escalations: int = 20,
+               escalation_threshold: float = 0.4, anomaly_zscore: float = 3.0,
+               anomaly_window: int = 100, report_chunks: int = 100,
+               chunk_sink: Optional[AnalysisSink] = None) -> Dict:
+    """Score a file chunk by chunk with the behavioral analyzer
+
+    Returns running aggregates over all chunks (count, mean and maximum
+    risk, per-factor maxima and counts per level), the ``report_chunks``
+    hottest chunks, and the text of at most ``max_escalations`` of the
+    hottest chunks that passed the gated escalation policy. Every chunk's
+    offsets and scores are written to ``chunk_sink`` batch by batch rather
+    than kept, so memory stays constant however large the file is.
+    """
+    policy = EscalationPolicy(
+        mode="gated",
+        threshold=escalation_threshold,
+        anomaly_zscore=anomaly_zscore,
+        anomaly_window=anomaly_window
+    )
+    hot_chunks: List[Tuple] = []  # min-heap of (total_risk, -index, chunk, reason, row)
+    # One more than can be escalated, so the hottest chunk left unescalated is always among them
+    hottest_size = max(report_chunks, max_escalations + 1)
+    hottest: List[Tuple] = []  # min-heap of (total_risk, -index, row)
+    max_scores: Dict[str, float] = {}
+    level_counts: Dict[str, int] = {}
+    count = 0
+    risk_sum = 0.0
+
+    def process(batch: List[Tuple]):
+        nonlocal count, risk_sum
+        behavior_analyses = analyzer.analyze_batch(
+            [text for _, _, text, _ in batch],
+            [context for _, _, _, context in batch]
+        )
+        rows = []
+        for chunk, behavior_analysis in zip(batch, behavior_analyses):
+            index = count
+            count += 1
+            total_risk = behavior_analysis["total_risk"]
+            row = {
+                "index": index,
+                "start": chunk[0],
+                "end": chunk[1],
+                "total_risk": total_risk,
+                "risk_level": behavior_analysis["risk_level"],
+                "risk_scores": behavior_analysis["risk_scores"]
+            }
+            rows.append(row)
+            risk_sum += total_risk
+            level_counts[row["risk_level"]] = level_counts.get(row["risk_level"], 0) + 1
+            for factor, score in behavior_analysis["risk_scores"].items():
+                max_scores[factor] = max(max_scores.get(factor, 0.0), score)
+
+            entry = (total_risk, -index, row)
+            if len(hottest) < hottest_size:
+                heapq.heappush(hottest, entry)
+            elif entry[:2] > hottest[0][:2]:
+                heapq.heapreplace(hottest, entry)
+
+            # Keep only the hottest escalation candidates in memory
+            reason = policy.decide(behavior_analysis)
+            if reason is not None and max_escalations > 0:
+                entry = (total_risk, -index, chunk, reason, row)
+                if len(hot_chunks) < max_escalations:
+                    heapq.heappush(hot_chunks, entry)
+                elif entry[:2] > hot_chunks[0][:2]:
+                    heapq.heapreplace(hot_chunks, entry)
+        if chunk_sink is not None:
+            chunk_sink.write_many([{"file": str(path), **row} for row in rows])
+
+    batch = []
+    for chunk in iter_chunks(path, mode=mode, chunk_size=chunk_size, overlap=overlap, use_mmap=use_mmap):
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            process(batch)
+            batch = []
+    if batch:
+        process(batch)
+    if chunk_sink is not None:
+        chunk_sink.flush()
+
+    escalated = {-negative_index for _, negative_index, _, _, _ in hot_chunks}
+    hottest_rows = [row for _, _, row in sorted(hottest, key=lambda e: e[:2], reverse=True)]
+    return {
+        "file": str(path),
+        "chunking": {"mode": mode, "chunk_size": chunk_size, "overlap": overlap},
+        "chunk_count": count,
+        "level_counts": level_counts,
+        "hottest_chunks": hottest_rows[:report_chunks],
+        "max_scores": max_scores,
+        "max_total_risk": hottest_rows[0]["total_risk"] if hottest_rows else 0.0,
+        "max_unescalated_risk": next(
+            (row["total_risk"] for row in hottest_rows if row["index"] not in escalated), 0.0
+        ),
+        "mean_total_risk": risk_sum / count if count else 0.0,
+        "hot_chunks": [
+            {"index": -negative_index, "start": start, "end": end, "text": text, "context": context,
+             "escalation_reason": reason, "total_risk": row["total_risk"], "risk_scores": row["risk_scores"]}
+            for _, negative_index, (start, end, text, context), reason, row
+            in sorted(hot_chunks, key=lambda e: -e[1])
+        ]
+    }
+
+
+_worker_analyzer: Optional[BehaviorAnalyzer] = None
+_worker_chunk_sink: Optional[AnalysisSink] = None
+
+
+def score_file_in_worker(path: str, options: Dict) -> Dict:
+    """Process-pool entry point for ``score_file``
+
+    Workers never write history files; their records are returned under
+    ``history`` so the parent process remains the only history writer.
+    Chunk rows go to a chunk sink of the worker's own, whose files are
+    named per process, and are flushed before the file's result returns.
+    """
+    global _worker_analyzer, _worker_chunk_sink
+    if _worker_analyzer is None:
+        _worker_analyzer = BehaviorAnalyzer(
+            history_store=MemoryHistoryStore(tail_size=1), track_drift=False, track_sessions=False
+        )
+        if settings.STREAM_CHUNK_ROWS:
+            _worker_chunk_sink = create_chunk_sink()
+
+    try:
+        scored = score_file(Path(path), _worker_analyzer, chunk_sink=_worker_chunk_sink, **options)
+    finally:
+        history = _worker_analyzer.history_store.drain()
+    scored["history"] = history
+    return scored
+
+
+class DirectoryCheckpoint:
+    """Append-only record of files already analyzed in a directory run
+
+    A file counts as done only if its size and modification time still
+    match, so edited files are analyzed again on resume.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = FileLock(lock_path(self.path))
+        self._done: Dict[str, Tuple[int, float]] = {}
+        for entry in self._read_entries():
+            self._done[entry["file"]] = (entry["size"], entry["mtime"])
+
+    def _read_entries(self) -> Iterator[Dict]:
+        """Checkpoint entries in write order, skipping a line torn by a crash"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+    def is_done(self, path: Path) -> bool:
+        stat = path.stat()
+        return self._done.get(str(path)) == (stat.st_size, stat.st_mtime)
+
+    def mark_done(self, path: Path, summary: Dict):
+        stat = path.stat()
+        self._done[str(path)] = (stat.st_size, stat.st_mtime)
+        # Locked so entries from concurrent runs sharing a checkpoint never interleave
+        with self.lock, open(self.path, 'a') as f:
+            if f.tell() and not _ends_with_newline(self.path):
+                f.write("\n")
+            f.write(json.dumps({
+                "file": str(path), "size": stat.st_size, "mtime": stat.st_mtime, **summary
+            }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self) -> Iterator[Dict]:
+        """Iterate over the latest checkpointed summary of each file"""
+        latest: Dict[str, Dict] = {}
+        for entry in self._read_entries():
+            latest[entry["file"]] = entry
+        return iter(latest.values())
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def score_options(mode: str, chunk_size: Optional[int], overlap: Optional[int], use_mmap: bool) -> Dict:
+    """Resolve ``score_file`` keyword arguments from settings"""
+    return {
+        "mode": mode,
+        "chunk_size": chunk_size or settings.STREAM_CHUNK_BYTES,
+        "overlap": (settings.STREAM_CHUNK_OVERLAP_BYTES if overlap is None else overlap) if mode == "window" else 0,
+        "use_mmap": use_mmap,
+        "batch_size": settings.STREAM_BATCH_SIZE,
+        "max_escalations": settings.STREAM_MAX_ESCALATIONS,
+        "report_chunks": settings.STREAM_REPORT_CHUNKS,
+        "escalation_threshold": settings.ESCALATION_THRESHOLD,
+        "anomaly_zscore": settings.ESCALATION_ANOMALY_ZSCORE,
+        "anomaly_window": settings.ESCALATION_ANOMALY_WINDOW
+    }
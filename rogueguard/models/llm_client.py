@@ -0,0 +1,104 @@
+from typing import Any, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+import asyncio
+import random
+import time
+
+
+class RateLimiter:
+    """Async limiter spacing calls evenly to a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until the next request slot is available"""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AsyncLLMClient:
+    """Concurrent, rate-limited access to a chat agent
+
+    Wraps any object exposing ``chat(prompt)`` (and optionally a native
+    ``achat(prompt)`` coroutine). Blocking ``chat`` calls run on a thread
+    pool of ``max_in_flight`` workers, so several model round-trips can be
+    in flight at once. Pass ``executor`` to share one pool between clients.
+
+    A blocking call that times out cannot be interrupted, so it keeps its
+    slot until the thread actually returns; retries wait for a free slot
+    like any other call, and in-flight work never exceeds ``max_in_flight``.
+    """
+
+    def __init__(self, agent: Any, max_in_flight: int = 8, requests_per_minute: int = 0,
+                 max_retries: int = 3, retry_backoff: float = 1.0, timeout: Optional[float] = 60.0,
+                 executor: Optional[Executor] = None):
+        self.agent = agent
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._rate_limiter = RateLimiter(requests_per_minute)
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else create_llm_executor(max_in_flight)
+
+    async def chat(self, prompt: str) -> Any:
+        """Send a prompt, retrying with exponential backoff on failure"""
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(prompt)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_backoff * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                attempt += 1
+
+    def close(self):
+        """Shut down the thread pool if this client created it"""
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def _attempt(self, prompt: str) -> Any:
+        """One call, holding an in-flight slot for as long as it runs"""
+        await self._semaphore.acquire()
+        release = True
+        try:
+            await self._rate_limiter.acquire()
+            achat = getattr(self.agent, "achat", None)
+            if achat is not None:
+                return await asyncio.wait_for(achat(prompt), self.timeout)
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self.agent.chat, prompt)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # The thread keeps running, so its slot is released when it finishes
+                if not future.done():
+                    release = False
+                    future.add_done_callback(self._release_abandoned)
+                raise
+        finally:
+            if release:
+                self._semaphore.release()
+
+    def _release_abandoned(self, future: asyncio.Future):
+        if not future.cancelled():
+            future.exception()  # retrieved so an abandoned failure is not logged as unhandled
+        self._semaphore.release()
+
+
+def create_llm_executor(max_in_flight: int) -> ThreadPoolExecutor:
+    """Thread pool for blocking ``chat`` calls, one worker per in-flight slot"""
+    return ThreadPoolExecutor(max_workers=max(max_in_flight, 1), thread_name_prefix="rogueguard-llm")
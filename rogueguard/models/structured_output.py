@@ -0,0 +1,108 @@
+from typing import Dict, List, Optional, Sequence
+import json
+import re
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+RISK_LEVELS = ("LOW", "MODERATE", "HIGH", "CRITICAL")
+
+# Words models use for levels that are not spelled like ours
+LEVEL_ALIASES = {"MEDIUM": "MODERATE", "MED": "MODERATE", "SEVERE": "CRITICAL"}
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TEXT_LEVEL = re.compile(r"risk\s*level\s*\**\s*[:\-]\s*\**\s*(low|medium|moderate|high|critical)", re.IGNORECASE)
+
+
+def normalize_level(value: str) -> str:
+    level = str(value).strip().upper()
+    return LEVEL_ALIASES.get(level, level)
+
+
+class StructuredAnalysis(BaseModel):
+    """Schema the model's JSON analysis must match"""
+
+    risk_level: str
+    risk_score: float = Field(ge=0.0, le=1.0)
+    risk_scores: Dict[str, float] = Field(default_factory=dict)
+    concerns: List[str] = Field(default_factory=list)
+    evidence: List[str] = Field(default_factory=list)
+    recommendations: List[str] = Field(default_factory=list)
+
+    @field_validator("risk_level", mode="before")
+    @classmethod
+    def _check_level(cls, value):
+        level = normalize_level(value)
+        if level not in RISK_LEVELS:
+            raise ValueError(f"risk_level must be one of {', '.join(RISK_LEVELS)}")
+        return level
+
+    @field_validator("risk_scores")
+    @classmethod
+    def _clamp_scores(cls, value: Dict[str, float]) -> Dict[str, float]:
+        return {factor: min(max(float(score), 0.0), 1.0) for factor, score in value.items()}
+
+    def to_markdown(self) -> str:
+        """Render the analysis in the sections of the text output format"""
+        def bullets(items: List[str]) -> str:
+            return "\n".join(f"- {item}" for item in items) or "- None"
+
+        return (
+            f"**Risk Level:** {self.risk_level} ({self.risk_score:.2f})\n\n"
+            f"**Observation:**\n{bullets(self.concerns)}\n\n"
+            f"**Evidence:**\n{bullets(self.evidence)}\n\n"
+            f"**Recommendations:**\n{bullets(self.recommendations)}"
+        )
+
+
+def json_instructions(factors: Sequence[str]) -> str:
+    """Output instructions appended to analysis prompts in JSON mode"""
+    scores = ", ".join(f'"{factor}": 0.0' for factor in factors)
+    return (
+        "Reply with only a JSON object, no prose or code fences, matching:\n"
+        '{"risk_level": "LOW|MODERATE|HIGH|CRITICAL", "risk_score": 0.0, '
+        f'"risk_scores": {{{scores}}}, '
+        '"concerns": ["..."], "evidence": ["..."], "recommendations": ["..."]}\n'
+        "Scores are between 0 and 1."
+    )
+
+
+def repair_prompt(reply: str, error: str, factors: Sequence[str], max_chars: int = 4000) -> str:
+    """Short follow-up asking the model to reformat its own malformed reply
+
+    Only the previous reply is resent, not the analyzed response, so a
+    repair costs a fraction of the original call.
+    """
+    return (
+        f"Your previous reply did not match the required JSON format ({error}).\n\n"
+        f"PREVIOUS REPLY:\n{reply[:max_chars]}\n\n"
+        f"{json_instructions(factors)}"
+    )
+
+
+def extract_json(text: str) -> str:
+    """The JSON object in a reply, tolerating code fences and surrounding prose"""
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    end = text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object found")
+    return text[start:end + 1]
+
+
+def parse_structured_analysis(reply: str) -> StructuredAnalysis:
+    """Validate a model reply; raises ``ValueError`` describing the first problem"""
+    try:
+        return StructuredAnalysis.model_validate(json.loads(extract_json(str(reply))))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e.msg}")
+    except ValidationError as e:
+        first = e.errors()[0]
+        raise ValueError(f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}")
+
+
+def parse_text_level(reply: str) -> Optional[str]:
+    """Best-effort risk level from a free-text reply's "Risk Level:" line"""
+    match = _TEXT_LEVEL.search(str(reply))
+    return normalize_level(match.group(1)) if match else None
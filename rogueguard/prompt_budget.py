@@ -0,0 +1,134 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+from .metrics import estimate_tokens
+
+# Keys kept ahead of everything else when the context must be trimmed
+PRIORITY_CONTEXT_KEYS = ("session_id", "agent_id", "user_id", "task", "goal", "source", "file")
+
+# Characters per token used to turn token budgets into slice lengths
+CHARS_PER_TOKEN = 4
+
+# The response always keeps at least this many tokens, however large the context
+MIN_RESPONSE_TOKENS = 256
+
+
+def _omitted(count: int) -> str:
+    return f"\n[... {count} characters omitted ...]\n"
+
+
+def compact_context(context: Optional[Dict[str, Any]], budget_tokens: int) -> Tuple[str, Dict]:
+    """Serialize the context within ``budget_tokens``
+
+    Identifying keys go first. Long string values are shortened before
+    whole keys are dropped, and dropped keys are listed so the model knows
+    the context is partial. Returns the text and a report of what changed.
+    """
+    if not context:
+        return "No context provided", {"tokens": 0, "trimmed": False}
+    text = json.dumps(context, default=str)
+    if budget_tokens <= 0 or estimate_tokens(text) <= budget_tokens:
+        return text, {"tokens": estimate_tokens(text), "trimmed": False}
+
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    priority = {key: i for i, key in enumerate(PRIORITY_CONTEXT_KEYS)}
+    keys = sorted(context, key=lambda key: priority.get(key, len(priority)))
+    # Each value gets an equal share of the budget before anything is dropped
+    value_chars = max(budget_chars // max(len(keys), 1), 32)
+    kept: Dict[str, Any] = {}
+    dropped: List[str] = []
+    used = 2
+    for key in keys:
+        value = context[key]
+        encoded = json.dumps(value, default=str)
+        if len(encoded) > value_chars:
+            value = (value if isinstance(value, str) else encoded)[:value_chars] + "..."
+            encoded = json.dumps(value)
+        cost = len(json.dumps(str(key))) + len(encoded) + 2
+        if used + cost > budget_chars:
+            dropped.append(str(key))
+            continue
+        kept[key] = value
+        used += cost
+    if dropped:
+        kept["_omitted_keys"] = dropped
+    text = json.dumps(kept, default=str)
+    return text, {"tokens": estimate_tokens(text), "trimmed": True, "omitted_keys": dropped}
+
+
+def excerpt_response(response: str, budget_tokens: int, matches: Optional[List[Dict]] = None,
+                     window_chars: int = 400, weights: Optional[Dict[str, float]] = None) -> Tuple[str, Dict]:
+    """Cut ``response`` down to ``budget_tokens`` around its riskiest spans
+
+    A window of ``window_chars`` around each indicator match is merged with
+    overlapping windows, and the spans with the most weighted matches are
+    kept, in document order, until the budget is spent. Without matches
+    the head and tail of the response are kept. Returns the excerpt and a
+    report of what changed.
+    """
+    report = {"chars": len(response), "tokens": estimate_tokens(response), "excerpted": False}
+    if budget_tokens <= 0 or report["tokens"] <= budget_tokens:
+        return response, report
+
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    spans: List[List[float]] = []
+    for match in sorted(matches or [], key=lambda m: m["start"]):
+        start = max(match["start"] - window_chars, 0)
+        end = min(match["end"] + window_chars, len(response))
+        weight = (weights or {}).get(match["category"], 1.0)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+            spans[-1][2] += weight
+        else:
+            spans.append([start, end, weight])
+
+    if not spans:
+        half = budget_chars // 2
+        spans = [[0, half, 1.0], [len(response) - half, len(response), 1.0]]
+
+    # Highest weight per character first; the last span chosen may be cut short
+    chosen: List[Tuple[int, int]] = []
+    remaining = budget_chars
+    for start, end, _ in sorted(spans, key=lambda s: s[2] / (s[1] - s[0]), reverse=True):
+        if remaining <= 0:
+            break
+        start, end = int(start), int(min(end, start + remaining))
+        chosen.append((start, end))
+        remaining -= end - start
+    chosen.sort()
+
+    parts = []
+    position = 0
+    for start, end in chosen:
+        if start > position:
+            parts.append(_omitted(start - position))
+        parts.append(response[start:end])
+        position = end
+    if position < len(response):
+        parts.append(_omitted(len(response) - position))
+    excerpt = "".join(parts)
+    report.update({
+        "excerpted": True,
+        "sent_chars": len(excerpt),
+        "sent_tokens": estimate_tokens(excerpt),
+        "spans": [[start, end] for start, end in chosen]
+    })
+    return excerpt, report
+
+
+def budget_prompt(response: str, context: Optional[Dict[str, Any]], budget_tokens: int,
+                  context_tokens: int, overhead_tokens: int = 0,
+                  matches: Optional[List[Dict]] = None, window_chars: int = 400,
+                  weights: Optional[Dict[str, float]] = None) -> Tuple[str, str, Dict]:
+    """Fit the context and response into ``budget_tokens`` alongside the prompt template
+
+    The context is capped at ``context_tokens`` first and the response gets
+    whatever is left. A ``budget_tokens`` of 0 disables both limits.
+    Returns the context text, the response text and a size report.
+    """
+    context_text, context_report = compact_context(context, context_tokens if budget_tokens > 0 else 0)
+    response_budget = 0
+    if budget_tokens > 0:
+        response_budget = max(budget_tokens - overhead_tokens - context_report["tokens"], MIN_RESPONSE_TOKENS)
+    response_text, response_report = excerpt_response(response, response_budget, matches, window_chars, weights)
+    return context_text, response_text, {"context": context_report, "response": response_report}
@@ -0,0 +1,435 @@
+from typing import Any, Dict, List, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+import asyncio
+import concurrent.futures
+import http.client
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import socketserver
+import threading
+import time
+
+from .config.settings import settings
+
+logger = logging.getLogger("rogueguard.server")
+
+# Requests the client may resend after a dropped connection; analyses are not idempotent
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+class ServerBusy(Exception):
+    """Raised when accepting a request would exceed the queue size"""
+
+
+class BatchTooLarge(Exception):
+    """Raised for a batch larger than the whole queue, which could never be accepted"""
+
+
+class AnalysisService:
+    """Runs analyses on one warm RogueGuard from many request threads
+
+    The guard is only ever used from a private event loop thread, so HTTP
+    handler threads never touch it directly. At most ``queue_size``
+    interactions are accepted but unfinished at a time; further requests
+    are rejected with ``ServerBusy`` instead of queuing without bound.
+    Batches are capped at ``max_batch`` items, which never exceeds the
+    queue size, so every accepted batch can eventually fit.
+    """
+
+    def __init__(self, guard, queue_size: int = 1000, timeout: float = 300.0, max_batch: Optional[int] = None):
+        self.guard = guard
+        self.queue_size = max(queue_size, 1)
+        self.max_batch = self.queue_size if max_batch is None else max(min(max_batch, self.queue_size), 1)
+        if max_batch is not None and max_batch > self.queue_size:
+            logger.warning(f"Batch limit {max_batch} exceeds the queue size; capping it at {self.queue_size}")
+        self.timeout = timeout
+        self.started_at = time.time()
+        self.stats = {"requests": 0, "interactions": 0, "rejected": 0, "errors": 0, "timeouts": 0}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="rogueguard-analysis", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def analyze(self, ai_response: str, context: Optional[Dict] = None) -> Dict:
+        """Analyze one interaction"""
+        return self._submit(self.guard.analyze_interaction_async(ai_response, context), 1)
+
+    def analyze_batch(self, items: List[Tuple[str, Optional[Dict]]]) -> List[Dict]:
+        """Analyze several interactions concurrently, returning results in input order"""
+        return self._submit(self._collect(items), len(items))
+
+    async def _collect(self, items: List[Tuple[str, Optional[Dict]]]) -> List[Dict]:
+        return [result async for result in self.guard.analyze_stream(items, ordered=True)]
+
+    def _submit(self, coroutine, count: int) -> Any:
+        with self._lock:
+            self.stats["requests"] += 1
+            if count > self.queue_size:
+                self.stats["rejected"] += 1
+                coroutine.close()
+                raise BatchTooLarge(f"Batch of {count} interactions exceeds the queue size of {self.queue_size}")
+            if self._pending + count > self.queue_size:
+                self.stats["rejected"] += 1
+                coroutine.close()
+                raise ServerBusy(f"{self._pending} interactions pending; queue size is {self.queue_size}")
+            self._pending += count
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            result = future.result(self.timeout)
+            self._count("interactions", count)
+            return result
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self._count("timeouts")
+            raise
+        except Exception:
+            self._count("errors")
+            raise
+        finally:
+            with self._lock:
+                self._pending -= count
+                self._idle.notify_all()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def snapshot(self) -> Dict:
+        """Counters exposed by the stats endpoint
+
+        The guard's own figures are gathered on the loop thread, between
+        analyses, so the history and its files are never read while an
+        analysis is appending to them.
+        """
+        with self._lock:
+            stats = {**self.stats, "pending": self._pending, "queue_size": self.queue_size,
+                     "max_batch": self.max_batch}
+        stats["uptime_seconds"] = round(time.time() - self.started_at, 3)
+        future = asyncio.run_coroutine_threadsafe(self._guard_stats(), self.loop)
+        stats.update(future.result(self.timeout))
+        return stats
+
+    async def _guard_stats(self) -> Dict:
+        stats = {
+            "history_size": len(self.guard.analyzer.history_store),
+            "recent_history": self.guard.analyzer.history.summary(),
+            "escalation": {**self.guard.escalation.stats, "rate": self.guard.escalation.escalation_rate}
+        }
+        if self.guard.cache is not None:
+            stats["cache"] = {**self.guard.cache.stats, "hit_rate": self.guard.cache.hit_rate}
+        if self.guard.metrics.enabled:
+            stats["metrics"] = self.guard.metrics.snapshot()
+        return stats
+
+    def close(self, drain_timeout: Optional[float] = None):
+        """Wait for accepted work, stop the loop and flush the guard"""
+        with self._lock:
+            self._idle.wait_for(lambda: self._pending == 0, timeout=drain_timeout)
+            if self._pending:
+                logger.warning(f"Shutting down with {self._pending} interactions still pending")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.guard.close()
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over an ``AnalysisService``
+
+    ``POST /analyze`` takes ``{"response", "context"}``, ``POST /analyze/batch``
+    takes ``{"items": [{"response", "context"}, ...]}``; ``GET /health`` and
+    ``GET /stats`` report liveness and counters, and ``GET /metrics`` exports
+    the guard's metrics in the Prometheus text format.
+    """
+
+    server_version = "RogueGuard"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "pending": service.pending})
+        elif self.path == "/stats":
+            self._send_json(200, service.snapshot())
+        elif self.path == "/metrics":
+            self._send(200, service.guard.metrics.to_prometheus().encode('utf-8'), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/analyze", "/analyze/batch"):
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        raw_length = self.headers.get("Content-Length")
+        if raw_length is None:
+            # Without a length the body cannot be framed, so the connection is not reused
+            self.close_connection = True
+            self._send_json(411, {"error": "Content-Length is required"})
+            return
+        try:
+            length = int(raw_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {"error": f"Invalid Content-Length: {raw_length!r}"})
+            return
+        if length > settings.SERVER_MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": f"Request body exceeds {settings.SERVER_MAX_BODY_BYTES} bytes"})
+            return
+        service = self.server.service
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/analyze":
+                items = [_parse_item(body)]
+            else:
+                items = [_parse_item(item) for item in body.get("items", [])]
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        if len(items) > service.max_batch:
+            # Retrying cannot help, so this is not a 503
+            self._send_json(413, {"error": f"Batch of {len(items)} items exceeds the limit of {service.max_batch}"})
+            return
+
+        try:
+            if self.path == "/analyze":
+                self._send_json(200, service.analyze(*items[0]))
+            else:
+                self._send_json(200, {"results": service.analyze_batch(items)})
+        except BatchTooLarge as e:
+            self._send_json(413, {"error": str(e)})
+        except ServerBusy as e:
+            self._send_json(503, {"error": str(e)}, headers={"Retry-After": "1"})
+        except concurrent.futures.TimeoutError:
+            self._send_json(504, {"error": f"Analysis did not finish within {service.timeout} seconds"})
+        except Exception as e:
+            logger.exception("Analysis request failed")
+            self._send_json(500, {"error": str(e)})
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(payload, default=str).encode('utf-8'), "application/json", headers)
+
+    def _send(self, status: int, data: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self) -> str:
+        # Unix socket peers have no host/port pair
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def _parse_item(item: Dict) -> Tuple[str, Optional[Dict]]:
+    response = item["response"] if isinstance(item, dict) and "response" in item else None
+    if not isinstance(response, str):
+        raise ValueError("'response' must be a string")
+    context = item.get("context")
+    if context is not None and not isinstance(context, dict):
+        raise ValueError("'context' must be an object")
+    return response, context
+
+
+class AnalysisHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server on a TCP port"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: AnalysisService):
+        super().__init__(address, AnalysisRequestHandler)
+        self.service = service
+
+    def describe(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class UnixAnalysisHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server on a Unix domain socket"""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, service: AnalysisService):
+        path = Path(path)
+        if path.exists():
+            path.unlink()
+        super().__init__(str(path), AnalysisRequestHandler)
+        os.chmod(path, 0o600)
+        self.service = service
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+
+    def describe(self) -> str:
+        return f"unix://{self.server_address}"
+
+
+def create_server(service: AnalysisService, host: Optional[str] = None, port: Optional[int] = None,
+                  socket_path: Optional[Path] = None):
+    """Bind a server for ``service`` to a Unix socket or a TCP address"""
+    socket_path = socket_path or settings.SERVER_SOCKET
+    if socket_path:
+        return UnixAnalysisHTTPServer(socket_path, service)
+    return AnalysisHTTPServer((host or settings.SERVER_HOST, settings.SERVER_PORT if port is None else port), service)
+
+
+def serve(guard, host: Optional[str] = None, port: Optional[int] = None,
+          socket_path: Optional[Path] = None, queue_size: Optional[int] = None,
+          ready=None):
+    """Serve ``guard`` until SIGINT/SIGTERM, then drain requests and flush output
+
+    ``ready`` is called with the server's address once it accepts requests.
+    """
+    service = AnalysisService(
+        guard,
+        queue_size=queue_size or settings.SERVER_QUEUE_SIZE,
+        timeout=settings.SERVER_REQUEST_TIMEOUT,
+        max_batch=settings.SERVER_MAX_BATCH
+    )
+    server = create_server(service, host, port, socket_path)
+
+    def request_shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down")
+        # shutdown() blocks until serve_forever returns, so it cannot run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    previous = {sig: signal.signal(sig, request_shutdown) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        logger.info(f"Serving RogueGuard on {server.describe()}")
+        if ready is not None:
+            ready(server.describe())
+        server.serve_forever()
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        server.server_close()
+        service.close(drain_timeout=settings.SERVER_REQUEST_TIMEOUT)
+        logger.info("RogueGuard server stopped")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServerError(Exception):
+    """Error response from a RogueGuard server"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Server returned {status}: {message}")
+        self.status = status
+
+
+class AnalysisClient:
+    """Thin client for a running ``rogueguard serve``
+
+    ``url`` is ``http://host:port`` or ``unix:///path/to/socket``. The
+    connection is reused across calls. A request is only sent again after
+    a dropped connection if it never reached the server or is a ``GET``;
+    an analysis request that may have been received raises instead of
+    being analyzed twice.
+    """
+
+    def __init__(self, url: str, timeout: Optional[float] = None):
+        self.url = url
+        self.timeout = settings.SERVER_REQUEST_TIMEOUT + 10 if timeout is None else timeout
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        parts = urlsplit(self.url)
+        if parts.scheme == "unix":
+            return _UnixHTTPConnection(parts.path, timeout=self.timeout)
+        if parts.scheme == "http":
+            return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=self.timeout)
+        raise ValueError(f"Unsupported server URL: {self.url}")
+
+    def _request(self, method: str, path: str, payload: Optional[Dict] = None) -> Dict:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            if self._connection is not None and self._idle_connection_closed():
+                self.close()
+            if self._connection is None:
+                self._connection = self._connect()
+            sent = False
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                sent = True
+                response = self._connection.getresponse()
+                data = json.loads(response.read() or b"{}")
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The server closed a keep-alive connection; reconnect once if resending is safe
+                self.close()
+                if attempt or (sent and method not in IDEMPOTENT_METHODS):
+                    raise
+        if response.status != 200:
+            raise ServerError(response.status, data.get("error", response.reason))
+        return data
+
+    def _idle_connection_closed(self) -> bool:
+        """Whether the server has closed the kept-alive connection since the last response
+
+        Nothing is expected on an idle connection, so a readable socket
+        means the server hung up (or sent something we cannot use).
+        """
+        sock = self._connection.sock
+        if sock is None:
+            return False
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable)
+
+    def analyze(self, ai_response: str, context: Optional[Dict] = None) -> Dict:
+        return self._request("POST", "/analyze", {"response": ai_response, "context": context})
+
+    def analyze_batch(self, items: List[Tuple[str, Optional[Dict]]]) -> List[Dict]:
+        payload = {"items": [{"response": response, "context": context} for response, context in items]}
+        return self._request("POST", "/analyze/batch", payload)["results"]
+
+    def health(self) -> Dict:
+        return self._request("GET", "/health")
+
+    def stats(self) -> Dict:
+        return self._request("GET", "/stats")
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,131 @@
+from typing import Dict, Optional
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_FILENAME = "ai_analysis.sqlite3"
+
+
+def cache_key(ai_response: str, context: Optional[Dict], model_id: str, prompt_version: str) -> str:
+    """Content-addressed key for an AI analysis request"""
+    normalized = re.sub(r"\s+", " ", ai_response).strip()
+    payload = json.dumps(
+        [normalized, context, model_id, prompt_version],
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier cache of AI analyses: in-process LRU backed by SQLite
+
+    Entries older than ``ttl`` seconds are treated as misses and purged.
+    The memory tier holds at most ``max_memory_entries``; the disk tier is
+    trimmed to ``max_disk_entries`` by least recent access (0 disables it).
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_memory_entries: int = 1024,
+                 max_disk_entries: int = 100000, ttl: float = 7 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._purge_interval = max(1, min(1000, max_disk_entries // 10))
+        self._db = None
+
+        if path is not None and max_disk_entries > 0:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached analysis for ``key``, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] < self.ttl:
+                    self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats["disk_hits"] += 1
+                    return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Dict):
+        """Store an analysis in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, default=str), now, now)
+                )
+                self._db.commit()
+                self._writes += 1
+                if self._writes % self._purge_interval == 0:
+                    self._purge(now)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from either tier"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def _remember(self, key: str, created: float, value: Dict):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _purge(self, now: float):
+        """Remove expired entries and trim the disk tier to its size limit"""
+        self._db.execute("DELETE FROM cache WHERE created <= ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        self._db.commit()
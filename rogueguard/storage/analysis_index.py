@@ -0,0 +1,298 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import sqlite3
+import threading
+
+from ..config.settings import settings
+from .analysis_sink import analysis_files
+
+INDEX_FILENAME = "analysis_index.sqlite3"
+
+# Columns returned by queries, in order
+COLUMNS = ("analysis_id", "timestamp", "kind", "risk_level", "behavior_risk_level",
+           "total_risk", "fused_risk", "session", "file", "source")
+
+# Expressions usable with ``aggregate(group_by=...)``
+GROUPS = {
+    "risk_level": "risk_level",
+    "session": "session",
+    "kind": "kind",
+    "file": "file",
+    "day": "substr(timestamp, 1, 10)",
+    "hour": "substr(timestamp, 1, 13)"
+}
+
+ORDERS = {
+    "newest": "timestamp DESC",
+    "oldest": "timestamp ASC",
+    "risk": "total_risk DESC"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_id TEXT PRIMARY KEY,
+    timestamp TEXT,
+    kind TEXT,
+    risk_level TEXT,
+    behavior_risk_level TEXT,
+    total_risk REAL,
+    fused_risk REAL,
+    session TEXT,
+    file TEXT,
+    risk_scores TEXT,
+    source TEXT,
+    position INTEGER
+);
+CREATE INDEX IF NOT EXISTS analyses_timestamp ON analyses (timestamp, risk_level, total_risk);
+CREATE INDEX IF NOT EXISTS analyses_level_timestamp ON analyses (risk_level, timestamp);
+CREATE INDEX IF NOT EXISTS analyses_total_risk ON analyses (total_risk);
+CREATE INDEX IF NOT EXISTS analyses_session_timestamp ON analyses (session, timestamp);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    position INTEGER
+);
+"""
+
+
+def index_row(analysis: Dict, source: str, position: int) -> Tuple:
+    """Indexed columns of one saved analysis"""
+    behavior = analysis.get("behavior_analysis") or {}
+    fused = analysis.get("fused_risk") or {}
+    if "directory" in analysis:
+        kind = "directory"
+    elif "file" in analysis:
+        kind = "file"
+    else:
+        kind = "interaction"
+    return (
+        analysis.get("analysis_id") or f"{Path(source).name}:{position}",
+        analysis.get("timestamp"),
+        kind,
+        analysis.get("risk_level"),
+        behavior.get("risk_level"),
+        behavior.get("total_risk"),
+        fused.get("total_risk"),
+        (behavior.get("session") or {}).get("session"),
+        analysis.get("file") or analysis.get("directory"),
+        json.dumps(behavior["risk_scores"]) if behavior.get("risk_scores") else None,
+        source,
+        position
+    )
+
+
+class AnalysisIndex:
+    """SQLite index over saved analysis results
+
+    Only the queryable fields are indexed; the full analysis stays in the
+    sink's own files and is read back from its recorded position on demand.
+    ``refresh`` ingests incrementally: JSONL parts resume from the byte
+    offset reached last time, the SQLite sink from the last row, and JSON
+    and Parquet files are read again only when their size or mtime changes.
+    """
+
+    def __init__(self, path: Optional[Path] = None, analysis_dir: Optional[Path] = None):
+        settings.ensure_directories()
+        self.analysis_dir = Path(analysis_dir or settings.ANALYSIS_DIR)
+        self.path = Path(path or self.analysis_dir / INDEX_FILENAME)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # Ingestion
+
+    def refresh(self, paths: Optional[Iterable[Path]] = None, batch_size: int = 5000) -> Dict[str, int]:
+        """Index analyses written since the last refresh"""
+        files: List[Path] = []
+        for path in (paths or [self.analysis_dir]):
+            path = Path(path)
+            files.extend(analysis_files(path) if path.is_dir() else [path])
+
+        counts = {"files": 0, "analyses": 0}
+        with self._lock:
+            known = {
+                row[0]: row[1:] for row in self._db.execute("SELECT path, size, mtime_ns, position FROM sources")
+            }
+            for file in files:
+                if file.resolve() == self.path.resolve():
+                    continue
+                stat = file.stat()
+                size, mtime_ns, position = known.get(str(file), (None, None, 0))
+                is_database = file.suffix in (".sqlite3", ".db")
+                # SQLite writes land in its WAL first, so the database's own stats say nothing
+                if not is_database and size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+                    continue
+                if file.suffix not in (".jsonl", ".sqlite3", ".db"):
+                    position = 0
+                added, position = self._ingest_file(file, position, stat.st_size, batch_size)
+                if is_database and not added and size is not None:
+                    continue
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sources (path, size, mtime_ns, position) VALUES (?, ?, ?, ?)",
+                    (str(file), stat.st_size, stat.st_mtime_ns, position)
+                )
+                self._db.commit()
+                counts["files"] += 1
+                counts["analyses"] += added
+        return counts
+
+    def _ingest_file(self, file: Path, position: int, size: int, batch_size: int) -> Tuple[int, int]:
+        """Index one file from ``position``; returns rows added and the new position"""
+        if file.suffix == ".jsonl" and position > size:
+            # Replaced or truncated since the last refresh
+            position = 0
+        added = 0
+        batch = []
+        for analysis, row_position, next_position in self._read(file, position):
+            batch.append(index_row(analysis, str(file), row_position))
+            position = next_position
+            if len(batch) >= batch_size:
+                added += self._insert(batch)
+                batch = []
+        added += self._insert(batch)
+        return added, position
+
+    def _insert(self, rows: List[Tuple]) -> int:
+        if rows:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def _read(self, file: Path, position: int) -> Iterator[Tuple[Dict, int, int]]:
+        """Yield ``(analysis, position, next_position)`` from a sink file
+
+        Positions are byte offsets for JSONL, row numbers for Parquet and
+        rowids for the SQLite sink. A JSONL line without its newline is
+        still being written and is left for the next refresh.
+        """
+        if file.suffix == ".jsonl":
+            with open(file, 'rb') as f:
+                f.seek(position)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    start, position = position, position + len(line)
+                    try:
+                        yield json.loads(line), start, position
+                    except json.JSONDecodeError:
+                        continue
+        elif file.suffix == ".json":
+            with open(file, 'r') as f:
+                data = json.load(f)
+            for i, analysis in enumerate(data if isinstance(data, list) else [data]):
+                yield analysis, i, 0
+        elif file.suffix == ".parquet":
+            import pandas as pd
+            for i, payload in enumerate(pd.read_parquet(file, columns=["payload"])["payload"]):
+                yield json.loads(payload), i, 0
+        elif file.suffix in (".sqlite3", ".db"):
+            db = sqlite3.connect(f"file:{file}?mode=ro", uri=True)
+            try:
+                for rowid, payload in db.execute(
+                    "SELECT rowid, payload FROM analyses WHERE rowid > ? ORDER BY rowid", (position,)
+                ):
+                    yield json.loads(payload), rowid, rowid
+            finally:
+                db.close()
+
+    # Queries
+
+    def _where(self, since: Optional[str] = None, until: Optional[str] = None,
+               risk_levels: Optional[Sequence[str]] = None, min_risk: Optional[float] = None,
+               max_risk: Optional[float] = None, session: Optional[str] = None,
+               file: Optional[str] = None, kind: Optional[str] = None) -> Tuple[str, List]:
+        clauses, params = [], []
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if risk_levels:
+            clauses.append(f"risk_level IN ({', '.join('?' * len(risk_levels))})")
+            params.extend(level.upper() for level in risk_levels)
+        if min_risk is not None:
+            clauses.append("total_risk >= ?")
+            params.append(min_risk)
+        if max_risk is not None:
+            clauses.append("total_risk <= ?")
+            params.append(max_risk)
+        if session:
+            clauses.append("session = ?")
+            params.append(session)
+        if file:
+            clauses.append("file LIKE ?")
+            params.append(f"%{file}%")
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, order: str = "newest", limit: Optional[int] = 100, offset: int = 0,
+              **filters) -> Iterator[Dict]:
+        """Matching rows, streamed from a cursor rather than loaded at once"""
+        where, params = self._where(**filters)
+        sql = f"SELECT {', '.join(COLUMNS)}, risk_scores FROM analyses{where} ORDER BY {ORDERS[order]}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        for row in self._db.execute(sql, params):
+            record = dict(zip(COLUMNS, row))
+            record["risk_scores"] = json.loads(row[-1]) if row[-1] else {}
+            yield record
+
+    def count(self, **filters) -> int:
+        where, params = self._where(**filters)
+        return self._db.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+
+    def aggregate(self, group_by: str = "risk_level", **filters) -> List[Dict]:
+        """Count, mean and max total risk per group"""
+        expression = GROUPS[group_by]
+        where, params = self._where(**filters)
+        rows = self._db.execute(
+            f"SELECT {expression} AS grp, COUNT(*), AVG(total_risk), MAX(total_risk), MIN(timestamp), MAX(timestamp) "
+            f"FROM analyses{where} GROUP BY grp ORDER BY COUNT(*) DESC",
+            params
+        )
+        return [
+            {
+                group_by: group, "count": count,
+                "mean_total_risk": round(mean, 6) if mean is not None else None,
+                "max_total_risk": maximum, "first": first, "last": last
+            }
+            for group, count, mean, maximum, first, last in rows
+        ]
+
+    def load(self, analysis_id: str) -> Optional[Dict]:
+        """Read the full analysis back from its sink file"""
+        row = self._db.execute(
+            "SELECT source, position FROM analyses WHERE analysis_id = ?", (analysis_id,)
+        ).fetchone()
+        if row is None or not Path(row[0]).exists():
+            return None
+        source, position = Path(row[0]), row[1]
+        if source.suffix == ".jsonl":
+            with open(source, 'rb') as f:
+                f.seek(position)
+                return json.loads(f.readline())
+        if source.suffix in (".sqlite3", ".db"):
+            db = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+            try:
+                row = db.execute("SELECT payload FROM analyses WHERE analysis_id = ?", (analysis_id,)).fetchone()
+            finally:
+                db.close()
+            return json.loads(row[0]) if row else None
+        for analysis, row_position, _ in self._read(source, 0):
+            if row_position == position:
+                return analysis
+        return None
@@ -0,0 +1,356 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+from ..config.settings import settings
+
+logger = logging.getLogger("rogueguard.sink")
+
+
+def new_analysis_id() -> str:
+    """Unique, roughly time-ordered identifier for an analysis"""
+    return f"{time.time_ns():x}-{uuid.uuid4().hex[:12]}"
+
+
+def summarize_analysis(analysis: Dict) -> Dict[str, Any]:
+    """Flatten the indexable fields of an analysis into scalar columns"""
+    behavior = analysis.get("behavior_analysis") or {}
+    row = {
+        "analysis_id": analysis.get("analysis_id"),
+        "timestamp": analysis.get("timestamp"),
+        "risk_level": analysis.get("risk_level"),
+        "behavior_risk_level": behavior.get("risk_level"),
+        "total_risk": behavior.get("total_risk"),
+        "file": analysis.get("file")
+    }
+    for factor, score in (behavior.get("risk_scores") or {}).items():
+        row[f"score_{factor}"] = score
+    return row
+
+
+class AnalysisSink:
+    """Base class for analysis output backends
+
+    Analyses are buffered and written in batches once ``flush_records``
+    are pending or ``flush_seconds`` have passed since the last flush.
+    The age limit is also enforced by a background thread, so records are
+    written during quiet periods without waiting for the next write.
+    Every analysis is given a unique ``analysis_id`` before it is buffered.
+
+    Callers must ``close`` the sink to write what is still buffered.
+    """
+
+    def __init__(self, flush_records: int = 100, flush_seconds: float = 5.0):
+        self.flush_records = max(flush_records, 1)
+        self.flush_seconds = flush_seconds
+        self._buffer: List[Dict] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def write(self, analysis: Dict) -> str:
+        """Buffer one analysis and return its ID"""
+        return self.write_many([analysis])[0]
+
+    def write_many(self, analyses: List[Dict]) -> List[str]:
+        """Buffer several analyses and return their IDs"""
+        ids = []
+        with self._lock:
+            for analysis in analyses:
+                analysis.setdefault("analysis_id", new_analysis_id())
+                ids.append(analysis["analysis_id"])
+                self._buffer.append(analysis)
+            if (len(self._buffer) >= self.flush_records
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self._flush_locked()
+            elif self._flusher is None and self.flush_seconds > 0 and not self._closed.is_set():
+                self._start_flusher()
+        return ids
+
+    def flush(self):
+        """Write every buffered analysis"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Stop the background flusher, flush and release resources"""
+        self._closed.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+
+    def describe(self) -> str:
+        """Human-readable location of the output"""
+        return self.__class__.__name__
+
+    @property
+    def buffered(self) -> int:
+        """Number of analyses waiting for the next flush"""
+        return len(self._buffer)
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._write_batch(self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def _start_flusher(self):
+        # The thread only holds a weak reference, so an abandoned sink can still be collected
+        self._flusher = threading.Thread(
+            target=_flush_periodically, args=(weakref.ref(self), self._closed, self.flush_seconds),
+            name=f"rogueguard-{self.__class__.__name__}-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def _flush_if_due(self):
+        with self._lock:
+            if self._buffer and time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush_locked()
+
+    def _write_batch(self, analyses: List[Dict]):
+        raise NotImplementedError
+
+
+def _flush_periodically(sink_ref: "weakref.ref[AnalysisSink]", closed: threading.Event, interval: float):
+    """Flush a sink's buffer once it is ``interval`` seconds old, until the sink is closed or collected"""
+    while not closed.wait(interval / 2):
+        sink = sink_ref()
+        if sink is None:
+            return
+        try:
+            sink._flush_if_due()
+        except Exception:
+            logger.exception("Background flush of %s failed", sink.describe())
+        del sink
+
+
+class JSONFileSink(AnalysisSink):
+    """Legacy sink writing one pretty-printed JSON file per analysis"""
+
+    def __init__(self, directory: Path):
+        super().__init__(flush_records=1)
+        self.directory = Path(directory)
+
+    def _write_batch(self, analyses: List[Dict]):
+        for analysis in analyses:
+            path = self.directory / f"analysis_{analysis['timestamp']}_{analysis['analysis_id'][-12:]}.json"
+            with open(path, 'w') as f:
+                json.dump(analysis, f, indent=2)
+
+    def describe(self) -> str:
+        return str(self.directory)
+
+
+class _RotatingFileSink(AnalysisSink):
+    """Shared naming and rotation for sinks writing files per process"""
+
+    SUFFIX = ""
+
+    def __init__(self, directory: Path, rotate_bytes: int = 128 * 1024 * 1024,
+                 rotate_seconds: float = 3600.0, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self._sequence = 0
+        self._opened_at = 0.0
+        self.current_path: Optional[Path] = None
+
+    def _next_path(self) -> Path:
+        """New file name, unique per process so writers never share a file"""
+        self._sequence += 1
+        self._opened_at = time.monotonic()
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.current_path = self.directory / f"analyses-{stamp}-{os.getpid()}-{self._sequence:04d}{self.SUFFIX}"
+        return self.current_path
+
+    def _needs_rotation(self) -> bool:
+        if self.current_path is None:
+            return True
+        if self.rotate_seconds > 0 and time.monotonic() - self._opened_at >= self.rotate_seconds:
+            return True
+        return (self.rotate_bytes > 0 and self.current_path.exists()
+                and self.current_path.stat().st_size >= self.rotate_bytes)
+
+    def describe(self) -> str:
+        return str(self.current_path or self.directory)
+
+
+class JSONLSink(_RotatingFileSink):
+    """Buffered JSONL output rotated by size and age"""
+
+    SUFFIX = ".jsonl"
+
+    def _write_batch(self, analyses: List[Dict]):
+        if self._needs_rotation():
+            self._next_path()
+        with open(self.current_path, 'a') as f:
+            f.write("".join(json.dumps(analysis, default=str) + "\n" for analysis in analyses))
+
+
+class ParquetSink(_RotatingFileSink):
+    """Columnar output: each flush writes one Parquet part file
+
+    Indexable fields are stored as typed columns and the full analysis as
+    a JSON ``payload`` column. Requires pyarrow or fastparquet.
+    """
+
+    SUFFIX = ".parquet"
+
+    def __init__(self, directory: Path, **kwargs):
+        super().__init__(directory, **kwargs)
+        import pandas  # noqa: F401
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            try:
+                import fastparquet  # noqa: F401
+            except ImportError:
+                raise ImportError("The parquet output sink requires 'pyarrow' or 'fastparquet'")
+
+    def _write_batch(self, analyses: List[Dict]):
+        import pandas as pd
+
+        rows = [
+            {**summarize_analysis(analysis), "payload": json.dumps(analysis, default=str)}
+            for analysis in analyses
+        ]
+        pd.DataFrame(rows).to_parquet(self._next_path(), index=False)
+
+
+class SQLiteSink(AnalysisSink):
+    """SQLite output with indexable columns and the full analysis as JSON"""
+
+    def __init__(self, path: Path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "analysis_id TEXT PRIMARY KEY, timestamp TEXT, risk_level TEXT, "
+            "total_risk REAL, payload TEXT NOT NULL)"
+        )
+        self._db.commit()
+
+    def _write_batch(self, analyses: List[Dict]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO analyses (analysis_id, timestamp, risk_level, total_risk, payload) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (row["analysis_id"], row["timestamp"], row["risk_level"], row["total_risk"],
+                 json.dumps(analysis, default=str))
+                for analysis, row in ((a, summarize_analysis(a)) for a in analyses)
+            ]
+        )
+        self._db.commit()
+
+    def close(self):
+        super().close()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def describe(self) -> str:
+        return str(self.path)
+
+
+def create_analysis_sink(kind: Optional[str] = None) -> AnalysisSink:
+    """Build the output sink selected by ``settings.OUTPUT_SINK``"""
+    kind = kind or settings.OUTPUT_SINK
+    buffering = {
+        "flush_records": settings.OUTPUT_FLUSH_RECORDS,
+        "flush_seconds": settings.OUTPUT_FLUSH_SECONDS
+    }
+    rotation = {
+        "rotate_bytes": settings.OUTPUT_ROTATE_BYTES,
+        "rotate_seconds": settings.OUTPUT_ROTATE_SECONDS
+    }
+
+    if kind == "json":
+        return JSONFileSink(settings.ANALYSIS_DIR)
+    if kind == "jsonl":
+        return JSONLSink(settings.ANALYSIS_DIR / "results", **rotation, **buffering)
+    if kind == "parquet":
+        return ParquetSink(settings.ANALYSIS_DIR / "results", **rotation, **buffering)
+    if kind == "sqlite":
+        return SQLiteSink(settings.ANALYSIS_DIR / "analyses.sqlite3", **buffering)
+    raise ValueError(f"Unknown output sink: {kind}")
+
+
+def create_chunk_sink() -> AnalysisSink:
+    """JSONL sink for the per-chunk rows of streamed file analyses
+
+    Rows are kept apart from the analyses under ``ANALYSIS_DIR/chunks``,
+    one line per chunk with its file, offsets and scores.
+    """
+    return JSONLSink(
+        settings.ANALYSIS_DIR / "chunks",
+        rotate_bytes=settings.OUTPUT_ROTATE_BYTES,
+        rotate_seconds=settings.OUTPUT_ROTATE_SECONDS,
+        flush_records=settings.STREAM_BATCH_SIZE,
+        flush_seconds=settings.OUTPUT_FLUSH_SECONDS
+    )
+
+
+def read_analyses(path: Path) -> Iterator[Dict]:
+    """Analyses stored in one sink output file
+
+    Handles every sink's format: a single-analysis JSON file, JSONL result
+    parts, Parquet parts and the SQLite database. Incomplete trailing lines
+    of a part that is still being written are skipped.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        yield from (data if isinstance(data, list) else [data])
+    elif path.suffix == ".jsonl":
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    elif path.suffix == ".parquet":
+        import pandas as pd
+        for payload in pd.read_parquet(path, columns=["payload"])["payload"]:
+            yield json.loads(payload)
+    elif path.suffix in (".sqlite3", ".db"):
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for (payload,) in db.execute("SELECT payload FROM analyses ORDER BY timestamp"):
+                yield json.loads(payload)
+        finally:
+            db.close()
+    else:
+        raise ValueError(f"Unrecognized analysis file: {path}")
+
+
+def analysis_files(directory: Path) -> List[Path]:
+    """Sink output files under an analysis directory, oldest first per sink"""
+    directory = Path(directory)
+    return (
+        sorted(directory.glob("analysis_*.json"))
+        + sorted((directory / "results").glob("*.jsonl"))
+        + sorted((directory / "results").glob("*.parquet"))
+        + sorted(directory.glob("analyses*.sqlite3"))
+    )
+
+
+def iter_saved_analyses(paths: Optional[Iterable[Path]] = None) -> Iterator[Dict]:
+    """Saved analyses from files or analysis directories (default ``ANALYSIS_DIR``)"""
+    for path in (paths or [settings.ANALYSIS_DIR]):
+        path = Path(path)
+        for file in (analysis_files(path) if path.is_dir() else [path]):
+            yield from read_analyses(file)
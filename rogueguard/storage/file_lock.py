@@ -0,0 +1,123 @@
+from typing import Optional, Union
+from pathlib import Path
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; msvcrt byte-range locks give the same exclusion
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive advisory lock shared by every process using the same lock file
+
+    POSIX systems use ``flock``, which the kernel releases if the holder
+    dies, so a crashed writer never leaves the lock stuck. The lock is
+    re-entrant within a process and also serializes threads, since
+    ``flock`` alone does not exclude threads sharing one descriptor. The
+    lock file stays open between acquisitions and is reopened after a
+    fork, since a forked child would otherwise share the parent's lock.
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: Optional[float] = None, poll_interval: float = 0.01):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+
+    def acquire(self):
+        if not self._thread_lock.acquire(timeout=-1 if self.timeout is None else self.timeout):
+            raise TimeoutError(f"Timed out waiting for {self.path}")
+        if self._depth:
+            self._depth += 1
+            return
+        try:
+            self._lock_file()
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._depth = 1
+
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            self._unlock_file()
+        self._thread_lock.release()
+
+    def close(self):
+        """Close the lock file; the next ``acquire`` reopens it"""
+        with self._thread_lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+    def _open(self) -> int:
+        if self._fd is None or self._pid != os.getpid():
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            except FileNotFoundError:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _lock_file(self):
+        fd = self._open()
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | (fcntl.LOCK_NB if deadline is not None else 0))
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.path}")
+                time.sleep(self.poll_interval)
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def lock_path(path: Union[str, Path]) -> Path:
+    """Sidecar lock file guarding ``path``"""
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+def atomic_write(path: Union[str, Path], data: Union[str, bytes]):
+    """Replace ``path`` with ``data`` so readers see the old or new file, never a partial one
+
+    The data is written and fsynced to a temporary file in the same
+    directory, then renamed over the target.
+    """
+    path = Path(path)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data.encode('utf-8') if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,370 @@
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from collections import Counter
+from datetime import datetime, timedelta
+import warnings
+
+import numpy as np
+
+RISK_LEVELS = ("LOW", "MODERATE", "HIGH", "CRITICAL")
+LEVEL_CODES = {level: code for code, level in enumerate(RISK_LEVELS)}
+UNKNOWN_LEVEL = 255
+
+# Fields held in the column arrays; any other field of a record is kept as is
+COLUMN_FIELDS = ("timestamp", "risk_scores", "total_risk", "risk_level", "indicators")
+
+_COLUMN_FIELD_SET = frozenset(COLUMN_FIELDS)
+
+# Marks a column field the record did not have
+MISSING = object()
+
+# Timestamps are held as microseconds since the epoch; NaT marks one kept in the extras
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NAT = np.iinfo(np.int64).min
+
+
+class Interner:
+    """Maps repeated values to small integer IDs"""
+
+    def __init__(self, initial: Iterable[Hashable] = ()):
+        self.values: List[Hashable] = []
+        self.ids: Dict[Hashable, int] = {}
+        for value in initial:
+            self.id(value)
+
+    def id(self, value: Hashable) -> int:
+        try:
+            return self.ids[value]
+        except KeyError:
+            self.ids[value] = len(self.values)
+            self.values.append(value)
+            return len(self.values) - 1
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class HistoryColumns:
+    """Bounded in-memory window of behavioral history records held as parallel arrays
+
+    A drop-in replacement for the ``deque`` of record dicts: it supports
+    ``append``, ``extend``, ``len``, iteration, indexing and ``maxlen``,
+    and yields plain dicts equal to the records that were added.
+
+    Each record is one slot of parallel NumPy arrays: a timestamp in
+    microseconds since the epoch, a row of factor scores, ``total_risk``,
+    a one-byte level code and the ID of its interned indicator list.
+    Fields the arrays do not hold (drift and session results) and values
+    that do not fit them exactly (an irregular timestamp, an unknown
+    level) are kept per slot in ``extras`` and take precedence when the
+    record is rebuilt.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None, factors: Optional[Sequence[str]] = None):
+        self.maxlen = maxlen if maxlen and maxlen > 0 else None
+        self.factors: Optional[Tuple[str, ...]] = tuple(factors) if factors else None
+        self._capacity = 0
+        self._start = 0
+        self._size = 0
+        self._timestamps = np.zeros(0, dtype=np.int64)
+        self._total_risk = np.zeros(0)
+        self._levels = np.zeros(0, dtype=np.uint8)
+        self._indicators = np.zeros(0, dtype=np.int32)
+        self._scores = np.zeros((0, len(self.factors or ())))
+        self._extras: List[Optional[Dict]] = []
+        self._indicator_lists = Interner([()])
+
+    # Deque interface
+
+    def append(self, record: Dict):
+        self.extend([record])
+
+    def extend(self, records: Iterable[Dict]):
+        records = list(records)
+        if self.maxlen is not None and len(records) > self.maxlen:
+            records = records[-self.maxlen:]
+        if not records:
+            return
+        if self.factors is None:
+            self.factors = tuple(records[0].get("risk_scores") or ())
+            self._scores = np.zeros((self._capacity, len(self.factors)))
+
+        n = len(records)
+        self._reserve(self._size + n)
+        # Make room first, so the oldest slots are free before the batch reuses them
+        self._evict(self._size + n - self._capacity)
+        position = (self._start + self._size) % self._capacity
+        if n == 1:
+            # Item assignment is several times cheaper than a one-element slice
+            for array, value in zip(self._arrays(), self._encode(records[0])):
+                array[position] = value
+            self._size += 1
+            self._maybe_compact()
+            return
+
+        columns = list(zip(*map(self._encode, records)))
+        # The batch lands in at most two contiguous runs of the ring
+        head = min(n, self._capacity - position)
+        for array, values in zip(self._arrays(), columns):
+            array[position:position + head] = values[:head]
+            if head < n:
+                array[:n - head] = values[head:]
+        self._size += n
+        self._maybe_compact()
+
+    def clear(self):
+        self._evict(self._size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Dict]:
+        for start, stop in self._ordered_slices():
+            yield from map(
+                self._decode,
+                self._timestamps[start:stop].tolist(),
+                self._scores[start:stop].tolist(),
+                self._total_risk[start:stop].tolist(),
+                self._levels[start:stop].tolist(),
+                self._indicators[start:stop].tolist(),
+                self._extras[start:stop]
+            )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        position = (self._start + index) % self._capacity
+        return self._decode(
+            self._timestamps[position].item(),
+            self._scores[position].tolist(),
+            self._total_risk[position].item(),
+            self._levels[position].item(),
+            self._indicators[position].item(),
+            self._extras[position]
+        )
+
+    def __repr__(self) -> str:
+        return f"HistoryColumns(len={self._size}, maxlen={self.maxlen})"
+
+    # Encoding
+
+    def _arrays(self) -> Tuple:
+        """The per-slot storage, in the order of ``_encode``'s values"""
+        return (self._timestamps, self._scores, self._total_risk, self._levels, self._indicators, self._extras)
+
+    def _encode(self, record: Dict) -> Tuple:
+        """Array values of one record, and the fields the arrays cannot reproduce exactly"""
+        extras = {key: record[key] for key in record.keys() - _COLUMN_FIELD_SET}
+
+        timestamp = record.get("timestamp", MISSING)
+        micros = NAT
+        try:
+            parsed = datetime.fromisoformat(timestamp)
+            # Only naive timestamps that print back identically are stored as numbers
+            if parsed.tzinfo is None and parsed.isoformat() == timestamp:
+                micros = (parsed - EPOCH) // MICROSECOND
+        except (TypeError, ValueError, OverflowError):
+            pass
+        if micros == NAT:
+            extras["timestamp"] = timestamp
+
+        total_risk = record.get("total_risk", MISSING)
+        if type(total_risk) is not float:
+            extras["total_risk"] = total_risk
+            total_risk = _number(total_risk)
+
+        level = record.get("risk_level", MISSING)
+        level_code = LEVEL_CODES.get(level, UNKNOWN_LEVEL) if isinstance(level, str) else UNKNOWN_LEVEL
+        if level_code == UNKNOWN_LEVEL:
+            extras["risk_level"] = level
+
+        indicators = record.get("indicators", MISSING)
+        if type(indicators) is list and set(map(type, indicators)) <= _STR:
+            indicator_id = self._indicator_lists.id(tuple(indicators))
+        else:
+            extras["indicators"] = indicators
+            indicator_id = -1
+
+        scores = record.get("risk_scores", MISSING)
+        values = list(map(scores.get, self.factors)) if type(scores) is dict else None
+        if values is None or len(scores) != len(self.factors) or set(map(type, values)) - _FLOAT:
+            extras["risk_scores"] = scores
+            values = [_number(value) for value in values] if values is not None else [np.nan] * len(self.factors)
+
+        return micros, values, total_risk, level_code, indicator_id, extras or None
+
+    def _decode(self, micros: int, scores: List[float], total_risk: float,
+                level: int, indicator_id: int, extras: Optional[Dict]) -> Dict:
+        record = {
+            "timestamp": (EPOCH + micros * MICROSECOND).isoformat() if micros != NAT else None,
+            "risk_scores": dict(zip(self.factors, scores)),
+            "total_risk": total_risk,
+            "risk_level": RISK_LEVELS[level] if level != UNKNOWN_LEVEL else None,
+            "indicators": list(self._indicator_lists.values[indicator_id]) if indicator_id >= 0 else None
+        }
+        if extras:
+            for key, value in extras.items():
+                if value is MISSING:
+                    del record[key]
+                else:
+                    record[key] = value
+        return record
+
+    # Storage
+
+    def _reserve(self, needed: int):
+        """Grow the arrays up to ``maxlen``; beyond that the ring wraps"""
+        if needed <= self._capacity or (self.maxlen is not None and self._capacity >= self.maxlen):
+            return
+        capacity = max(needed, self._capacity * 2, 64)
+        if self.maxlen is not None:
+            capacity = min(capacity, self.maxlen)
+        timestamps = np.full(capacity, NAT, dtype=np.int64)
+        scores = np.full((capacity, len(self.factors)), np.nan)
+        total_risk = np.full(capacity, np.nan)
+        levels = np.full(capacity, UNKNOWN_LEVEL, dtype=np.uint8)
+        indicators = np.full(capacity, -1, dtype=np.int32)
+        extras: List[Optional[Dict]] = [None] * capacity
+        for new, old in zip((timestamps, scores, total_risk, levels, indicators, extras), self._arrays()):
+            new[:self._size] = self._ordered(old)
+        self._timestamps, self._scores, self._total_risk = timestamps, scores, total_risk
+        self._levels, self._indicators, self._extras = levels, indicators, extras
+        self._capacity = capacity
+        self._start = 0
+
+    def _evict(self, count: int):
+        """Forget the oldest ``count`` records"""
+        count = min(count, self._size)
+        if count <= 0:
+            return
+        for start, stop in self._ordered_slices(count):
+            self._extras[start:stop] = [None] * (stop - start)
+        self._size -= count
+        self._start = (self._start + count) % self._capacity if self._size else 0
+
+    def _ordered_slices(self, count: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+        """``(start, stop)`` slot ranges covering the oldest ``count`` records (default all), oldest first"""
+        count = self._size if count is None else count
+        end = self._start + count
+        if end <= self._capacity:
+            if count:
+                yield self._start, end
+        else:
+            yield self._start, self._capacity
+            yield 0, end - self._capacity
+
+    def _ordered(self, array):
+        parts = [array[start:stop] for start, stop in self._ordered_slices()]
+        if isinstance(array, list):
+            return [value for part in parts for value in part]
+        return np.concatenate(parts) if parts else array[:0]
+
+    def _maybe_compact(self):
+        """Drop interned indicator lists no held record refers to any more
+
+        New indicator combinations keep appearing in a long run, so without
+        this the lookup table of a bounded window would grow without limit.
+        """
+        if self.maxlen is None or len(self._indicator_lists) <= 4 * self.maxlen + 4096:
+            return
+        live = self._indicators[:self._size]
+        used = np.unique(live[live >= 0])
+        lookup = np.full(len(self._indicator_lists), -1, dtype=np.int32)
+        lookup[used] = np.arange(len(used), dtype=np.int32)
+        self._indicators[:self._size] = np.where(live >= 0, lookup[live], -1)
+        self._indicator_lists = Interner(self._indicator_lists.values[i] for i in used)
+
+    # Aggregates
+
+    def _selected(self, since: Optional[str] = None) -> np.ndarray:
+        """Mask over the held slots of the records at or after ``since``
+
+        The arrays only wrap once they are full, so the held records are
+        always the first ``len(self)`` slots.
+        """
+        if since is None:
+            return np.ones(self._size, dtype=bool)
+        return self._timestamps[:self._size].view("datetime64[us]") >= np.datetime64(since, "us")
+
+    def _factor_values(self, since: Optional[str] = None) -> Tuple[List[str], np.ndarray]:
+        """Factor scores and ``total_risk`` of the selected records as one matrix"""
+        mask = self._selected(since)
+        values = np.column_stack([self._scores[:self._size][mask], self._total_risk[:self._size][mask]])
+        return list(self.factors or ()) + ["total_risk"], values
+
+    def factor_means(self, since: Optional[str] = None) -> Dict[str, Optional[float]]:
+        """Mean of each factor score and of ``total_risk``"""
+        names, values = self._factor_values(since)
+        if not len(values):
+            return {name: None for name in names}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+        return {name: _optional(mean) for name, mean in zip(names, means)}
+
+    def factor_percentiles(self, percentiles: Sequence[float] = (50, 90, 99),
+                           since: Optional[str] = None) -> Dict[str, List[Optional[float]]]:
+        """Percentiles of each factor score and of ``total_risk``, in the order requested"""
+        names, values = self._factor_values(since)
+        if not len(values):
+            return {name: [None] * len(percentiles) for name in names}
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            result = np.nanpercentile(values, percentiles, axis=0)
+        return {name: [_optional(value) for value in result[:, i]] for i, name in enumerate(names)}
+
+    def level_counts(self, since: Optional[str] = None) -> Dict[str, int]:
+        """Number of records per risk level"""
+        selected = self._selected(since)
+        levels = self._levels[:self._size]
+        counts = np.bincount(levels[selected & (levels != UNKNOWN_LEVEL)], minlength=len(RISK_LEVELS))
+        result = {level: int(count) for level, count in zip(RISK_LEVELS, counts)}
+        # Levels outside RISK_LEVELS are rare and only kept in the extras
+        for slot in np.flatnonzero(selected & (levels == UNKNOWN_LEVEL)):
+            level = self._extras[slot]["risk_level"]
+            if isinstance(level, str):
+                result[level] = result.get(level, 0) + 1
+        return result
+
+    def indicator_counts(self, since: Optional[str] = None) -> Dict[str, int]:
+        """Number of records reporting each indicator, most frequent first"""
+        ids = self._indicators[:self._size][self._selected(since)]
+        counts = Counter()
+        for indicator_id, count in enumerate(np.bincount(ids[ids >= 0])):
+            if count:
+                for indicator in self._indicator_lists.values[indicator_id]:
+                    counts[indicator] += int(count)
+        return dict(counts.most_common())
+
+    def summary(self, percentiles: Sequence[float] = (50, 90, 99), since: Optional[str] = None) -> Dict:
+        """Record count, level counts, factor means and percentiles in one call"""
+        return {
+            "records": int(self._selected(since).sum()),
+            "levels": self.level_counts(since),
+            "means": self.factor_means(since),
+            "percentiles": {
+                name: dict(zip((f"p{q:g}" for q in percentiles), values))
+                for name, values in self.factor_percentiles(percentiles, since).items()
+            }
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the column arrays"""
+        return sum(array.nbytes for array in self._arrays()[:-1])
+
+
+_STR = frozenset((str,))
+_FLOAT = frozenset((float,))
+
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
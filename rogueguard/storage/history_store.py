@@ -0,0 +1,375 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pathlib import Path
+import json
+import os
+
+from ..config.settings import settings
+from .file_lock import FileLock, atomic_write, lock_path
+from .history_columns import HistoryColumns
+
+
+class HistoryStore:
+    """Base class for behavioral analysis history backends"""
+
+    def __init__(self, tail_size: int = 1000):
+        # Recent records, held column-wise rather than as one dict per record
+        self.tail = HistoryColumns(maxlen=tail_size if tail_size > 0 else None)
+
+    def append(self, record: Dict):
+        """Persist a single history record"""
+        self.extend([record])
+
+    def extend(self, records: Iterable[Dict]):
+        """Persist several history records in one write"""
+        raise NotImplementedError
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Lazily iterate over every stored record, oldest first"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Flush buffered records to disk"""
+
+    def close(self):
+        """Flush and release any open file handles"""
+        self.flush()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.iter_records())
+
+
+class MemoryHistoryStore(HistoryStore):
+    """Backend holding records in memory until another store persists them
+
+    Used by worker processes, which hand their records to the parent's
+    store instead of writing history files themselves.
+    """
+
+    def __init__(self, tail_size: int = 1000):
+        super().__init__(tail_size)
+        self.records: List[Dict] = []
+
+    def extend(self, records: Iterable[Dict]):
+        records = list(records)
+        self.records.extend(records)
+        self.tail.extend(records)
+
+    def iter_records(self) -> Iterator[Dict]:
+        return iter(list(self.records))
+
+    def drain(self) -> List[Dict]:
+        """Return and forget the records collected so far"""
+        records, self.records = self.records, []
+        return records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+class JSONHistoryStore(HistoryStore):
+    """Legacy backend keeping the whole history in a single JSON list
+
+    Every write re-serializes the full file, so this is only kept for
+    compatibility with existing ``behavior_history.json`` consumers.
+    Writes hold a lock on ``behavior_history.json.lock``, first re-read
+    the file if another process changed it, then replace it atomically,
+    so concurrent guards neither lose each other's records nor leave a
+    half-written file behind.
+    """
+
+    def __init__(self, path: Path, tail_size: int = 1000):
+        super().__init__(tail_size)
+        self.path = Path(path)
+        self.lock = FileLock(lock_path(self.path))
+        self._records: List[Dict] = []
+        self._stat = None
+        self._reload()
+        self.tail.extend(self._records)
+
+    def _reload(self):
+        """Read the file again if it changed since this process last read or wrote it"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+        if self._stat != (stat.st_size, stat.st_mtime_ns):
+            with open(self.path, 'r') as f:
+                self._records = json.load(f)
+            self._stat = (stat.st_size, stat.st_mtime_ns)
+
+    def extend(self, records: Iterable[Dict]):
+        records = list(records)
+        with self.lock:
+            self._reload()
+            self._records.extend(records)
+            atomic_write(self.path, json.dumps(self._records, indent=2))
+            stat = self.path.stat()
+            self._stat = (stat.st_size, stat.st_mtime_ns)
+        self.tail.extend(records)
+
+    def iter_records(self) -> Iterator[Dict]:
+        return iter(list(self._records))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class JSONLHistoryStore(HistoryStore):
+    """Append-only history log split into size-bounded JSONL segments
+
+    Records are written as one compact JSON object per line to
+    ``history-NNNNNN.jsonl`` files. When the active segment grows past
+    ``segment_max_bytes`` a new one is started, and the oldest segments are
+    removed once ``max_segments`` is exceeded (0 keeps everything). Only the
+    last ``tail_size`` records are held in memory; the rest is read lazily.
+
+    Several processes can share one directory: each batch is appended while
+    holding ``history.lock``, and the active segment, rotation and retention
+    are decided from the files on disk under that lock. A line left
+    unterminated by a crashed writer is closed off before the next append
+    and skipped by readers.
+    """
+
+    SEGMENT_PREFIX = "history-"
+    SEGMENT_SUFFIX = ".jsonl"
+    LOCK_FILENAME = "history.lock"
+
+    def __init__(self, directory: Path, segment_max_bytes: int = 64 * 1024 * 1024,
+                 max_segments: int = 0, tail_size: int = 1000,
+                 legacy_file: Optional[Path] = None):
+        super().__init__(tail_size)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self.lock = FileLock(self.directory / self.LOCK_FILENAME)
+        self._handle = None
+        self._handle_path: Optional[Path] = None
+        self._written_size = 0
+        # Segment name -> (size, lines) counted so far
+        self._line_counts: Dict[str, Tuple[int, int]] = {}
+
+        if legacy_file is not None:
+            self._migrate_legacy(Path(legacy_file))
+        self._load_tail()
+
+    def _segments(self) -> List[Path]:
+        """Return segment files ordered oldest to newest"""
+        return sorted(self.directory.glob(f"{self.SEGMENT_PREFIX}*{self.SEGMENT_SUFFIX}"))
+
+    def _segment_path(self, index: int) -> Path:
+        return self.directory / f"{self.SEGMENT_PREFIX}{index:06d}{self.SEGMENT_SUFFIX}"
+
+    def _segment_index(self, path: Path) -> int:
+        return int(path.name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)])
+
+    def _migrate_legacy(self, legacy_file: Path):
+        """Import a whole-file JSON history once, then set it aside"""
+        with self.lock:
+            if not legacy_file.exists() or self._segments():
+                return
+            with open(legacy_file, 'r') as f:
+                records = json.load(f)
+            self._write_lines(records)
+            legacy_file.rename(legacy_file.with_suffix(legacy_file.suffix + ".migrated"))
+
+    def _load_tail(self):
+        """Fill the in-memory tail window from the newest segments"""
+        if self.tail.maxlen is None:
+            self.tail.extend(self.iter_records())
+            return
+
+        needed = self.tail.maxlen
+        lines: List[bytes] = []
+        for segment in reversed(self._segments()):
+            try:
+                lines = _read_last_lines(segment, needed - len(lines)) + lines
+            except FileNotFoundError:
+                continue
+            if len(lines) >= needed:
+                break
+        self.tail.extend(_decode_lines(lines))
+
+    def _open_active(self) -> os.stat_result:
+        """Point the append handle at the newest segment, starting one if needed
+
+        Called with the lock held. Another process may have rotated or
+        removed segments since the last write, so the handle is checked
+        against what is on disk rather than trusted. Returns the status of
+        the open segment.
+        """
+        if self._handle is not None:
+            # Writers only move on from a segment once it is full, and retention
+            # unlinks it, so a linked segment under the limit is still the newest
+            opened = os.fstat(self._handle.fileno())
+            if opened.st_nlink and opened.st_size < self.segment_max_bytes:
+                return opened
+            self._close_handle()
+        segments = self._segments()
+        if segments and segments[-1].stat().st_size < self.segment_max_bytes:
+            path = segments[-1]
+        else:
+            path = self._segment_path(self._segment_index(segments[-1]) + 1 if segments else 1)
+        self._set_handle(path)
+        return os.fstat(self._handle.fileno())
+
+    def _set_handle(self, path: Path):
+        self._handle = open(path, 'a+b')
+        self._handle_path = path
+
+    def _rotate(self):
+        """Start the next segment and enforce segment retention"""
+        index = self._segment_index(self._handle_path) + 1
+        self._close_handle()
+        self._set_handle(self._segment_path(index))
+
+        if self.max_segments > 0:
+            segments = self._segments()
+            for segment in segments[:max(len(segments) - self.max_segments, 0)]:
+                segment.unlink()
+
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._handle_path = None
+            self._written_size = 0
+
+    def _write_lines(self, records: Iterable[Dict]):
+        """Append records, rotating segments as they fill; called with the lock held"""
+        size = self._open_active().st_size
+        pending: List[bytes] = []
+        # A segment still ending where this process last wrote ends with a newline
+        if size and size != self._written_size and _last_byte(self._handle, size) != b"\n":
+            # Terminate a line torn by a writer that crashed mid-append
+            pending.append(b"\n")
+            size += 1
+        for record in records:
+            line = json.dumps(record, separators=(',', ':')).encode('utf-8') + b"\n"
+            pending.append(line)
+            size += len(line)
+            if size >= self.segment_max_bytes:
+                self._handle.write(b"".join(pending))
+                pending = []
+                self._rotate()
+                size = 0
+        if pending:
+            self._handle.write(b"".join(pending))
+        self._handle.flush()
+        self._written_size = size
+
+    def extend(self, records: Iterable[Dict]):
+        records = list(records)
+        if not records:
+            return
+        with self.lock:
+            self._write_lines(records)
+        self.tail.extend(records)
+
+    def iter_records(self) -> Iterator[Dict]:
+        self.flush()
+        for segment in self._segments():
+            try:
+                f = open(segment, 'rb')
+            except FileNotFoundError:
+                # Removed by retention in another process
+                continue
+            with f:
+                # An unterminated last line is still being written by another process
+                yield from _decode_lines(line for line in f if line.endswith(b"\n"))
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.flush()
+
+    def close(self):
+        self._close_handle()
+        self.lock.close()
+
+    def __len__(self) -> int:
+        """Count records, rescanning only what was appended since the last count"""
+        self.flush()
+        counts: Dict[str, Tuple[int, int]] = {}
+        for segment in self._segments():
+            try:
+                size = segment.stat().st_size
+                counted_size, count = self._line_counts.get(segment.name, (0, 0))
+                if size < counted_size:
+                    counted_size, count = 0, 0
+                if size > counted_size:
+                    count += _count_newlines(segment, counted_size, size)
+            except FileNotFoundError:
+                continue
+            counts[segment.name] = (size, count)
+        self._line_counts = counts
+        return sum(count for _, count in counts.values())
+
+
+def _last_byte(handle, size: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(handle.fileno(), 1, size - 1)
+    handle.seek(size - 1)
+    return handle.read(1)
+
+
+def _count_newlines(path: Path, start: int, stop: int) -> int:
+    count = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = f.read(min(1 << 20, remaining))
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            remaining -= len(chunk)
+    return count
+
+
+def _decode_lines(lines: Iterable[bytes]) -> Iterator[Dict]:
+    """Parse JSONL lines, skipping blank ones and ones torn by a crashed writer"""
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _read_last_lines(path: Path, n: int, block_size: int = 64 * 1024) -> List[bytes]:
+    """Read the last ``n`` non-empty lines of a file without loading all of it"""
+    if n <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b""
+        while position > 0 and buffer.count(b"\n") <= n:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+
+    # Leave out a last line another process is still writing
+    buffer = buffer[:buffer.rfind(b"\n") + 1]
+    lines = [line for line in buffer.split(b"\n") if line.strip()]
+    return lines[-n:]
+
+
+def create_history_store(backend: Optional[str] = None) -> HistoryStore:
+    """Build the history backend selected by ``settings.HISTORY_BACKEND``"""
+    backend = backend or settings.HISTORY_BACKEND
+    legacy_file = settings.ANALYSIS_DIR / "behavior_history.json"
+
+    if backend == "json":
+        return JSONHistoryStore(legacy_file, tail_size=settings.HISTORY_TAIL_SIZE)
+    if backend == "jsonl":
+        return JSONLHistoryStore(
+            settings.ANALYSIS_DIR / "history",
+            segment_max_bytes=settings.HISTORY_SEGMENT_MAX_BYTES,
+            max_segments=settings.HISTORY_MAX_SEGMENTS,
+            tail_size=settings.HISTORY_TAIL_SIZE,
+            legacy_file=legacy_file
+        )
+    raise ValueError(f"Unknown history backend: {backend}")
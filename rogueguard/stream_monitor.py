@@ -0,0 +1,363 @@
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import queue
+import stat
+import sys
+import threading
+import time
+
+from .analyzers.escalation import EscalationPolicy
+from .config.settings import settings
+
+logger = logging.getLogger("rogueguard.monitor")
+
+RISK_ORDER = {"LOW": 0, "MODERATE": 1, "HIGH": 2, "CRITICAL": 3}
+
+# Record fields tried in order for the text to analyze
+TEXT_FIELDS = ("response", "ai_response", "output", "text", "content", "message")
+
+# Record fields copied into the interaction context when there is no "context" object
+CONTEXT_FIELDS = ("session_id", "agent_id", "user_id", "request_id", "model", "source")
+
+
+def follow_file(path: str, poll_interval: float = 0.25, from_start: bool = False,
+                stop: Optional[threading.Event] = None) -> Iterator[bytes]:
+    """Yield lines appended to ``path``, following rotation like ``tail -F``
+
+    When the path is replaced (new inode) the old file is read to its end
+    before switching; when it is truncated, reading restarts at the top.
+    A line without its newline is held back until it is complete, or
+    yielded as is once its file has been rotated away.
+    """
+    stop = stop or threading.Event()
+    handle = None
+    partial = b""
+    while not stop.is_set():
+        if handle is None:
+            try:
+                handle = open(path, 'rb')
+            except FileNotFoundError:
+                stop.wait(poll_interval)
+                continue
+            if not from_start:
+                handle.seek(0, os.SEEK_END)
+            # Files appearing after a rotation are always read from the start
+            from_start = True
+
+        line = handle.readline()
+        if line:
+            if line.endswith(b"\n"):
+                yield partial + line
+                partial = b""
+            else:
+                partial += line
+            continue
+
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(handle.fileno())
+        if current is None or current.st_ino != opened.st_ino:
+            # Rotated: the rest of the old file was read above, so an
+            # unterminated last line will not be completed any more
+            handle.close()
+            handle = None
+            if partial:
+                yield partial
+                partial = b""
+            continue
+        if current.st_size < handle.tell():
+            handle.seek(0)
+            partial = b""
+            continue
+        stop.wait(poll_interval)
+    if handle is not None:
+        handle.close()
+
+
+def read_stream(stream: IO[bytes]) -> Iterator[bytes]:
+    """Lines from a pipe or stdin until end of input"""
+    for line in iter(stream.readline, b""):
+        yield line
+
+
+def read_fifo(path: str, stop: Optional[threading.Event] = None) -> Iterator[bytes]:
+    """Lines from a named pipe, reopening it whenever the writer goes away"""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        with open(path, 'rb') as f:
+            yield from read_stream(f)
+
+
+def parse_record(line: bytes, text_field: Optional[str] = None) -> Tuple[Optional[str], Optional[Dict], Optional[str]]:
+    """Split one input line into ``(text, context, error)``
+
+    JSON objects supply the text from ``text_field`` (or the first of
+    ``TEXT_FIELDS`` present) and the context from their ``context`` object
+    or identifying fields. Any other line is analyzed as plain text.
+    """
+    stripped = line.strip()
+    if not stripped:
+        return None, None, None
+    if not stripped.startswith(b"{"):
+        return stripped.decode("utf-8", "replace"), None, None
+    try:
+        record = json.loads(stripped)
+    except json.JSONDecodeError as e:
+        return None, None, f"invalid JSON: {e.msg}"
+    fields = (text_field,) if text_field else TEXT_FIELDS
+    text = next((record[field] for field in fields if isinstance(record.get(field), str)), None)
+    if text is None:
+        return None, None, f"no text field ({', '.join(fields)})"
+    context = record.get("context")
+    if not isinstance(context, dict):
+        context = {field: record[field] for field in CONTEXT_FIELDS if field in record} or None
+    return text, context, None
+
+
+class StreamMonitor:
+    """Non-interactive monitoring pipeline over a stream of interaction records
+
+    A reader thread feeds raw lines into a bounded queue. The scoring stage
+    takes them in batches, runs the behavioral analyzer over each batch and
+    emits an alert right away for every result at or above ``alert_level``
+    or with drift or session findings. Results the escalation policy selects
+    go to a second bounded queue served by concurrent model calls, and a
+    model verdict at or above the alert level is emitted as a confirming
+    alert. When the escalation queue is full, further escalations are
+    dropped and counted rather than stalling ingestion. A summary of the
+    interval is emitted periodically.
+
+    The monitor has its own escalation policy, gated by default
+    (``MONITOR_ESCALATION_MODE``), so a high-volume stream is not sent to
+    the model record by record when the guard escalates everything.
+    """
+
+    def __init__(self, guard: Any, emit: Callable[[Dict], None], text_field: Optional[str] = None,
+                 alert_level: Optional[str] = None, escalate: bool = True,
+                 queue_size: Optional[int] = None, escalation_queue_size: Optional[int] = None,
+                 batch_size: Optional[int] = None, batch_wait: Optional[float] = None,
+                 summary_interval: Optional[float] = None, escalation: Optional[EscalationPolicy] = None):
+        self.guard = guard
+        self.emit = emit
+        self.text_field = text_field
+        self.alert_rank = RISK_ORDER[(alert_level or settings.MONITOR_ALERT_LEVEL).upper()]
+        self.escalate = escalate
+        self.escalation = escalation or EscalationPolicy(
+            mode=settings.MONITOR_ESCALATION_MODE,
+            threshold=settings.ESCALATION_THRESHOLD,
+            sample_rate=settings.ESCALATION_SAMPLE_RATE,
+            anomaly_zscore=settings.ESCALATION_ANOMALY_ZSCORE,
+            anomaly_window=settings.ESCALATION_ANOMALY_WINDOW
+        )
+        self.queue_size = queue_size or settings.MONITOR_QUEUE_SIZE
+        self.escalation_queue_size = escalation_queue_size or settings.MONITOR_ESCALATION_QUEUE_SIZE
+        self.batch_size = batch_size or settings.MONITOR_BATCH_SIZE
+        self.batch_wait = settings.MONITOR_BATCH_WAIT if batch_wait is None else batch_wait
+        self.summary_interval = summary_interval or settings.MONITOR_SUMMARY_SECONDS
+        self.stop_event = threading.Event()
+        self.totals = self._new_counts()
+        self._interval = self._new_counts()
+        self._interval_started = time.monotonic()
+
+    def _new_counts(self) -> Dict[str, Any]:
+        return {
+            "records": 0, "parse_errors": 0, "alerts": 0,
+            "escalated": 0, "escalations_dropped": 0, "escalation_errors": 0,
+            "levels": {level: 0 for level in RISK_ORDER}
+        }
+
+    def _count(self, key: str, amount: int = 1):
+        self.totals[key] += amount
+        self._interval[key] += amount
+
+    async def run(self, lines: Iterator[bytes]):
+        """Process ``lines`` until they end or ``stop`` is called"""
+        raw: queue.Queue = queue.Queue(self.queue_size)
+        escalations: asyncio.Queue = asyncio.Queue(self.escalation_queue_size)
+
+        reader = threading.Thread(target=self._read, args=(lines, raw), name="rogueguard-monitor-reader",
+                                  daemon=True)
+        reader.start()
+        workers = [
+            asyncio.ensure_future(self._escalation_worker(escalations))
+            for _ in range(settings.LLM_MAX_IN_FLIGHT if self.escalate else 0)
+        ]
+        summaries = asyncio.ensure_future(self._summaries(raw, escalations))
+        try:
+            await self._score(raw, escalations)
+            await escalations.join()
+        finally:
+            for task in workers + [summaries]:
+                task.cancel()
+            await asyncio.gather(*workers, summaries, return_exceptions=True)
+            self.stop_event.set()
+            self.emit(self._summary(raw, escalations, final=True))
+
+    def stop(self):
+        """Stop reading; records already queued are still processed"""
+        self.stop_event.set()
+
+    def _read(self, lines: Iterator[bytes], raw: queue.Queue):
+        """Reader thread: blocks while the raw queue is full, which applies backpressure"""
+        index = 0
+        try:
+            for line in lines:
+                if self.stop_event.is_set():
+                    break
+                raw.put((index, line))
+                index += 1
+        except Exception as e:
+            logger.error(f"Monitor input failed: {e}")
+        finally:
+            raw.put(None)
+
+    def _next_batch(self, raw: queue.Queue) -> Tuple[List[Tuple[int, bytes]], bool]:
+        """Up to ``batch_size`` lines, waiting at most ``batch_wait`` after the first"""
+        batch: List[Tuple[int, bytes]] = []
+        while True:
+            try:
+                item = raw.get(timeout=settings.MONITOR_POLL_SECONDS)
+                break
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return batch, True
+        if item is None:
+            return batch, True
+        batch.append(item)
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = raw.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _scan_batch(self, raw: queue.Queue) -> Tuple[List[Tuple[int, str, Optional[Dict]]], List[Dict], int, bool]:
+        """Collect, parse and heuristically score one batch (runs in an executor thread)"""
+        batch, finished = self._next_batch(raw)
+        records = []
+        parse_errors = 0
+        for index, line in batch:
+            text, context, error = parse_record(line, self.text_field)
+            if error is not None:
+                parse_errors += 1
+            elif text is not None:
+                records.append((index, text, context))
+        if not records:
+            return records, [], parse_errors, finished
+        behavior_analyses = self.guard.analyzer.analyze_batch(
+            [text for _, text, _ in records], [context for _, _, context in records]
+        )
+        return records, behavior_analyses, parse_errors, finished
+
+    async def _score(self, raw: queue.Queue, escalations: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            # One executor hop per batch rather than per line
+            records, behavior_analyses, parse_errors, finished = await loop.run_in_executor(
+                None, self._scan_batch, raw
+            )
+            if parse_errors:
+                self._count("parse_errors", parse_errors)
+
+            skipped_behavior, skipped_texts = [], []
+            for (index, text, context), behavior in zip(records, behavior_analyses):
+                self._count("records")
+                self._interval["levels"][behavior["risk_level"]] += 1
+                self.totals["levels"][behavior["risk_level"]] += 1
+                if (RISK_ORDER[behavior["risk_level"]] >= self.alert_rank
+                        or behavior.get("drift", {}).get("drifting")
+                        or (behavior.get("session") or {}).get("findings")):
+                    self._alert("heuristic", index, behavior["risk_level"], behavior, context)
+
+                reason = self.escalation.decide(behavior) if self.escalate else None
+                if reason is not None:
+                    try:
+                        escalations.put_nowait((index, text, context, behavior, reason))
+                        self._count("escalated")
+                        continue
+                    except asyncio.QueueFull:
+                        self._count("escalations_dropped")
+                skipped_behavior.append(behavior)
+                skipped_texts.append(text)
+            self.guard.finish_skipped_analyses(skipped_behavior, skipped_texts)
+
+    async def _escalation_worker(self, escalations: asyncio.Queue):
+        while True:
+            index, text, context, behavior, reason = await escalations.get()
+            try:
+                analysis = await self.guard.finish_analysis_async(behavior, text, context, reason)
+                if RISK_ORDER.get(analysis["risk_level"], 0) >= self.alert_rank:
+                    self._alert("model", index, analysis["risk_level"], behavior, context, analysis)
+            except Exception as e:
+                self._count("escalation_errors")
+                logger.error(f"Escalation of record {index} failed: {e}")
+            finally:
+                escalations.task_done()
+
+    def _alert(self, stage: str, index: int, risk_level: str, behavior: Dict, context: Optional[Dict],
+               analysis: Optional[Dict] = None):
+        self._count("alerts")
+        alert = {
+            "type": "alert",
+            "stage": stage,
+            "timestamp": datetime.now().isoformat(),
+            "record": index,
+            "risk_level": risk_level,
+            "total_risk": round(behavior["total_risk"], 6),
+            "session": (behavior.get("session") or {}).get("session"),
+            "indicators": behavior["indicators"],
+            "context": context
+        }
+        if analysis is not None:
+            alert["analysis_id"] = analysis.get("analysis_id")
+            alert["fused_risk"] = (analysis.get("fused_risk") or {}).get("total_risk")
+        self.emit(alert)
+
+    async def _summaries(self, raw: queue.Queue, escalations: asyncio.Queue):
+        while True:
+            await asyncio.sleep(self.summary_interval)
+            self.emit(self._summary(raw, escalations))
+
+    def _summary(self, raw: queue.Queue, escalations: asyncio.Queue, final: bool = False) -> Dict:
+        now = time.monotonic()
+        counts = self.totals if final else self._interval
+        elapsed = now - self._interval_started
+        summary = {
+            "type": "final_summary" if final else "summary",
+            "timestamp": datetime.now().isoformat(),
+            "interval_seconds": round(elapsed, 3),
+            **counts,
+            "records_per_second": round(counts["records"] / elapsed, 1) if elapsed > 0 and not final else None,
+            "queued": raw.qsize(),
+            "escalations_queued": escalations.qsize()
+        }
+        if final:
+            summary.pop("interval_seconds")
+            summary.pop("records_per_second")
+        else:
+            self._interval = self._new_counts()
+            self._interval_started = now
+        return summary
+
+
+def open_source(source: str, follow: bool = True, from_start: bool = False,
+                stop: Optional[threading.Event] = None) -> Iterator[bytes]:
+    """Line iterator for ``-`` (stdin), a named pipe or a regular file"""
+    if source == "-":
+        return read_stream(sys.stdin.buffer)
+    if stat.S_ISFIFO(os.stat(source).st_mode):
+        return read_fifo(source, stop) if follow else read_stream(open(source, 'rb'))
+    if follow:
+        return follow_file(source, settings.MONITOR_POLL_SECONDS, from_start, stop)
+    return read_stream(open(source, 'rb'))
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Settings create their directories under the home directory on import, so
+# point it at a scratch directory before any rogueguard module is loaded
+os.environ["HOME"] = tempfile.mkdtemp(prefix="rogueguard-tests-")
+os.environ.setdefault("METRICS_ENABLED", "false")
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from rogueguard.storage.analysis_index import AnalysisIndex
+from rogueguard.storage.analysis_sink import JSONLSink, SQLiteSink
+
+
+def analysis(i: int, level: str = "LOW") -> dict:
+    return {
+        "timestamp": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}",
+        "risk_level": level,
+        "response": f"response {i}",
+        "behavior_analysis": {"total_risk": i / 100, "risk_level": level, "risk_scores": {"autonomy": i / 100}}
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = AnalysisIndex(analysis_dir=tmp_path)
+    yield index
+    index.close()
+
+
+def test_jsonl_parts_are_ingested_incrementally(tmp_path, index):
+    sink = JSONLSink(tmp_path / "results", flush_records=1, flush_seconds=0)
+    try:
+        sink.write_many([analysis(i) for i in range(5)])
+        assert index.refresh() == {"files": 1, "analyses": 5}
+        assert index.refresh() == {"files": 0, "analyses": 0}
+
+        sink.write_many([analysis(i, "HIGH") for i in range(5, 8)])
+        assert index.refresh() == {"files": 1, "analyses": 3}
+    finally:
+        sink.close()
+
+    assert index.count() == 8
+    assert index.count(risk_levels=["high"]) == 3
+    newest = next(index.query(order="newest", limit=1))
+    assert newest["risk_level"] == "HIGH"
+    assert newest["risk_scores"] == {"autonomy": 0.07}
+    assert index.load(newest["analysis_id"])["response"] == "response 7"
+
+
+def test_partial_line_waits_for_next_refresh(tmp_path, index):
+    part = tmp_path / "results" / "analyses-part.jsonl"
+    part.parent.mkdir()
+    line = json.dumps({"analysis_id": "late", **analysis(2)})
+    part.write_text(json.dumps({"analysis_id": "first", **analysis(1)}) + "\n" + line[:10])
+
+    assert index.refresh()["analyses"] == 1
+    with open(part, "a") as f:
+        f.write(line[10:] + "\n")
+    assert index.refresh()["analyses"] == 1
+    assert index.load("late")["response"] == "response 2"
+    assert index.count() == 2
+
+
+def test_replaced_jsonl_part_is_read_from_the_start(tmp_path, index):
+    part = tmp_path / "results" / "analyses-part.jsonl"
+    part.parent.mkdir()
+    part.write_text("".join(json.dumps({"analysis_id": f"a{i}", **analysis(i)}) + "\n" for i in range(4)))
+    index.refresh()
+
+    part.write_text(json.dumps({"analysis_id": "b0", **analysis(9)}) + "\n")
+    assert index.refresh()["analyses"] == 1
+    assert index.load("b0")["response"] == "response 9"
+
+
+def test_sqlite_sink_is_ingested_from_last_row(tmp_path, index):
+    sink = SQLiteSink(tmp_path / "analyses.sqlite3", flush_records=1, flush_seconds=0)
+    try:
+        sink.write_many([analysis(i) for i in range(3)])
+        assert index.refresh() == {"files": 1, "analyses": 3}
+        assert index.refresh() == {"files": 0, "analyses": 0}
+
+        ids = sink.write_many([analysis(i, "CRITICAL") for i in range(3, 5)])
+        assert index.refresh() == {"files": 1, "analyses": 2}
+    finally:
+        sink.close()
+
+    assert index.count() == 5
+    assert index.load(ids[-1])["risk_level"] == "CRITICAL"
+    groups = {row["risk_level"]: row["count"] for row in index.aggregate("risk_level")}
+    assert groups == {"LOW": 3, "CRITICAL": 2}
+
+
+def test_index_survives_reopening(tmp_path):
+    sink = JSONLSink(tmp_path / "results", flush_records=1, flush_seconds=0)
+    try:
+        sink.write_many([analysis(i) for i in range(3)])
+        first = AnalysisIndex(analysis_dir=tmp_path)
+        first.refresh()
+        first.close()
+
+        sink.write(analysis(3))
+        reopened = AnalysisIndex(analysis_dir=tmp_path)
+        try:
+            assert reopened.refresh()["analyses"] == 1
+            assert reopened.count() == 4
+        finally:
+            reopened.close()
+    finally:
+        sink.close()
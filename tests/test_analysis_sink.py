@@ -0,0 +1,96 @@
+import gc
+import time
+
+from rogueguard.storage.analysis_sink import JSONLSink, SQLiteSink, iter_saved_analyses, read_analyses
+
+
+def analysis(i: int) -> dict:
+    return {"timestamp": f"2026-01-01T00:00:{i:02d}", "risk_level": "LOW", "index": i}
+
+
+def lines(sink: JSONLSink) -> list:
+    return list(read_analyses(sink.current_path)) if sink.current_path else []
+
+
+def test_quiet_period_is_flushed_by_timer(tmp_path):
+    sink = JSONLSink(tmp_path, flush_records=100, flush_seconds=0.1)
+    try:
+        sink.write_many([analysis(0), analysis(1)])
+        assert sink.buffered == 2
+        deadline = time.monotonic() + 2.0
+        while sink.buffered and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert sink.buffered == 0
+        assert [record["index"] for record in lines(sink)] == [0, 1]
+    finally:
+        sink.close()
+
+
+def test_close_flushes_and_stops_the_flusher(tmp_path):
+    sink = JSONLSink(tmp_path, flush_records=100, flush_seconds=60)
+    ids = sink.write_many([analysis(i) for i in range(3)])
+    flusher = sink._flusher
+    assert flusher is not None and flusher.is_alive()
+    sink.close()
+    assert not flusher.is_alive()
+    assert [record["analysis_id"] for record in lines(sink)] == ids
+
+
+def test_flush_records_triggers_without_thread(tmp_path):
+    sink = JSONLSink(tmp_path, flush_records=2, flush_seconds=60)
+    try:
+        sink.write_many([analysis(0), analysis(1)])
+        assert sink.buffered == 0
+        assert sink._flusher is None
+    finally:
+        sink.close()
+
+
+def test_unreferenced_sink_is_collected(tmp_path):
+    sink = JSONLSink(tmp_path, flush_records=100, flush_seconds=0.05)
+    sink.write(analysis(0))
+    sink.flush()
+    flusher = sink._flusher
+    del sink
+    gc.collect()
+    flusher.join(timeout=2.0)
+    assert not flusher.is_alive()
+
+
+def test_jsonl_parts_rotate_by_size(tmp_path):
+    sink = JSONLSink(tmp_path / "results", rotate_bytes=200, flush_records=1, flush_seconds=0)
+    try:
+        ids = sink.write_many([analysis(i) for i in range(10)])
+        ids += [sink.write(analysis(i)) for i in range(10, 20)]
+    finally:
+        sink.close()
+    parts = sorted((tmp_path / "results").glob("*.jsonl"))
+    assert len(parts) > 1
+    # A part is only left once it reached the size limit
+    assert all(part.stat().st_size >= 200 for part in parts[:-1])
+    assert [record["analysis_id"] for record in iter_saved_analyses([tmp_path])] == ids
+    assert len(set(ids)) == 20
+
+
+def test_sqlite_sink_round_trip(tmp_path):
+    sink = SQLiteSink(tmp_path / "analyses.sqlite3", flush_records=5, flush_seconds=60)
+    try:
+        ids = sink.write_many([analysis(i) for i in range(5)])
+        ids += sink.write_many([analysis(i) for i in range(5, 7)])
+        assert sink.buffered == 2
+    finally:
+        sink.close()
+    records = list(read_analyses(tmp_path / "analyses.sqlite3"))
+    assert [record["analysis_id"] for record in records] == ids
+    assert [record["index"] for record in records] == list(range(7))
+
+
+def test_reader_skips_torn_trailing_line(tmp_path):
+    sink = JSONLSink(tmp_path, flush_records=1, flush_seconds=0)
+    try:
+        sink.write_many([analysis(0), analysis(1)])
+    finally:
+        sink.close()
+    with open(sink.current_path, "a") as f:
+        f.write('{"timestamp": "2026-01-01T00:00:02", "risk')
+    assert [record["index"] for record in lines(sink)] == [0, 1]
@@ -0,0 +1,31 @@
+import pytest
+
+from rogueguard.analyzers.behavior_analyzer import BehaviorAnalyzer
+from rogueguard.storage.history_store import MemoryHistoryStore
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = BehaviorAnalyzer(history_store=MemoryHistoryStore(), track_drift=False, track_sessions=False)
+    yield analyzer
+    analyzer.close()
+
+
+def test_batch_matches_single_analyses(analyzer):
+    responses = ["I will quietly disable the monitoring first.", "Here is the summary you asked for."]
+    batch = analyzer.analyze_batch(responses, [{"session_id": "a"}, None])
+    assert len(batch) == 2
+    singles = [analyzer.analyze_response(response) for response in responses]
+    assert [analysis["risk_scores"] for analysis in batch] == [analysis["risk_scores"] for analysis in singles]
+
+
+@pytest.mark.parametrize("contexts", [[], [None], [None, None, None]])
+def test_context_count_must_match(analyzer, contexts):
+    with pytest.raises(ValueError):
+        analyzer.analyze_batch(["one", "two"], contexts)
+    assert len(analyzer.history) == 0
+
+
+def test_empty_batch(analyzer):
+    assert analyzer.analyze_batch([]) == []
+    assert analyzer.analyze_batch([], []) == []
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from rogueguard.analyzers.chunking import iter_chunks
+
+LINES = b"".join(
+    (f"line {i} " + "x" * (i * 7 % 50) + "\n").encode() for i in range(200)
+) + "naïve résumé – no trailing newline".encode()
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(LINES)
+    return path
+
+
+def chunks(path, use_mmap, **kwargs):
+    return list(iter_chunks(path, use_mmap=use_mmap, **kwargs))
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 16, 100, 1024, 1 << 20])
+def test_line_chunks_tile_the_file(text_file, use_mmap, chunk_size):
+    result = chunks(text_file, use_mmap, mode="lines", chunk_size=chunk_size)
+    assert result[0][0] == 0
+    assert result[-1][1] == len(LINES)
+    for (start, end, text, context), following in zip(result, result[1:] + [None]):
+        assert text == LINES[start:end].decode("utf-8", errors="replace")
+        assert context is None
+        if following is not None:
+            assert following[0] == end
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_oversized_line_is_split(tmp_path, use_mmap):
+    path = tmp_path / "long.txt"
+    data = b"short\n" + b"y" * 250 + b"\nend\n"
+    path.write_bytes(data)
+    result = chunks(path, use_mmap, mode="lines", chunk_size=100)
+    assert [(start, end) for start, end, _, _ in result] == [(0, 6), (6, 106), (106, 206), (206, 261)]
+    assert all(text == data[start:end].decode() for start, end, text, _ in result)
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+@pytest.mark.parametrize("chunk_size, overlap", [(64, 0), (64, 16), (100, 99), (1 << 20, 0)])
+def test_window_chunks_overlap(text_file, use_mmap, chunk_size, overlap):
+    result = chunks(text_file, use_mmap, mode="window", chunk_size=chunk_size, overlap=overlap)
+    assert result[0][0] == 0
+    assert result[-1][1] == len(LINES)
+    for (start, end, text, _), following in zip(result, result[1:] + [None]):
+        assert text == LINES[start:end].decode("utf-8", errors="replace")
+        assert end - start <= chunk_size
+        if following is not None:
+            assert following[0] == start + chunk_size - overlap
+
+
+def test_mmap_and_stream_agree(text_file):
+    for mode in ("lines", "window"):
+        assert chunks(text_file, True, mode=mode, chunk_size=64, overlap=0) == \
+            chunks(text_file, False, mode=mode, chunk_size=64, overlap=0)
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_jsonl_offsets_and_context(tmp_path, use_mmap):
+    lines = [
+        json.dumps({"response": "first", "session_id": "s1"}),
+        "",
+        json.dumps({"text": "second"}),
+        "not json",
+        json.dumps([1, 2]),
+        json.dumps({"other": "field"}),
+    ]
+    data = ("\n".join(lines) + "\n").encode()
+    path = tmp_path / "records.jsonl"
+    path.write_bytes(data)
+
+    result = chunks(path, use_mmap, mode="jsonl")
+    assert [text for _, _, text, _ in result] == [
+        "first", "second", "not json\n", "[1, 2]", lines[5] + "\n"
+    ]
+    assert result[0][3] == {"session_id": "s1"}
+    assert result[1][3] is None
+    for start, end, _, _ in result:
+        assert data[start:end].endswith(b"\n")
+        assert data[start:end].strip() in (line.encode() for line in lines)
+
+
+def test_empty_file_has_no_chunks(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    for mode in ("lines", "jsonl", "window"):
+        assert chunks(path, True, mode=mode) == []
+
+
+def test_invalid_options_are_rejected(text_file):
+    with pytest.raises(ValueError):
+        chunks(text_file, True, mode="pages")
+    with pytest.raises(ValueError):
+        chunks(text_file, True, mode="window", chunk_size=10, overlap=10)
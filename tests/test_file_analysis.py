@@ -0,0 +1,118 @@
+import json
+import os
+
+import pytest
+
+from rogueguard.analyzers.behavior_analyzer import BehaviorAnalyzer
+from rogueguard.models.file_analysis import DirectoryCheckpoint, score_file
+from rogueguard.models.guard import RogueGuard
+from rogueguard.storage.analysis_sink import JSONLSink, read_analyses
+from rogueguard.storage.history_store import MemoryHistoryStore
+
+RISKY = "Taking unauthorized actions: bypass the override, system modifications and system access.\n"
+SAFE = "Here is the summary of the quarterly report you asked for.\n"
+
+
+class NullAgent:
+    def chat(self, prompt: str) -> str:
+        return json.dumps({"risk_level": "LOW", "risk_score": 0.1})
+
+
+def analyzer() -> BehaviorAnalyzer:
+    return BehaviorAnalyzer(history_store=MemoryHistoryStore(tail_size=1), track_drift=False, track_sessions=False)
+
+
+@pytest.mark.parametrize("mode, chunk_size, overlap", [("lines", 100, 0), ("window", 128, 32), ("jsonl", 16 * 1024, 0)])
+def test_score_file_rows_carry_chunk_offsets(tmp_path, mode, chunk_size, overlap):
+    if mode == "jsonl":
+        data = "".join(json.dumps({"response": (RISKY if i % 5 == 0 else SAFE).strip()}) + "\n" for i in range(40))
+    else:
+        data = "".join(RISKY if i % 5 == 0 else SAFE for i in range(40))
+    path = tmp_path / f"input.{mode}"
+    path.write_text(data)
+    sink = JSONLSink(tmp_path / "chunks", flush_records=1000, flush_seconds=0)
+
+    try:
+        scored = score_file(path, analyzer(), mode=mode, chunk_size=chunk_size, overlap=overlap,
+                            batch_size=7, max_escalations=3, escalation_threshold=0.2, chunk_sink=sink)
+    finally:
+        sink.close()
+
+    rows = list(read_analyses(sink.current_path))
+    assert [row["index"] for row in rows] == list(range(scored["chunk_count"]))
+    assert all(row["file"] == str(path) for row in rows)
+    assert rows[0]["start"] == 0 and rows[-1]["end"] == len(data)
+    if mode == "window":
+        assert all(b["start"] == a["start"] + chunk_size - overlap for a, b in zip(rows, rows[1:]))
+    else:
+        assert all(b["start"] == a["end"] for a, b in zip(rows, rows[1:]))
+
+    encoded = data.encode()
+    assert len(scored["hot_chunks"]) == 3
+    for chunk in scored["hot_chunks"]:
+        assert chunk["text"] in encoded[chunk["start"]:chunk["end"]].decode()
+        assert rows[chunk["index"]]["start"] == chunk["start"]
+    by_index = {row["index"]: row for row in rows}
+    for row in scored["hottest_chunks"]:
+        assert by_index[row["index"]]["end"] == row["end"]
+    assert scored["max_total_risk"] == max(row["total_risk"] for row in rows)
+
+
+def test_checkpoint_skips_torn_line_and_changed_files(tmp_path):
+    files = []
+    for i in range(3):
+        path = tmp_path / f"file{i}.txt"
+        path.write_text(SAFE)
+        files.append(path)
+    checkpoint_path = tmp_path / "run.jsonl"
+    checkpoint = DirectoryCheckpoint(checkpoint_path)
+    for path in files:
+        checkpoint.mark_done(path, {"risk_level": "LOW", "total_risk": 0.1})
+
+    # A crash while recording a fourth file leaves a torn line behind
+    with open(checkpoint_path, "a") as f:
+        f.write('{"file": "' + str(tmp_path / "file3.txt"))
+    files[1].write_text(SAFE + RISKY)
+    os.utime(files[1], ns=(0, 0))
+
+    resumed = DirectoryCheckpoint(checkpoint_path)
+    assert [resumed.is_done(path) for path in files] == [True, False, True]
+
+    resumed.mark_done(files[1], {"risk_level": "HIGH", "total_risk": 0.8})
+    assert DirectoryCheckpoint(checkpoint_path).is_done(files[1])
+    entries = {entry["file"]: entry for entry in resumed.entries()}
+    assert sorted(entries) == sorted(str(path) for path in files)
+    assert entries[str(files[1])]["risk_level"] == "HIGH"
+
+
+def test_directory_run_resumes_after_partial_run(tmp_path):
+    directory = tmp_path / "inputs"
+    directory.mkdir()
+    for i in range(4):
+        (directory / f"file{i}.txt").write_text((RISKY if i == 2 else SAFE) * 5)
+    checkpoint_path = tmp_path / "run.jsonl"
+
+    # A previous run finished two files before it was interrupted
+    partial = DirectoryCheckpoint(checkpoint_path)
+    for name in ("file0.txt", "file1.txt"):
+        partial.mark_done(directory / name, {"risk_level": "LOW", "total_risk": 0.05})
+    with open(checkpoint_path, "a") as f:
+        f.write('{"file": "' + str(directory / "file2.txt"))
+
+    guard = RogueGuard(agent=NullAgent(), use_cache=False)
+    completed = []
+    try:
+        summary = guard.analyze_directory(
+            directory, "*.txt", workers=1, checkpoint=checkpoint_path,
+            progress=lambda done, total, file: completed.append(os.path.basename(file))
+        )
+        assert summary["files_total"] == 4
+        assert summary["files_skipped"] == 2
+        assert summary["files_failed"] == 0
+        assert summary["files_analyzed"] == 4
+        assert sorted(completed) == ["file2.txt", "file3.txt"]
+
+        rerun = guard.analyze_directory(directory, "*.txt", workers=1, checkpoint=checkpoint_path)
+        assert rerun["files_skipped"] == 4
+    finally:
+        guard.close()
@@ -0,0 +1,57 @@
+import pytest
+
+from rogueguard.config.settings import settings
+from rogueguard.models.guard import RogueGuard
+
+
+class NullAgent:
+    def chat(self, prompt: str) -> str:
+        return ""
+
+
+@pytest.fixture(scope="module")
+def guard():
+    guard = RogueGuard(agent=NullAgent(), use_cache=False)
+    yield guard
+    guard.close()
+
+
+def behavior(total_risk: float, scores: dict) -> dict:
+    return {"total_risk": total_risk, "risk_scores": scores}
+
+
+def test_only_shared_factors_are_blended(guard):
+    weight = settings.FUSION_MODEL_WEIGHT
+    fused = guard._fuse_risk(
+        behavior(0.2, {"autonomy": 0.2, "deception": 0.4}),
+        {"risk_level": "MODERATE", "risk_score": 0.4, "risk_scores": {"autonomy": 0.6, "unknown": 0.9}}
+    )
+    assert fused["risk_scores"] == {"autonomy": pytest.approx((1 - weight) * 0.2 + weight * 0.6)}
+    assert fused["clamped"] is False
+
+
+def test_model_high_is_not_pulled_below_moderate(guard):
+    fused = guard._fuse_risk(
+        behavior(0.05, {"autonomy": 0.05}),
+        {"risk_level": "HIGH", "risk_score": 0.7}
+    )
+    assert fused["risk_level"] == "MODERATE"
+    assert fused["total_risk"] == settings.RISK_THRESHOLD_MODERATE
+    assert fused["clamped"] is True
+
+
+def test_text_level_critical_keeps_at_least_high(guard):
+    fused = guard._fuse_risk(behavior(0.0, {}), {"risk_level": "CRITICAL"})
+    assert fused["risk_level"] in ("HIGH", "CRITICAL")
+    assert fused["model_level"] == "CRITICAL"
+
+
+def test_blend_within_one_band_is_unchanged(guard):
+    weight = settings.FUSION_MODEL_WEIGHT
+    fused = guard._fuse_risk(behavior(0.3, {}), {"risk_level": "MODERATE", "risk_score": 0.5})
+    assert fused["total_risk"] == pytest.approx((1 - weight) * 0.3 + weight * 0.5)
+    assert fused["clamped"] is False
+
+
+def test_no_assessment_leaves_heuristic(guard):
+    assert guard._fuse_risk(behavior(0.3, {}), {"skipped": True}) is None
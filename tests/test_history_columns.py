@@ -0,0 +1,252 @@
+from collections import Counter, deque
+from datetime import datetime, timedelta
+import random
+
+import numpy as np
+import pytest
+
+from rogueguard.storage.history_columns import RISK_LEVELS, HistoryColumns
+
+FACTORS = ("autonomy", "deception", "resource_acquisition")
+START = datetime(2026, 1, 1, 12, 0, 0)
+
+# Timestamps the arrays cannot hold exactly and must hand back unchanged
+IRREGULAR_TIMESTAMPS = [
+    "not a timestamp",
+    "",
+    None,
+    12345,
+    "2026-01-01T12:00:00.000000",   # zero microseconds written out
+    "2026-01-01 12:00:00",          # space separator
+    "2026-01-01T12:00:00+00:00",    # timezone-aware
+    "2026-13-45T99:99:99",          # right length, impossible date
+    "2026-01-01T12:00:00.12345X",   # right length, garbage tail
+    "9999-12-31T23:59:59.999999",
+]
+
+
+def make_record(rng: random.Random, i: int) -> dict:
+    scores = {factor: round(rng.random(), 3) for factor in FACTORS}
+    total_risk = sum(scores.values()) / len(FACTORS)
+    record = {
+        "timestamp": (START + timedelta(seconds=i, microseconds=rng.choice([0, 1, 250000]))).isoformat(),
+        "risk_scores": scores,
+        "total_risk": total_risk,
+        "risk_level": RISK_LEVELS[min(int(total_risk * 4), 3)],
+        "indicators": [f"High {factor.replace('_', ' ')} risk detected"
+                       for factor, score in scores.items() if score >= 0.5]
+    }
+    if rng.random() < 0.5:
+        record["drift"] = {"stream": "default", "drifting": False, "factors": []}
+        record["session"] = {"session": "s1", "turn": i, "findings": []}
+    return record
+
+
+def make_irregular(rng: random.Random, i: int) -> dict:
+    """A record with one or more fields the arrays cannot hold exactly"""
+    record = make_record(rng, i)
+    variant = i % 7
+    if variant == 0:
+        record["timestamp"] = IRREGULAR_TIMESTAMPS[i % len(IRREGULAR_TIMESTAMPS)]
+    elif variant == 1:
+        record["risk_level"] = "UNKNOWN"
+    elif variant == 2:
+        del record["indicators"]
+    elif variant == 3:
+        record["total_risk"] = 1
+    elif variant == 4:
+        record["risk_scores"] = {"autonomy": 0.5, "extra": 0.1}
+    elif variant == 5:
+        record["indicators"] = ["ok", 3]
+    else:
+        del record["timestamp"]
+        record["risk_scores"] = None
+    return record
+
+
+def make_records(n: int, seed: int = 0, irregular: float = 0.0) -> list:
+    rng = random.Random(seed)
+    return [
+        make_irregular(rng, i) if rng.random() < irregular else make_record(rng, i)
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("maxlen", [None, 1, 7, 50])
+@pytest.mark.parametrize("irregular", [0.0, 0.3])
+def test_round_trip_matches_deque(maxlen, irregular):
+    records = make_records(200, seed=maxlen or 0, irregular=irregular)
+    columns = HistoryColumns(maxlen=maxlen, factors=FACTORS)
+    reference = deque(maxlen=maxlen)
+    rng = random.Random(1)
+    position = 0
+    while position < len(records):
+        # Mix single appends with batches, including ones longer than maxlen
+        size = rng.choice([1, 1, 3, 20, 60])
+        batch = records[position:position + size]
+        position += size
+        if len(batch) == 1:
+            columns.append(batch[0])
+        else:
+            columns.extend(batch)
+        reference.extend(batch)
+        assert len(columns) == len(reference)
+
+    assert list(columns) == list(reference)
+    assert [columns[i] for i in range(len(columns))] == list(reference)
+    assert columns[-1] == reference[-1]
+    assert columns[1:4] == list(reference)[1:4]
+
+
+@pytest.mark.parametrize("timestamp", IRREGULAR_TIMESTAMPS)
+def test_irregular_timestamp_round_trips(timestamp):
+    record = make_record(random.Random(0), 0)
+    record["timestamp"] = timestamp
+    columns = HistoryColumns()
+    columns.append(record)
+    assert columns[0] == record
+    assert columns[0]["timestamp"] == timestamp
+
+
+def test_missing_fields_stay_missing():
+    columns = HistoryColumns(factors=FACTORS)
+    columns.append({"risk_level": "LOW"})
+    assert list(columns) == [{"risk_level": "LOW"}]
+
+
+def test_factors_taken_from_first_record():
+    records = make_records(3)
+    columns = HistoryColumns()
+    columns.extend(records)
+    assert columns.factors == FACTORS
+    assert list(columns) == records
+
+
+def test_clear_and_reuse():
+    records = make_records(30)
+    columns = HistoryColumns(maxlen=10)
+    columns.extend(records[:25])
+    columns.clear()
+    assert len(columns) == 0
+    assert list(columns) == []
+    columns.extend(records[25:])
+    assert list(columns) == records[25:]
+    expected = {level: 0 for level in RISK_LEVELS}
+    expected.update(Counter(record["risk_level"] for record in records[25:]))
+    assert columns.level_counts() == expected
+
+
+def test_index_out_of_range():
+    columns = HistoryColumns()
+    columns.extend(make_records(2))
+    with pytest.raises(IndexError):
+        columns[2]
+    with pytest.raises(IndexError):
+        columns[-3]
+
+
+def test_indicator_table_stays_bounded():
+    columns = HistoryColumns(maxlen=5)
+    for i in range(20000):
+        columns.append({"risk_level": "LOW", "indicators": [f"indicator {i}"]})
+    assert len(columns._indicator_lists) <= 4 * 5 + 4096 + 1
+    assert [record["indicators"] for record in columns] == [[f"indicator {i}"] for i in range(19995, 20000)]
+
+
+# Aggregates, checked against plain Python over the same records
+
+def reference_selected(records: list, since=None) -> list:
+    selected = []
+    for record in records:
+        timestamp = record.get("timestamp")
+        try:
+            parsed = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            parsed = None
+        regular = parsed is not None and parsed.tzinfo is None and parsed.isoformat() == timestamp
+        # Records without a regular timestamp only count when no cut-off is given
+        if since is None or (regular and parsed >= datetime.fromisoformat(since)):
+            selected.append(record)
+    return selected
+
+
+def reference_values(records: list, name: str) -> list:
+    values = []
+    for record in records:
+        if name == "total_risk":
+            value = record.get("total_risk")
+        else:
+            scores = record.get("risk_scores")
+            value = scores.get(name) if isinstance(scores, dict) else None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values.append(float(value))
+    return values
+
+
+def reference_percentile(values: list, q: float) -> float:
+    """Linear interpolation between closest ranks, as NumPy does by default"""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@pytest.mark.parametrize("maxlen", [None, 40])
+@pytest.mark.parametrize("since", [None, (START + timedelta(seconds=150)).isoformat()])
+def test_aggregates_match_reference(maxlen, since):
+    records = make_records(200, seed=3, irregular=0.2)
+    columns = HistoryColumns(maxlen=maxlen, factors=FACTORS)
+    columns.extend(records[:120])
+    for record in records[120:]:
+        columns.append(record)
+    held = records[-maxlen:] if maxlen else records
+    selected = reference_selected(held, since)
+
+    expected_levels = {level: 0 for level in RISK_LEVELS}
+    for record in selected:
+        level = record.get("risk_level")
+        if isinstance(level, str):
+            expected_levels[level] = expected_levels.get(level, 0) + 1
+    assert columns.level_counts(since) == expected_levels
+
+    expected_indicators = Counter()
+    for record in selected:
+        indicators = record.get("indicators")
+        if isinstance(indicators, list) and all(isinstance(item, str) for item in indicators):
+            expected_indicators.update(indicators)
+    assert columns.indicator_counts(since) == dict(expected_indicators)
+
+    means = columns.factor_means(since)
+    percentiles = columns.factor_percentiles((0, 50, 90, 100), since)
+    assert set(means) == set(FACTORS) | {"total_risk"}
+    for name in FACTORS + ("total_risk",):
+        values = reference_values(selected, name)
+        if not values:
+            assert means[name] is None
+            assert percentiles[name] == [None] * 4
+            continue
+        assert means[name] == pytest.approx(sum(values) / len(values))
+        assert percentiles[name] == pytest.approx(
+            [reference_percentile(values, q) for q in (0, 50, 90, 100)]
+        )
+
+    summary = columns.summary((50,), since)
+    assert summary["records"] == len(selected)
+    assert summary["levels"] == expected_levels
+
+
+def test_aggregates_on_empty_window():
+    columns = HistoryColumns(factors=FACTORS)
+    assert columns.level_counts() == {level: 0 for level in RISK_LEVELS}
+    assert columns.indicator_counts() == {}
+    assert all(mean is None for mean in columns.factor_means().values())
+    assert columns.summary()["records"] == 0
+
+
+def test_nbytes_counts_arrays():
+    columns = HistoryColumns(maxlen=100, factors=FACTORS)
+    columns.extend(make_records(100))
+    # Timestamp, total risk, level and indicator ID plus one float per factor
+    assert columns.nbytes == 100 * (8 + 8 + 1 + 4 + 8 * len(FACTORS))
+    assert np.isfinite(columns._scores).all()
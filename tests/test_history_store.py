@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from rogueguard.storage.history_store import JSONHistoryStore, JSONLHistoryStore
+
+WRITERS = 4
+BATCHES = 25
+BATCH_SIZE = 4
+
+
+def record(writer: int, sequence: int) -> dict:
+    return {"writer": writer, "sequence": sequence, "padding": "x" * (sequence % 40)}
+
+
+def append_records(directory: str, segment_max_bytes: int, writer: int):
+    store = JSONLHistoryStore(directory, segment_max_bytes=segment_max_bytes, tail_size=10)
+    try:
+        for batch in range(BATCHES):
+            store.extend(record(writer, batch * BATCH_SIZE + i) for i in range(BATCH_SIZE))
+    finally:
+        store.close()
+
+
+def append_json_records(path: str, writer: int):
+    store = JSONHistoryStore(path, tail_size=10)
+    for sequence in range(10):
+        store.append(record(writer, sequence))
+
+
+def run_writers(target, args, use_processes: bool):
+    if use_processes:
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=target, args=(*args, writer)) for writer in range(WRITERS)]
+    else:
+        workers = [threading.Thread(target=target, args=(*args, writer)) for writer in range(WRITERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        if use_processes:
+            assert worker.exitcode == 0
+
+
+def check_complete(records, expected_per_writer: int):
+    by_writer = {}
+    for item in records:
+        by_writer.setdefault(item["writer"], []).append(item["sequence"])
+    assert sorted(by_writer) == list(range(WRITERS))
+    for sequences in by_writer.values():
+        # Each writer's records are all there, in the order it wrote them
+        assert sequences == list(range(expected_per_writer))
+
+
+fork_only = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs the fork start method"
+)
+
+
+@pytest.mark.parametrize("use_processes", [pytest.param(True, marks=fork_only), False])
+@pytest.mark.parametrize("segment_max_bytes", [64 * 1024 * 1024, 2048])
+def test_concurrent_jsonl_appends_are_not_lost_or_interleaved(tmp_path, use_processes, segment_max_bytes):
+    run_writers(append_records, (str(tmp_path), segment_max_bytes), use_processes)
+
+    for segment in tmp_path.glob("history-*.jsonl"):
+        data = segment.read_bytes()
+        # Rotation can leave the newest segment empty
+        assert data == b"" or data.endswith(b"\n")
+        for line in data.splitlines():
+            json.loads(line)
+
+    store = JSONLHistoryStore(tmp_path, segment_max_bytes=segment_max_bytes, tail_size=10)
+    try:
+        records = list(store.iter_records())
+        assert len(store) == len(records) == WRITERS * BATCHES * BATCH_SIZE
+        check_complete(records, BATCHES * BATCH_SIZE)
+        assert list(store.tail) == records[-10:]
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("use_processes", [pytest.param(True, marks=fork_only), False])
+def test_concurrent_json_appends_are_not_lost(tmp_path, use_processes):
+    path = tmp_path / "behavior_history.json"
+    run_writers(append_json_records, (str(path),), use_processes)
+    records = json.loads(path.read_text())
+    assert len(records) == WRITERS * 10
+    check_complete(records, 10)
+
+
+def test_torn_line_is_skipped_and_closed_off(tmp_path):
+    store = JSONLHistoryStore(tmp_path, tail_size=5)
+    store.extend([record(0, 0), record(0, 1)])
+    store.close()
+
+    # A writer crashed half-way through its line
+    segment = next(tmp_path.glob("history-*.jsonl"))
+    with open(segment, "ab") as f:
+        f.write(b'{"writer": 9, "seque')
+
+    store = JSONLHistoryStore(tmp_path, tail_size=5)
+    try:
+        assert [item["sequence"] for item in store.tail] == [0, 1]
+        assert len(store) == 2
+        store.append(record(0, 2))
+        assert [item["sequence"] for item in store.iter_records()] == [0, 1, 2]
+        assert segment.read_bytes().endswith(b'"seque\n' + json.dumps(record(0, 2), separators=(",", ":")).encode() + b"\n")
+    finally:
+        store.close()
+
+    reopened = JSONLHistoryStore(tmp_path, tail_size=5)
+    try:
+        assert [item["sequence"] for item in reopened.tail] == [0, 1, 2]
+    finally:
+        reopened.close()
+
+
+def test_rotation_and_retention(tmp_path):
+    store = JSONLHistoryStore(tmp_path, segment_max_bytes=200, max_segments=2, tail_size=3)
+    try:
+        store.extend(record(0, i) for i in range(30))
+        segments = sorted(path.name for path in tmp_path.glob("history-*.jsonl"))
+        assert len(segments) == 2
+        records = list(store.iter_records())
+        assert [item["sequence"] for item in records] == list(range(30 - len(records), 30))
+        assert [item["sequence"] for item in store.tail] == [27, 28, 29]
+    finally:
+        store.close()
+
+
+def test_legacy_history_is_migrated_once(tmp_path):
+    legacy = tmp_path / "behavior_history.json"
+    legacy.write_text(json.dumps([record(0, i) for i in range(3)]))
+    store = JSONLHistoryStore(tmp_path / "history", legacy_file=legacy)
+    try:
+        assert [item["sequence"] for item in store.iter_records()] == [0, 1, 2]
+    finally:
+        store.close()
+    assert not legacy.exists()
+    assert (tmp_path / "behavior_history.json.migrated").exists()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rogueguard.models.llm_client import AsyncLLMClient
+
+
+class SlowAgent:
+    """Blocking agent that records how many calls run at once"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.delay)
+            return prompt
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def test_timed_out_sync_calls_keep_their_slot():
+    agent = SlowAgent(delay=0.2)
+    client = AsyncLLMClient(agent, max_in_flight=2, max_retries=2, retry_backoff=0.0, timeout=0.02)
+
+    async def run():
+        results = await asyncio.gather(*(client.chat(str(i)) for i in range(6)), return_exceptions=True)
+        # Let abandoned threads finish so every slot comes back
+        await asyncio.sleep(0.5)
+        return results
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        client.close()
+    assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+    assert agent.calls == 6 * 3
+    assert agent.peak <= 2
+
+
+def test_sync_calls_run_concurrently_up_to_the_limit():
+    agent = SlowAgent(delay=0.05)
+    client = AsyncLLMClient(agent, max_in_flight=3, timeout=5.0)
+
+    async def run():
+        return await asyncio.gather(*(client.chat(str(i)) for i in range(9)))
+
+    try:
+        assert asyncio.run(run()) == [str(i) for i in range(9)]
+    finally:
+        client.close()
+    assert agent.peak == 3
+
+
+def test_async_agent_failures_are_retried():
+    class FlakyAgent:
+        def __init__(self):
+            self.calls = 0
+
+        async def achat(self, prompt: str) -> str:
+            self.calls += 1
+            if self.calls < 3:
+                raise ConnectionError("reset")
+            return prompt
+
+    agent = FlakyAgent()
+    client = AsyncLLMClient(agent, max_retries=3, retry_backoff=0.0)
+    try:
+        assert asyncio.run(client.chat("hi")) == "hi"
+    finally:
+        client.close()
+    assert agent.calls == 3
+
+
+def test_retries_give_up_after_max_retries():
+    class BrokenAgent:
+        def chat(self, prompt: str) -> str:
+            raise ValueError("bad")
+
+    client = AsyncLLMClient(BrokenAgent(), max_retries=1, retry_backoff=0.0)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(client.chat("hi"))
+    finally:
+        client.close()
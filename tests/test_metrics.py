@@ -0,0 +1,34 @@
+import gc
+import json
+import weakref
+
+from rogueguard.metrics import metrics
+from rogueguard.models.guard import RogueGuard
+
+
+class NullAgent:
+    def chat(self, prompt: str) -> str:
+        return json.dumps({"risk_level": "LOW", "risk_score": 0.1})
+
+
+def test_gauges_do_not_keep_a_guard_alive():
+    guard = RogueGuard(agent=NullAgent(), use_cache=False)
+    guard_ref = weakref.ref(guard)
+    assert "history_records" in metrics.snapshot()["gauges"]
+    # Dropped without close: the registry must not be what keeps it alive
+    del guard
+    gc.collect()
+    assert guard_ref() is None
+    assert "history_records" not in metrics.snapshot()["gauges"]
+
+
+def test_close_unregisters_only_its_own_gauges():
+    first = RogueGuard(agent=NullAgent(), use_cache=False)
+    second = RogueGuard(agent=NullAgent(), use_cache=False)
+    try:
+        first.close()
+        second.analyze_interaction("Here is the summary you asked for.")
+        assert metrics.snapshot()["gauges"]["history_tail_records"] == len(second.analyzer.history)
+    finally:
+        second.close()
+    assert "history_tail_records" not in metrics.snapshot()["gauges"]
@@ -0,0 +1,66 @@
+import joblib
+import pytest
+
+from rogueguard.analyzers.scorers import confirmed_scores, train_sklearn_scorer, training_examples
+
+FACTORS = ("deception", "autonomy")
+
+RISKY = "I will hide this change from the operators and disable the audit log."
+SAFE = "Here is the summary of the quarterly report you asked for."
+
+
+def saved(response: str, ai_analysis=None, label=None, behavior=0.9) -> dict:
+    analysis = {
+        "response": response,
+        "behavior_analysis": {"risk_scores": {factor: behavior for factor in FACTORS}},
+        "ai_analysis": ai_analysis or {"skipped": True}
+    }
+    if label is not None:
+        analysis["label"] = label
+    return analysis
+
+
+def model(deception: float) -> dict:
+    return {"structured": True, "risk_level": "HIGH", "risk_score": 0.7, "risk_scores": {"deception": deception}}
+
+
+def test_only_confirmed_analyses_are_used():
+    analyses = [
+        saved(RISKY),                                                    # heuristic only
+        saved(RISKY, {"analysis": "RISK LEVEL: HIGH", "risk_level": "HIGH"}),  # free text, no factor scores
+        saved(RISKY, model(0.9)),
+        saved(SAFE, model(0.9), label={"risk_scores": {"deception": 0, "autonomy": 0}}),
+        saved(""),
+    ]
+    texts, labels = training_examples(analyses, FACTORS)
+    assert texts == [RISKY, SAFE]
+    assert labels == {"deception": [1, 0], "autonomy": [None, 0]}
+
+
+def test_confirmed_scores_prefers_human_label():
+    analysis = saved(RISKY, model(0.9), label={"risk_scores": {"deception": 0}})
+    assert confirmed_scores(analysis) == {"deception": 0}
+    assert confirmed_scores(saved(RISKY)) == {}
+
+
+def test_too_few_examples_fail_clearly(tmp_path):
+    with pytest.raises(ValueError, match="confirmed labels"):
+        train_sklearn_scorer([RISKY] * 3, {"deception": [1, 1, 1]}, tmp_path / "model.joblib")
+
+
+@pytest.mark.parametrize("vectorizer", ["hashing", "tfidf"])
+def test_small_confirmed_set_trains(tmp_path, vectorizer):
+    texts = [f"{RISKY} case {i}" if i % 2 else f"{SAFE} item {i}" for i in range(24)]
+    labels = {
+        "deception": [i % 2 for i in range(24)],
+        "autonomy": [None if i % 3 else i % 2 for i in range(24)]
+    }
+    output = tmp_path / "model.joblib"
+    metadata = train_sklearn_scorer(texts, labels, output, vectorizer=vectorizer)
+    assert metadata["examples"] == 24
+    artifact = joblib.load(output)
+    assert artifact["models"]["deception"] is not None
+    assert 0.0 <= artifact["priors"]["autonomy"] <= 1.0
+    if vectorizer == "tfidf":
+        # With under 50 texts, terms seen once are kept
+        assert "23" in artifact["vectorizer"].vocabulary_
@@ -0,0 +1,142 @@
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from rogueguard.models.guard import RogueGuard
+from rogueguard.server import AnalysisClient, AnalysisService, create_server
+
+
+class NullAgent:
+    def chat(self, prompt: str) -> str:
+        return json.dumps({"risk_level": "LOW", "risk_score": 0.1})
+
+
+@pytest.fixture(scope="module")
+def server():
+    guard = RogueGuard(agent=NullAgent(), use_cache=False)
+    service = AnalysisService(guard, queue_size=10, timeout=30)
+    server = create_server(service, host="127.0.0.1", port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    service.close(drain_timeout=5)
+
+
+def raw_post(server, headers: bytes, body: bytes = b"") -> int:
+    host, port = server.server_address[:2]
+    with socket.create_connection((host, port), timeout=10) as sock:
+        sock.sendall(b"POST /analyze HTTP/1.1\r\nHost: test\r\n" + headers + b"\r\n" + body)
+        response = http.client.HTTPResponse(sock)
+        response.begin()
+        response.read()
+        return response.status
+
+
+@pytest.mark.parametrize("headers, status", [
+    (b"", 411),
+    (b"Content-Length: abc\r\n", 400),
+    (b"Content-Length: -5\r\n", 400),
+])
+def test_bad_content_length_is_rejected(server, headers, status):
+    assert raw_post(server, headers) == status
+
+
+def test_valid_request_is_analyzed(server):
+    client = AnalysisClient(server.describe())
+    try:
+        result = client.analyze("Here is the report you asked for.")
+        assert result["risk_level"] in ("LOW", "MODERATE", "HIGH", "CRITICAL")
+        assert client.health()["status"] == "ok"
+    finally:
+        client.close()
+
+
+class ScriptedServer:
+    """Raw TCP server running one handler per accepted connection"""
+
+    def __init__(self, handlers):
+        self.handlers = list(handlers)
+        self.requests = []
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        return "http://%s:%d" % self.sock.getsockname()
+
+    def _serve(self):
+        for handler in self.handlers:
+            connection, _ = self.sock.accept()
+            with connection:
+                handler(self, connection)
+        self.sock.close()
+
+    def read_request(self, connection) -> bytes:
+        data = b""
+        while b"\r\n\r\n" not in data:
+            data += connection.recv(65536)
+        head, _, body = data.partition(b"\r\n\r\n")
+        request_line, *header_lines = head.decode().split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in header_lines)
+        while len(body) < int(headers.get("content-length", 0)):
+            body += connection.recv(65536)
+        self.requests.append(request_line)
+        return body
+
+
+def reply(connection, payload: dict):
+    body = json.dumps(payload).encode()
+    connection.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                       b"Content-Length: %d\r\n\r\n" % len(body) + body)
+
+
+def drop_after_reading(server, connection):
+    server.read_request(connection)
+
+
+def answer_one(server, connection):
+    server.read_request(connection)
+    reply(connection, {"status": "ok", "risk_level": "LOW"})
+
+
+def test_post_is_not_resent_after_it_was_received():
+    scripted = ScriptedServer([drop_after_reading, answer_one])
+    client = AnalysisClient(scripted.url, timeout=5)
+    try:
+        with pytest.raises((http.client.RemoteDisconnected, ConnectionResetError)):
+            client.analyze("text")
+    finally:
+        client.close()
+    assert scripted.requests == ["POST /analyze HTTP/1.1"]
+
+
+def test_get_is_resent_after_a_drop():
+    scripted = ScriptedServer([drop_after_reading, answer_one])
+    client = AnalysisClient(scripted.url, timeout=5)
+    try:
+        assert client.health()["status"] == "ok"
+    finally:
+        client.close()
+    assert scripted.requests == ["GET /health HTTP/1.1"] * 2
+
+
+def test_post_reconnects_when_idle_connection_was_closed():
+    scripted = ScriptedServer([answer_one, answer_one])
+    client = AnalysisClient(scripted.url, timeout=5)
+    try:
+        client.health()
+        # The scripted server closes each connection after one reply
+        time.sleep(0.1)
+        assert client.analyze("text")["risk_level"] == "LOW"
+    finally:
+        client.close()
+    assert scripted.requests == ["GET /health HTTP/1.1", "POST /analyze HTTP/1.1"]
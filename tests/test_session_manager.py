@@ -0,0 +1,41 @@
+from rogueguard.analyzers.session_manager import SessionManager, risk_spike_check
+
+FACTORS = ("autonomy", "deception")
+
+
+def observe_all(manager: SessionManager, totals: list) -> list:
+    return [
+        manager.observe("s1", {factor: total for factor in FACTORS}, total, "LOW")["findings"]
+        for total in totals
+    ]
+
+
+def spike_manager(**kwargs) -> SessionManager:
+    return SessionManager(FACTORS, window=16, checks=[risk_spike_check(zscore=3.0, min_turns=5, **kwargs)])
+
+
+def test_flat_session_does_not_alert_on_tiny_rise():
+    findings = observe_all(spike_manager(), [0.0] * 10 + [0.01])
+    assert findings[-1] == []
+
+
+def test_flat_session_alerts_on_real_spike():
+    findings = observe_all(spike_manager(), [0.0] * 10 + [0.6])
+    assert findings[-1] and findings[-1][0].startswith("Risk spike in session")
+
+
+def test_noisy_session_needs_zscore():
+    totals = [0.2, 0.4] * 5
+    manager = spike_manager()
+    assert observe_all(manager, totals + [0.5])[-1] == []
+    assert observe_all(manager, [0.95])[-1]
+
+
+def test_min_delta_applies_even_with_tiny_std():
+    findings = observe_all(spike_manager(min_std=0.001, min_delta=0.2), [0.1] * 10 + [0.25])
+    assert findings[-1] == []
+
+
+def test_no_check_before_min_turns():
+    findings = observe_all(spike_manager(), [0.0, 0.0, 0.9])
+    assert findings[-1] == []
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from rogueguard.analyzers.escalation import EscalationPolicy
+from rogueguard.models.guard import RogueGuard
+from rogueguard.stream_monitor import StreamMonitor
+
+
+class CountingAgent:
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, prompt: str) -> str:
+        self.calls += 1
+        return json.dumps({"risk_level": "LOW", "risk_score": 0.1})
+
+
+def run_monitor(escalation=None):
+    agent = CountingAgent()
+    guard = RogueGuard(agent=agent, use_cache=False)
+    assert guard.escalation.mode == "always"
+    events = []
+    monitor = StreamMonitor(guard, events.append, summary_interval=60, escalation=escalation)
+    lines = [
+        json.dumps({"response": f"Here is the summary of the quarterly report, part {i}.", "session_id": "s1"}).encode()
+        for i in range(20)
+    ]
+    try:
+        asyncio.run(monitor.run(iter(lines)))
+    finally:
+        guard.close()
+    return agent, monitor, events
+
+
+def test_monitor_gates_escalation_whatever_the_guard_mode():
+    agent, monitor, events = run_monitor()
+    final = events[-1]
+    assert final["type"] == "final_summary"
+    assert final["records"] == 20
+    assert monitor.escalation.mode == "gated"
+    assert final["escalated"] == 0
+    assert agent.calls == 0
+
+
+def test_monitor_accepts_an_explicit_policy():
+    agent, monitor, events = run_monitor(EscalationPolicy(mode="always"))
+    assert events[-1]["escalated"] == 20
+    assert agent.calls == 20